@@ -1,11 +1,15 @@
 from .admin import ADMIN_CONFIG as ADMIN_CONFIG
 from .db import DB_CONFIG as DB_CONFIG
 from .log import LOG_CONFIG as LOG_CONFIG
+from .rate_limit import RATE_LIMIT_CONFIG as RATE_LIMIT_CONFIG
 from .user import USER_CONFIG as USER_CONFIG
+from .warmup import WARMUP_CONFIG as WARMUP_CONFIG
 
 __all__ = [
     "ADMIN_CONFIG",
     "DB_CONFIG",
     "LOG_CONFIG",
+    "RATE_LIMIT_CONFIG",
     "USER_CONFIG",
+    "WARMUP_CONFIG",
 ]
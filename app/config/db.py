@@ -1,18 +1,101 @@
-from typing import Annotated
+from enum import StrEnum
+from typing import Annotated, Self
 
-from pydantic import Field, PostgresDsn, RedisDsn, computed_field
+from pydantic import Field, PostgresDsn, RedisDsn, computed_field, model_validator
 from pydantic_settings import BaseSettings
 
 
+class CacheBackend(StrEnum):
+    REDIS = "redis"
+    MEMORY = "memory"
+    NONE = "none"
+
+
+class RateLimiterBackend(StrEnum):
+    REDIS = "redis"
+    MEMORY = "memory"
+    SHARED_MEMORY = "shared_memory"
+
+
 class DbConfig(BaseSettings):
     postgres_host: Annotated[str, Field(alias="POSTGRES_HOST")] = "localhost"
     postgres_port: Annotated[int, Field(alias="POSTGRES_PORT")] = 5432
     postgres_user: Annotated[str, Field(alias="POSTGRES_USER")] = "postgres"
     postgres_password: Annotated[str, Field(alias="POSTGRES_PASSWORD")] = "postgres"
     postgres_db: Annotated[str, Field(alias="POSTGRES_DB")] = "wcs_db"
+    postgres_replica_hosts: Annotated[
+        str,
+        Field(
+            alias="POSTGRES_REPLICA_HOSTS",
+            description="Comma separated host[:port] of read replicas sharing the credentials of the primary",
+        ),
+    ] = ""
+
+    db_pool_size: Annotated[
+        int, Field(alias="DB_POOL_SIZE", ge=1, description="Connections kept open in the pool of each worker")
+    ] = 5
+    db_max_overflow: Annotated[
+        int, Field(alias="DB_MAX_OVERFLOW", ge=0, description="Connections opened beyond the pool size under load")
+    ] = 10
+    db_pool_min_size: Annotated[
+        int, Field(alias="DB_POOL_MIN_SIZE", ge=0, description="Connections opened when the worker starts")
+    ] = 2
+    db_pool_timeout: Annotated[
+        float, Field(alias="DB_POOL_TIMEOUT", gt=0, description="Seconds to wait for a connection from the pool")
+    ] = 30.0
+    db_pool_recycle: Annotated[
+        int, Field(alias="DB_POOL_RECYCLE", description="Seconds before a connection is replaced, -1 to never")
+    ] = 1800
+    db_pool_pre_ping: Annotated[
+        bool, Field(alias="DB_POOL_PRE_PING", description="Check connections before handing them out")
+    ] = True
+    db_statement_cache_size: Annotated[
+        int,
+        Field(
+            alias="DB_STATEMENT_CACHE_SIZE",
+            ge=0,
+            description="Prepared statements cached per connection, 0 when behind a transaction pooler",
+        ),
+    ] = 100
+    db_statement_timeout: Annotated[
+        int, Field(alias="DB_STATEMENT_TIMEOUT", ge=0, description="Server side statement timeout in ms, 0 to disable")
+    ] = 30000
 
     redis_host: Annotated[str, Field(alias="REDIS_HOST")] = "localhost"
     redis_port: Annotated[int, Field(alias="REDIS_PORT")] = 6379
+    redis_db: Annotated[int, Field(alias="REDIS_DB", ge=0, description="Index of the Redis database")] = 0
+    redis_enabled: Annotated[bool, Field(alias="REDIS_ENABLED")] = True
+    redis_timeout: Annotated[
+        float, Field(alias="REDIS_TIMEOUT", gt=0, description="Seconds before a Redis command or connect times out")
+    ] = 0.25
+    redis_breaker_threshold: Annotated[
+        int, Field(alias="REDIS_BREAKER_THRESHOLD", ge=1, description="Consecutive failures that open the circuit")
+    ] = 5
+    redis_breaker_cooldown: Annotated[
+        float, Field(alias="REDIS_BREAKER_COOLDOWN", gt=0, description="Seconds before an open circuit is retried")
+    ] = 10.0
+
+    cache_backend: Annotated[
+        CacheBackend, Field(alias="CACHE_BACKEND", description="Defaults to 'memory' when Redis is disabled")
+    ] = CacheBackend.REDIS
+    memory_cache_max_bytes: Annotated[
+        int, Field(alias="MEMORY_CACHE_MAX_BYTES", gt=0, description="Memory budget of the in-process cache")
+    ] = 64 * 1024 * 1024
+    cache_fallback: Annotated[
+        CacheBackend,
+        Field(alias="CACHE_FALLBACK", description="Cache used while Redis is unavailable, 'memory' or 'none'"),
+    ] = CacheBackend.MEMORY
+
+    rate_limiter_backend: Annotated[
+        RateLimiterBackend,
+        Field(alias="RATE_LIMITER_BACKEND", description="Defaults to 'memory' when Redis is disabled"),
+    ] = RateLimiterBackend.REDIS
+    rate_limit_shm_path: Annotated[
+        str, Field(alias="RATE_LIMIT_SHM_PATH", description="File backing the shared memory rate limiter")
+    ] = "/dev/shm/wcs-rate-limit"
+    rate_limit_shm_slots: Annotated[
+        int, Field(alias="RATE_LIMIT_SHM_SLOTS", gt=0, description="Number of counters in the shared memory table")
+    ] = 65536
 
     @computed_field
     @property
@@ -28,17 +111,59 @@ class DbConfig(BaseSettings):
 
     @computed_field
     @property
-    def redis_dsn(self) -> RedisDsn:
+    def postgres_replica_dsns(self) -> list[PostgresDsn]:
+        dsns = []
+        for replica in filter(None, (host.strip() for host in self.postgres_replica_hosts.split(","))):
+            host, _, port = replica.partition(":")
+            dsns.append(
+                PostgresDsn.build(
+                    scheme="postgresql+asyncpg",
+                    username=self.postgres_user,
+                    password=self.postgres_password,
+                    host=host,
+                    port=int(port) if port else self.postgres_port,
+                    path=self.postgres_db,
+                )
+            )
+        return dsns
+
+    @computed_field
+    @property
+    def redis_dsn(self) -> RedisDsn | None:
+        if not self.redis_enabled:
+            return None
         return RedisDsn.build(
             scheme="redis",
             host=self.redis_host,
             port=self.redis_port,
-            path="0",
+            path=str(self.redis_db),
         )
 
+    @model_validator(mode="after")
+    def check_backends(self) -> Self:
+        if self.db_pool_min_size > self.db_pool_size:
+            raise ValueError("DB_POOL_MIN_SIZE cannot be larger than DB_POOL_SIZE")
+        if self.cache_fallback == CacheBackend.REDIS:
+            raise ValueError("CACHE_FALLBACK cannot be 'redis', use 'memory' or 'none' instead")
+        if not self.redis_enabled:
+            # The Redis defaults fall back to in-process backends, only an explicit choice of Redis is an error
+            if self.cache_backend == CacheBackend.REDIS:
+                if "cache_backend" in self.model_fields_set:
+                    raise ValueError("CACHE_BACKEND is 'redis' but Redis is disabled, use 'memory' or 'none' instead")
+                self.cache_backend = CacheBackend.MEMORY
+            if self.rate_limiter_backend == RateLimiterBackend.REDIS:
+                if "rate_limiter_backend" in self.model_fields_set:
+                    raise ValueError(
+                        "RATE_LIMITER_BACKEND is 'redis' but Redis is disabled, use 'memory' or 'shared_memory' instead"
+                    )
+                self.rate_limiter_backend = RateLimiterBackend.MEMORY
+        return self
+
 
 DB_CONFIG = DbConfig()
 
 __all__ = [
     "DB_CONFIG",
+    "CacheBackend",
+    "RateLimiterBackend",
 ]
@@ -0,0 +1,50 @@
+from typing import Annotated
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class RateLimitConfig(BaseSettings):
+    """
+    Configuration for the caps shared by all rate limited routes and the local pre-check.
+    """
+
+    global_limit: Annotated[
+        int | None,
+        Field(
+            alias="RATE_LIMIT_GLOBAL_LIMIT", ge=1, description="Requests per client IP across all rate limited routes"
+        ),
+    ] = None
+    global_period: Annotated[int, Field(alias="RATE_LIMIT_GLOBAL_PERIOD", ge=1)] = 60
+    user_limit: Annotated[
+        int | None,
+        Field(alias="RATE_LIMIT_USER_LIMIT", ge=1, description="Requests per user across all rate limited routes"),
+    ] = None
+    user_period: Annotated[int, Field(alias="RATE_LIMIT_USER_PERIOD", ge=1)] = 60
+
+    local_precheck: Annotated[
+        bool,
+        Field(
+            alias="RATE_LIMIT_LOCAL_PRECHECK",
+            description="Count requests of keys far below their limits in process and sync them to Redis in batches",
+        ),
+    ] = False
+    local_threshold: Annotated[
+        float,
+        Field(
+            alias="RATE_LIMIT_LOCAL_THRESHOLD",
+            gt=0,
+            le=1,
+            description="Fraction of a limit that must remain for a request to be counted locally",
+        ),
+    ] = 0.5
+    sync_interval: Annotated[
+        float, Field(alias="RATE_LIMIT_SYNC_INTERVAL", gt=0, description="Seconds between two syncs of local counts")
+    ] = 1.0
+
+
+RATE_LIMIT_CONFIG = RateLimitConfig()
+
+__all__ = [
+    "RATE_LIMIT_CONFIG",
+]
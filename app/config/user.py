@@ -6,6 +6,18 @@ class UserConfig(BaseSettings):
     max_ip_records: int = Field(
         default=10, description="Maximum number of common IPs to store for each user"
     )
+    principal_cache_ttl: int = Field(
+        default=60, gt=0, description="Seconds an authenticated user is cached in the shared cache"
+    )
+    principal_local_cache_ttl: float = Field(
+        default=5, ge=0, description="Seconds an authenticated user is cached in process, 0 to disable"
+    )
+    principal_negative_cache_ttl: float = Field(
+        default=30, ge=0, description="Seconds an unknown API key is remembered in process, 0 to disable"
+    )
+    ip_flush_interval: float = Field(
+        default=30, gt=0, description="Seconds between merges of the IPs used by users into their records"
+    )
 
 
 USER_CONFIG = UserConfig()
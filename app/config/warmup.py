@@ -0,0 +1,27 @@
+from typing import Annotated
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class WarmupConfig(BaseSettings):
+    """
+    Configuration for cache warm-up at startup and at pool rotation boundaries.
+    """
+
+    enabled: Annotated[bool, Field(alias="WARMUP_ENABLED")] = True
+    concurrency: Annotated[int, Field(alias="WARMUP_CONCURRENCY", ge=1)] = 2
+    interval: Annotated[
+        float, Field(alias="WARMUP_INTERVAL", ge=0, description="Seconds each worker waits between two requests")
+    ] = 0.2
+    startup_delay: Annotated[int, Field(alias="WARMUP_STARTUP_DELAY", ge=0)] = 5
+    rotation_delay: Annotated[
+        int, Field(alias="WARMUP_ROTATION_DELAY", ge=0, description="Seconds after a rotation start to warm up")
+    ] = 30
+
+
+WARMUP_CONFIG = WarmupConfig()
+
+__all__ = [
+    "WARMUP_CONFIG",
+]
@@ -9,18 +9,46 @@ from fastapi import Request, Response
 from pydantic import BaseModel, TypeAdapter
 
 from app.config import DB_CONFIG
+from app.config.db import CacheBackend
 from app.core.log import LOGGER
+from app.core.metrics import CACHE_REQUESTS, RouteHandler
 from app.schemas.constants import INJECTED_NAMESPACE
 
 from .base import Cache
 from .dummy_cache import DummyCache
+from .memory_cache import MemoryCache
 from .redis_cache import RedisCache
+from .warmup import is_warmup_request
 
-_cache: Cache = DummyCache() if DB_CONFIG.redis_dsn is None else RedisCache()
 
+def _create_cache(backend: CacheBackend) -> Cache:
+    match backend:
+        case CacheBackend.REDIS:
+            return RedisCache(fallback=_create_cache(DB_CONFIG.cache_fallback))
+        case CacheBackend.MEMORY:
+            return MemoryCache(max_bytes=DB_CONFIG.memory_cache_max_bytes)
+        case CacheBackend.NONE:
+            return DummyCache()
 
-def _build_cache_key(request: Request) -> str:
+
+_cache: Cache = _create_cache(DB_CONFIG.cache_backend)
+
+
+def get_cache() -> Cache:
+    """
+    Get the cache of the process, for values other than endpoint responses.
+    """
+    return _cache
+
+
+_cache_hits = CACHE_REQUESTS.labels("hit")
+_cache_misses = CACHE_REQUESTS.labels("miss")
+
+
+def _build_cache_key(request: Request, body: bytes = b"") -> str:
     key_parts = f"{request.method}:{request.url.path}:{hashlib.md5(str(request.query_params).encode()).hexdigest()}"
+    if body:
+        key_parts += f":{hashlib.md5(body).hexdigest()}"
     return f"cache:{key_parts}"
 
 
@@ -73,7 +101,7 @@ def cached[**P, R](
     The decorator extracts ``Request`` / ``Response`` from function arguments
     to build cache keys and set ``X-Cache`` headers. If no ``Request`` is
     found in the arguments, caching is skipped and the function is called
-    directly.
+    directly. Cache warm-up requests skip the lookup and refresh the entry.
 
     :param expire: Cache expiration time in seconds (default: 60)
     """
@@ -96,14 +124,16 @@ def cached[**P, R](
 
             cache_key = _build_cache_key(request)
 
-            raw = await _cache.get(cache_key)
+            raw = None if is_warmup_request(request) else await _cache.get(cache_key)
             if raw is not None:
+                _cache_hits.inc()
                 if response:
                     response.headers["X-Cache"] = "HIT"
                 if return_type is not None:
                     return _deserialize(raw, return_type)
                 return json.loads(raw)  # type: ignore[return-value]
 
+            _cache_misses.inc()
             if response:
                 response.headers["X-Cache"] = "MISS"
 
@@ -129,7 +159,44 @@ def cached[**P, R](
     return decorator
 
 
+def cache_route_handler(handler: RouteHandler, expire: int = 60) -> RouteHandler:
+    """
+    Wrap a route handler to serve cached responses before its dependencies are resolved,
+    so cache hits do not authenticate the user or check out a database connection.
+
+    Whole response bodies are cached, keyed by the query and the request body.
+    Only successful JSON responses are cached. Routes requiring permissions must use `cached` instead,
+    so that their dependencies are always resolved.
+
+    :param expire: Cache expiration time in seconds (default: 60)
+    """
+
+    async def cached_handler(request: Request) -> Response:
+        cache_key = _build_cache_key(request, await request.body())
+
+        raw = None if is_warmup_request(request) else await _cache.get(cache_key)
+        if raw is not None:
+            _cache_hits.inc()
+            return Response(content=raw, media_type="application/json", headers={"X-Cache": "HIT"})
+
+        _cache_misses.inc()
+        response = await handler(request)
+        response.headers["X-Cache"] = "MISS"
+
+        # Streaming responses have no body to cache
+        if response.status_code == 200 and response.media_type == "application/json" and hasattr(response, "body"):
+            await _cache.set(cache_key, bytes(response.body).decode(), expire=expire)
+        return response
+
+    return cached_handler
+
+
 __all__ = [
     "Cache",
+    "DummyCache",
+    "MemoryCache",
+    "RedisCache",
+    "cache_route_handler",
     "cached",
+    "get_cache",
 ]
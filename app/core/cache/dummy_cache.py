@@ -5,7 +5,7 @@ from .base import Cache
 
 class DummyCache(Cache):
     """
-    A no-op cache implementation used when Redis is not configured.
+    A no-op cache implementation used when caching is disabled (``CACHE_BACKEND=none``).
     All get operations return None, set/delete operations are silently ignored.
     """
 
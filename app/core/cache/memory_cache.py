@@ -0,0 +1,74 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import NamedTuple, override
+
+from .base import Cache
+
+
+class _Entry(NamedTuple):
+    value: str
+    expires_at: float
+    size: int
+
+
+class MemoryCache(Cache):
+    """
+    A bounded in-process cache used when Redis is not available.
+
+    Entries expire after their own TTL and the least recently used entries are evicted
+    once the total size of keys and values exceeds ``max_bytes``.
+
+    None of the methods await, so every operation runs atomically on the event loop
+    and no locking is needed, not even for reads.
+    """
+
+    max_bytes: int
+    size: int
+    _entries: OrderedDict[str, _Entry]
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @override
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    @override
+    async def set(self, key: str, value: str, expire: int) -> None:
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = _Entry(value, time.monotonic() + expire, size)
+        self.size += size
+        self._evict()
+
+    @override
+    async def delete(self, key: str) -> None:
+        self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used entries until the cache fits into its budget.
+        """
+        while self.size > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
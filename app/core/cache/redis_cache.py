@@ -2,13 +2,27 @@ from typing import override
 
 from redis.asyncio import Redis
 
-from app.core.db.redis import RedisClient
+from app.core.db.redis import RedisClient, RedisUnavailableError
+from app.core.metrics import REDIS_COMMAND_DURATION, REDIS_FALLBACKS
 
 from .base import Cache
 
+_get_duration = REDIS_COMMAND_DURATION.labels("get")
+_set_duration = REDIS_COMMAND_DURATION.labels("set")
+_delete_duration = REDIS_COMMAND_DURATION.labels("delete")
+_fallbacks = REDIS_FALLBACKS.labels("cache")
+
 
 class RedisCache(Cache):
+    """
+    Cache stored in Redis. While Redis is unavailable, the fallback cache is used instead.
+    """
+
     _redis: Redis | None = None
+    fallback: Cache
+
+    def __init__(self, fallback: Cache):
+        self.fallback = fallback
 
     @property
     def redis(self) -> Redis:
@@ -16,15 +30,40 @@ class RedisCache(Cache):
             self._redis = RedisClient.get_instance()
         return self._redis
 
+    async def _get(self, key: str) -> str | None:
+        with _get_duration.time():
+            value: str | None = await self.redis.get(key)  # type: ignore[assignment]
+        return value
+
+    async def _set(self, key: str, value: str, expire: int) -> None:
+        with _set_duration.time():
+            await self.redis.set(key, value, ex=expire)
+
+    async def _delete(self, key: str) -> None:
+        with _delete_duration.time():
+            await self.redis.delete(key)
+
     @override
     async def get(self, key: str) -> str | None:
-        value: str | None = await self.redis.get(key)  # type: ignore[assignment]
-        return value
+        try:
+            return await RedisClient.breaker.call(lambda: self._get(key))
+        except RedisUnavailableError:
+            _fallbacks.inc()
+            return await self.fallback.get(key)
 
     @override
     async def set(self, key: str, value: str, expire: int) -> None:
-        await self.redis.set(key, value, ex=expire)
+        try:
+            await RedisClient.breaker.call(lambda: self._set(key, value, expire))
+        except RedisUnavailableError:
+            _fallbacks.inc()
+            await self.fallback.set(key, value, expire)
 
     @override
     async def delete(self, key: str) -> None:
-        await self.redis.delete(key)
+        # Entries may have been written to the fallback during an outage
+        await self.fallback.delete(key)
+        try:
+            await RedisClient.breaker.call(lambda: self._delete(key))
+        except RedisUnavailableError:
+            _fallbacks.inc()
@@ -0,0 +1,65 @@
+import asyncio
+import secrets
+from collections.abc import Sequence
+
+import httpx
+from fastapi import Request
+from starlette.types import ASGIApp
+
+from app.config import WARMUP_CONFIG
+from app.core.log import LOGGER
+
+WARMUP_HEADER = "X-WCS-Warmup"
+
+# Only requests issued by this process carry the token, so clients cannot force a refresh or skip rate limits.
+_WARMUP_TOKEN = secrets.token_urlsafe(32)
+
+
+def is_warmup_request(request: Request) -> bool:
+    """
+    Check whether the request was issued by the cache warm-up of this process.
+    """
+    token = request.headers.get(WARMUP_HEADER)
+    return token is not None and secrets.compare_digest(token, _WARMUP_TOKEN)
+
+
+async def warm_up(app: ASGIApp, urls: Sequence[str]) -> int:
+    """
+    Request the given URLs through the application in-process, so the responses are cached
+    under exactly the same keys as client requests.
+
+    Warm-up requests bypass cache lookups (refreshing existing entries) and rate limits.
+    At most ``WARMUP_CONCURRENCY`` requests run at a time and each worker pauses ``WARMUP_INTERVAL``
+    seconds between requests, so warm-up can never occupy more than a few database connections.
+
+    :return: The number of URLs that were warmed up successfully.
+    """
+    semaphore = asyncio.Semaphore(WARMUP_CONFIG.concurrency)
+    succeeded = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://warmup",
+        headers={WARMUP_HEADER: _WARMUP_TOKEN},
+    ) as client:
+
+        async def fetch(url: str) -> None:
+            nonlocal succeeded
+            async with semaphore:
+                try:
+                    response = await client.get(url)
+                    if response.is_success:
+                        succeeded += 1
+                    else:
+                        LOGGER.warning(f"Cache warm-up of {url} failed with status {response.status_code}")
+                except Exception as e:
+                    LOGGER.warning(f"Cache warm-up of {url} failed: {e}")
+                await asyncio.sleep(WARMUP_CONFIG.interval)
+
+        await asyncio.gather(*(fetch(url) for url in urls))
+
+    LOGGER.info(f"Cache warm-up finished, {succeeded}/{len(urls)} URLs warmed up")
+    return succeeded
+
+
+__all__ = ["WARMUP_HEADER", "is_warmup_request", "warm_up"]
@@ -1,14 +1,26 @@
 from .base import Base, BaseRepository
 from .redis import RedisClient
-from .session import SessionDep, close_db, get_engine, get_session, init_db
+from .session import (
+    ReadSessionDep,
+    SessionDep,
+    close_db,
+    get_engine,
+    get_read_session,
+    get_session,
+    init_db,
+    is_db_initialized,
+)
 
 __all__ = [
     "Base",
     "BaseRepository",
+    "ReadSessionDep",
     "RedisClient",
     "SessionDep",
     "close_db",
     "get_engine",
+    "get_read_session",
     "get_session",
     "init_db",
+    "is_db_initialized",
 ]
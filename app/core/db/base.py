@@ -1,5 +1,7 @@
+import zlib
 from typing import dataclass_transform
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
@@ -16,3 +18,19 @@ class BaseRepository:
 
     def __init__(self, session: AsyncSession):
         self.session = session
+
+    async def advisory_lock(self, name: str) -> None:
+        """
+        Take a Postgres advisory lock held until the end of the transaction,
+        so jobs running in several workers at once do not step on each other.
+        """
+        await self.session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": zlib.crc32(name.encode())})
+
+    async def try_advisory_lock(self, name: str) -> bool:
+        """
+        Take the advisory lock like ``advisory_lock`` if no other transaction holds it, without waiting.
+        """
+        result = await self.session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": zlib.crc32(name.encode())}
+        )
+        return bool(result.scalar_one())
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, PoolProxiedConnection
+
+from app.core.log import LOGGER
+from app.core.metrics import DB_POOL_CAPACITY, DB_POOL_CHECKOUT_WAIT, DB_POOL_IN_USE, DB_POOL_TIMEOUTS
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that reports how long callers wait for a connection, and how often they give up.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_pool(engine: AsyncEngine, capacity: int) -> None:
+    """
+    Track the number of checked out connections of the engine pool, out of its ``capacity``.
+    """
+    DB_POOL_CAPACITY.inc(capacity)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(
+        dbapi_connection: DBAPIConnection, record: ConnectionPoolEntry, proxy: PoolProxiedConnection
+    ) -> None:
+        DB_POOL_IN_USE.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(dbapi_connection: DBAPIConnection | None, record: ConnectionPoolEntry) -> None:
+        DB_POOL_IN_USE.dec()
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open ``connections`` connections at once and return them to the pool, so the first requests
+    do not pay for connection setup. Failures are logged, the pool then connects on demand.
+    """
+    if connections <= 0:
+        return
+
+    results = await asyncio.gather(*(engine.connect().start() for _ in range(connections)), return_exceptions=True)
+    opened = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            LOGGER.warning(f"Failed to open a database connection during warm-up: {result}")
+        else:
+            await result.close()
+            opened += 1
+    LOGGER.debug(f"Opened {opened}/{connections} database connections during warm-up")
+
+
+__all__ = ["InstrumentedAsyncQueuePool", "instrument_pool", "warm_up_pool"]
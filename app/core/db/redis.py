@@ -1,17 +1,125 @@
+import enum
+import time
+from collections.abc import Awaitable, Callable
+
 from redis import asyncio as aioredis
+from redis.exceptions import RedisError
 
 from app.config.db import DB_CONFIG
+from app.core.log import LOGGER
+from app.core.metrics import REDIS_CIRCUIT_STATE
+
+
+class RedisUnavailableError(Exception):
+    """
+    Raised when a Redis command fails or is not attempted because the circuit is open.
+    """
+
+
+class CircuitState(enum.IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """
+    Stops calling Redis after ``threshold`` consecutive failures, so requests fall back
+    to their in-process path immediately instead of waiting for timeouts.
+
+    After ``cooldown`` seconds, a single call is let through to probe Redis,
+    closing the circuit again if it succeeds.
+    """
+
+    threshold: int
+    cooldown: float
+    failures: int
+    opened_at: float
+    state: CircuitState
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self._set_state(CircuitState.CLOSED)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self.state = state
+        REDIS_CIRCUIT_STATE.set(state)
+
+    def allow(self) -> bool:
+        match self.state:
+            case CircuitState.CLOSED:
+                return True
+            case CircuitState.OPEN if time.monotonic() - self.opened_at >= self.cooldown:
+                self._set_state(CircuitState.HALF_OPEN)
+                return True
+            case _:
+                # Only the probe is let through while half-open
+                return False
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            LOGGER.info("Redis is reachable again, closing circuit")
+            self._set_state(CircuitState.CLOSED)
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or (
+            self.state == CircuitState.CLOSED and self.failures >= self.threshold
+        ):
+            LOGGER.warning(f"Redis failed {self.failures} times in a row, opening circuit for {self.cooldown}s")
+            self.opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
+
+    def abandon_probe(self) -> None:
+        """
+        Reopen the circuit after a probe that did not finish, e.g. cancelled, so that the next call probes again.
+        """
+        if self.state == CircuitState.HALF_OPEN:
+            self._set_state(CircuitState.OPEN)
+
+    async def call[T](self, command: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run a Redis command through the breaker.
+
+        :raises RedisUnavailableError: If the circuit is open or the command failed.
+        """
+        if not self.allow():
+            raise RedisUnavailableError("Redis circuit is open")
+        try:
+            result = await command()
+        except (RedisError, OSError) as e:
+            self.record_failure()
+            raise RedisUnavailableError(str(e)) from e
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.abandon_probe()
+            raise
+        self.record_success()
+        return result
 
 
 class RedisClient:
     _instance: aioredis.Redis | None = None
 
+    # Shared by all Redis users of the process
+    breaker = CircuitBreaker(DB_CONFIG.redis_breaker_threshold, DB_CONFIG.redis_breaker_cooldown)
+
     @classmethod
     async def init(cls):
         if DB_CONFIG.redis_dsn is None:
             raise RuntimeError("Redis DSN is not configured, cannot create Redis client")
         cls._instance = await aioredis.from_url(
-            DB_CONFIG.redis_dsn.encoded_string(), encoding="utf-8", decode_responses=True
+            DB_CONFIG.redis_dsn.encoded_string(),
+            encoding="utf-8",
+            decode_responses=True,
+            socket_timeout=DB_CONFIG.redis_timeout,
+            socket_connect_timeout=DB_CONFIG.redis_timeout,
         )
 
     @classmethod
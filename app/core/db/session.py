@@ -1,15 +1,22 @@
-from collections.abc import AsyncGenerator
+import itertools
+from collections.abc import AsyncGenerator, Iterator
 from contextlib import asynccontextmanager
 from typing import Annotated
 
 from fastapi import Depends
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import DB_CONFIG
 from app.core.log import LOGGER
 
+from .pool import InstrumentedAsyncQueuePool, instrument_pool, warm_up_pool
+
 engine: AsyncEngine | None = None
 session_maker: async_sessionmaker[AsyncSession]
+replica_engines: list[AsyncEngine] = []
+# Cycles through the replicas, or only the primary if there are none
+read_session_makers: Iterator[async_sessionmaker[AsyncSession]]
 
 
 async def get_dsn() -> str:
@@ -22,15 +29,57 @@ async def get_dsn() -> str:
     return DB_CONFIG.postgres_dsn.encoded_string()
 
 
+def create_engine(dsn: str) -> AsyncEngine:
+    """
+    Create an engine with the pool and connection settings of the configuration.
+    """
+    server_settings = {}
+    if DB_CONFIG.db_statement_timeout > 0:
+        server_settings["statement_timeout"] = str(DB_CONFIG.db_statement_timeout)
+
+    new_engine = create_async_engine(
+        dsn,
+        echo=False,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=DB_CONFIG.db_pool_size,
+        max_overflow=DB_CONFIG.db_max_overflow,
+        pool_timeout=DB_CONFIG.db_pool_timeout,
+        pool_recycle=DB_CONFIG.db_pool_recycle,
+        pool_pre_ping=DB_CONFIG.db_pool_pre_ping,
+        connect_args={
+            # Both the asyncpg and the SQLAlchemy statement caches, which must be disabled together behind a pooler
+            "statement_cache_size": DB_CONFIG.db_statement_cache_size,
+            "prepared_statement_cache_size": DB_CONFIG.db_statement_cache_size,
+            "server_settings": server_settings,
+        },
+    )
+    instrument_pool(new_engine, DB_CONFIG.db_pool_size + DB_CONFIG.db_max_overflow)
+    return new_engine
+
+
 async def init_db() -> AsyncEngine:
-    global engine, session_maker
+    global engine, session_maker, replica_engines, read_session_makers
     dsn = await get_dsn()
-    engine = create_async_engine(dsn, echo=False)
+    engine = create_engine(dsn)
     session_maker = async_sessionmaker(engine, expire_on_commit=False)
     LOGGER.debug(f"Database engine initialized with DSN: {dsn}")
+
+    replica_engines = [create_engine(replica.encoded_string()) for replica in DB_CONFIG.postgres_replica_dsns]
+    read_session_makers = itertools.cycle(
+        [async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines] or [session_maker]
+    )
+    if replica_engines:
+        LOGGER.debug(f"Routing read-only sessions to {len(replica_engines)} replicas")
+
+    for pool_engine in [engine, *replica_engines]:
+        await warm_up_pool(pool_engine, DB_CONFIG.db_pool_min_size)
     return engine
 
 
+def is_db_initialized() -> bool:
+    return engine is not None
+
+
 def get_engine() -> AsyncEngine:
     """
     Returns the SQLAlchemy engine. Initializes it if not already done.
@@ -50,6 +99,9 @@ async def close_db():
     if engine is not None:
         await engine.dispose()
         LOGGER.debug("Database engine connection closed.")
+    for replica in replica_engines:
+        await replica.dispose()
+    replica_engines.clear()
 
 
 @asynccontextmanager
@@ -74,6 +126,34 @@ async def get_session_fastapi() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-SessionDep = Annotated[AsyncSession, Depends(get_session_fastapi)]
+@asynccontextmanager
+async def get_read_session():
+    """
+    Open a read-only session on the next replica, or on the primary if there are no replicas.
+    The transaction is never committed, and writing in it fails.
+    """
+    async with next(read_session_makers)() as session:
+        await session.execute(text("SET TRANSACTION READ ONLY"))
+        yield session
+
+
+async def get_read_session_fastapi() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Returns a read-only SQLAlchemy session, for endpoints that only read.
+    """
+    async with get_read_session() as session:
+        yield session
 
-__all__ = ["SessionDep", "close_db", "get_engine", "get_session", "init_db"]
+
+SessionDep = Annotated[AsyncSession, Depends(get_session_fastapi)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session_fastapi)]
+
+__all__ = [
+    "ReadSessionDep",
+    "SessionDep",
+    "close_db",
+    "get_engine",
+    "get_read_session",
+    "get_session",
+    "init_db",
+]
@@ -1,7 +1,7 @@
 import dataclasses
 from collections.abc import Awaitable, Callable
 
-from app.core.rate_limiter import RateLimitKeyFunc, ip_based_key_func
+from app.core.rate_limiter import RateLimitAlgorithm, RateLimitCostFunc, RateLimitKeyFunc, ip_based_key_func
 
 
 @dataclasses.dataclass
@@ -14,6 +14,8 @@ class RateLimitMetadata:
     limit: int
     period: int
     key_func: RateLimitKeyFunc
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW
+    cost_func: RateLimitCostFunc | None = None
 
 
 @dataclasses.dataclass
@@ -72,11 +74,23 @@ def permission(permission: str | set[str] | None = None):
     return decorator
 
 
-def rate_limit(limit: int, period: int, key_func: RateLimitKeyFunc = ip_based_key_func):
+def rate_limit(
+    limit: int,
+    period: int,
+    key_func: RateLimitKeyFunc = ip_based_key_func,
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW,
+    cost: RateLimitCostFunc | None = None,
+):
     """
     Decorator to add rate limit metadata to an API endpoint.
+
+    :param cost: How many units of the limit a request consumes, a single unit if not set.
     """
 
+    rate_limit_meta = RateLimitMetadata(
+        limit=limit, period=period, key_func=key_func, algorithm=algorithm, cost_func=cost
+    )
+
     def decorator(func):
         meta = getattr(func, "__metadata__", None)
         if meta is not None:
@@ -84,11 +98,9 @@ def rate_limit(limit: int, period: int, key_func: RateLimitKeyFunc = ip_based_ke
                 raise ValueError(
                     f"Function {func.__name__} already has metadata but is not an EndpointMetadata instance"
                 )
-            meta = dataclasses.replace(
-                meta, rate_limit=RateLimitMetadata(limit=limit, period=period, key_func=key_func)
-            )
+            meta = dataclasses.replace(meta, rate_limit=rate_limit_meta)
         else:
-            meta = EndpointMetadata(rate_limit=RateLimitMetadata(limit=limit, period=period, key_func=key_func))
+            meta = EndpointMetadata(rate_limit=rate_limit_meta)
         setattr(func, "__metadata__", meta)
         return func
 
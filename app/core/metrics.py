@@ -0,0 +1,189 @@
+"""
+Prometheus metrics for the server.
+
+When running with multiple workers, point ``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable
+directory. Every worker then writes its samples into that directory and ``/metrics`` aggregates
+them, so the numbers are the same no matter which worker serves the scrape.
+"""
+
+import os
+import time
+from collections.abc import Callable, Coroutine, Iterable
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError, ResponseValidationError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.exceptions import HTTPException
+
+MULTIPROCESS_MODE = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+type RouteHandler = Callable[[Request], Coroutine[Any, Any, Response]]
+
+HTTP_REQUEST_DURATION = Histogram(
+    "wcs_http_request_duration_seconds",
+    "Latency of API requests, labelled by the route template",
+    ["method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "wcs_http_requests_total",
+    "Number of API requests, labelled by the route template and status code",
+    ["method", "route", "status"],
+)
+
+CACHE_REQUESTS = Counter(
+    "wcs_cache_requests_total",
+    "Number of cache lookups by result (hit or miss)",
+    ["result"],
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "wcs_redis_command_duration_seconds",
+    "Latency of Redis commands issued by the server",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+REDIS_CIRCUIT_STATE = Gauge(
+    "wcs_redis_circuit_state",
+    "State of the Redis circuit breaker (0 closed, 1 half-open, 2 open), the worst state of all workers",
+    multiprocess_mode="livemax",
+)
+REDIS_FALLBACKS = Counter(
+    "wcs_redis_fallbacks_total",
+    "Number of cache and rate limiter operations served in process because Redis was unavailable",
+    ["component"],
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "wcs_rate_limit_decisions_total",
+    "Number of rate limiter decisions, labelled by the route template",
+    ["route", "decision"],
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "wcs_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_POOL_IN_USE = Gauge(
+    "wcs_db_pool_connections_in_use",
+    "Number of connections currently checked out of the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "wcs_db_pool_connections_capacity",
+    "Maximum number of connections of the SQLAlchemy pool (size plus overflow)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "wcs_db_pool_timeouts_total",
+    "Number of times no connection became available in the SQLAlchemy pool before the pool timeout",
+)
+
+JOB_DURATION = Histogram(
+    "wcs_job_duration_seconds",
+    "Duration of scheduled jobs",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+POOL_CONSENSUS_DIRTY_POOLS = Gauge(
+    "wcs_pool_consensus_dirty_pools",
+    "Number of pools that needed a consensus recalculation in the last run",
+    multiprocess_mode="livemostrecent",
+)
+
+SUBMISSION_ITEMS = Counter(
+    "wcs_submission_items_total",
+    "Number of submitted items, labelled by submission kind and result (accepted or rejected)",
+    ["kind", "result"],
+)
+
+
+def route_label(request: Request) -> str:
+    """
+    Get the route template of a request (e.g. ``/api/v2/pool/pools/{pool_type}/{region}``).
+    Falls back to the raw path when the request has not been routed yet.
+    """
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
+def instrument_route_handler(handler: RouteHandler, route: str, methods: Iterable[str]) -> RouteHandler:
+    """
+    Wrap a route handler to record its latency and status code.
+    Histogram children are bound once per route, so the hot path only pays for a clock read and an observe.
+    """
+    durations = {method: HTTP_REQUEST_DURATION.labels(method, route) for method in methods}
+
+    async def instrumented_handler(request: Request) -> Response:
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status_code
+            return response
+        except HTTPException as e:
+            status = e.status_code
+            raise
+        except (RequestValidationError, ResponseValidationError):
+            # Answered with 422 by the exception handlers
+            status = 422
+            raise
+        finally:
+            duration = durations.get(request.method) or HTTP_REQUEST_DURATION.labels(request.method, route)
+            duration.observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
+
+    return instrumented_handler
+
+
+def render_metrics() -> bytes:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """
+    Remove the live gauges of the current process from the multiprocess directory.
+    """
+    if MULTIPROCESS_MODE:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+__all__ = [
+    "CACHE_REQUESTS",
+    "CONTENT_TYPE_LATEST",
+    "DB_POOL_CAPACITY",
+    "DB_POOL_CHECKOUT_WAIT",
+    "DB_POOL_IN_USE",
+    "DB_POOL_TIMEOUTS",
+    "HTTP_REQUESTS",
+    "HTTP_REQUEST_DURATION",
+    "JOB_DURATION",
+    "POOL_CONSENSUS_DIRTY_POOLS",
+    "RATE_LIMIT_DECISIONS",
+    "REDIS_CIRCUIT_STATE",
+    "REDIS_COMMAND_DURATION",
+    "REDIS_FALLBACKS",
+    "SUBMISSION_ITEMS",
+    "RouteHandler",
+    "instrument_route_handler",
+    "mark_process_dead",
+    "render_metrics",
+    "route_label",
+]
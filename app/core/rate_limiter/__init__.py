@@ -1,18 +1,91 @@
-from app.config.db import DB_CONFIG
+from collections.abc import Sequence
+
+from app.config import RATE_LIMIT_CONFIG
+from app.config.db import DB_CONFIG, RateLimiterBackend
 
 from .base import BaseRateLimiter as BaseRateLimiter
+from .base import RateLimitAlgorithm as RateLimitAlgorithm
+from .base import RateLimitCostFunc as RateLimitCostFunc
 from .base import RateLimitKeyFunc as RateLimitKeyFunc
+from .base import RateLimitResult as RateLimitResult
+from .base import RateLimitRule as RateLimitRule
+from .base import client_cap_key_func as client_cap_key_func
 from .base import ip_based_key_func as ip_based_key_func
+from .base import json_length_cost as json_length_cost
 from .base import user_based_key_func as user_based_key_func
-from .memory_rate_limiter import MemoryRateLimiter
-from .redis_rate_limiter import RedisRateLimiter
+from .base import user_cap_key_func as user_cap_key_func
+from .composite_rate_limiter import CompositeRateLimiter as CompositeRateLimiter
+from .composite_rate_limiter import SequentialRateLimiter
+from .composite_rate_limiter import limit_route_handler as limit_route_handler
+from .memory_rate_limiter import MemoryGCRARateLimiter, MemoryRateLimiter
+from .redis_rate_limiter import RedisCompositeRateLimiter, RedisGCRARateLimiter, RedisRateLimiter
+from .shared_memory_rate_limiter import SharedMemoryRateLimiter
+
+_RATE_LIMITERS: dict[RateLimiterBackend, dict[RateLimitAlgorithm, type[BaseRateLimiter]]] = {
+    RateLimiterBackend.REDIS: {
+        RateLimitAlgorithm.SLIDING_WINDOW: RedisRateLimiter,
+        RateLimitAlgorithm.GCRA: RedisGCRARateLimiter,
+    },
+    RateLimiterBackend.MEMORY: {
+        RateLimitAlgorithm.SLIDING_WINDOW: MemoryRateLimiter,
+        RateLimitAlgorithm.GCRA: MemoryGCRARateLimiter,
+    },
+    # The shared table only holds window counters, GCRA routes use them as well
+    RateLimiterBackend.SHARED_MEMORY: {
+        RateLimitAlgorithm.SLIDING_WINDOW: SharedMemoryRateLimiter,
+        RateLimitAlgorithm.GCRA: SharedMemoryRateLimiter,
+    },
+}
+
+
+def get_rate_limiter(algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW) -> type[BaseRateLimiter]:
+    """
+    Get the rate limiter implementing the algorithm on the configured backend.
+    """
+    return _RATE_LIMITERS[DB_CONFIG.rate_limiter_backend][algorithm]
+
+
+def cap_rules() -> list[RateLimitRule]:
+    """
+    Get the configured caps shared by all rate limited routes.
+    """
+    rules = []
+    if RATE_LIMIT_CONFIG.global_limit is not None:
+        rules.append(
+            RateLimitRule(RATE_LIMIT_CONFIG.global_limit, RATE_LIMIT_CONFIG.global_period, client_cap_key_func)
+        )
+    if RATE_LIMIT_CONFIG.user_limit is not None:
+        rules.append(RateLimitRule(RATE_LIMIT_CONFIG.user_limit, RATE_LIMIT_CONFIG.user_period, user_cap_key_func))
+    return rules
+
+
+def get_composite_rate_limiter(rules: Sequence[RateLimitRule]) -> CompositeRateLimiter:
+    """
+    Get a rate limiter evaluating all the rules on the configured backend.
+    """
+    if DB_CONFIG.rate_limiter_backend == RateLimiterBackend.REDIS:
+        return RedisCompositeRateLimiter(rules)
+    return SequentialRateLimiter(rules, get_rate_limiter)
+
 
-# export the only RateLimiter based on config
-RateLimiter: type[BaseRateLimiter] = MemoryRateLimiter if DB_CONFIG.redis_dsn is None else RedisRateLimiter
+# export the default RateLimiter based on config
+RateLimiter: type[BaseRateLimiter] = get_rate_limiter()
 
 __all__ = [
+    "CompositeRateLimiter",
+    "RateLimitAlgorithm",
+    "RateLimitCostFunc",
     "RateLimitKeyFunc",
+    "RateLimitResult",
+    "RateLimitRule",
     "RateLimiter",
+    "cap_rules",
+    "client_cap_key_func",
+    "get_composite_rate_limiter",
+    "get_rate_limiter",
     "ip_based_key_func",
+    "json_length_cost",
+    "limit_route_handler",
     "user_based_key_func",
+    "user_cap_key_func",
 ]
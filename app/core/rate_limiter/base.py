@@ -1,9 +1,39 @@
 import abc
-from collections.abc import Callable
+import dataclasses
+import enum
+import math
+from collections.abc import Awaitable, Callable, Sequence
 
-from fastapi import Request, Response
+import orjson
+from fastapi import HTTPException, Request, Response
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+
+from app.core.cache.warmup import is_warmup_request
+from app.core.metrics import RATE_LIMIT_DECISIONS, route_label
+from app.core.security.auth import API_KEY_HEADER, hash_token
+from app.core.security.principal import PRINCIPAL_CACHE
 
 type RateLimitKeyFunc = Callable[[Request], str]
+# Key function of a cap that may not apply to a request, returns None to skip it
+type OptionalRateLimitKeyFunc = Callable[[Request], str | None]
+# How many units of a limit a request consumes, evaluated before the request is handled
+type RateLimitCostFunc = Callable[[Request], Awaitable[int]]
+
+
+def _client_ip(request: Request) -> str:
+    return request.headers.get("X-Real-IP") or (request.client.host if request.client else "global")
+
+
+def _token_hash(request: Request) -> str | None:
+    """
+    Hash of the client's API key, if it belongs to a user recently authenticated in this process.
+    Unknown keys are ignored, otherwise a client sending a new key on each request would never be limited.
+    """
+    token = request.headers.get(API_KEY_HEADER)
+    if not token:
+        return None
+    token_hash = hash_token(token)
+    return token_hash if PRINCIPAL_CACHE.is_validated(token_hash) else None
 
 
 def ip_based_key_func(request: Request) -> str:
@@ -11,7 +41,7 @@ def ip_based_key_func(request: Request) -> str:
     Default key function that uses the client's IP address for rate limiting.
     If none of the above is available, it falls back to a global limit across all clients.
     """
-    ip = request.headers.get("X-Real-IP") or (request.client.host if request.client else "global")
+    ip = _client_ip(request)
     path = request.url.path
     method = request.method
     return f"rate_limiting:{method}:{path}:{ip}"
@@ -19,13 +49,145 @@ def ip_based_key_func(request: Request) -> str:
 
 def user_based_key_func(request: Request) -> str:
     """
-    Key function that uses the authenticated user's ID for rate limiting.
-    If the user is not authenticated, it falls back to a global limit across all clients.
+    Key function that uses the hash of the client's API key for rate limiting, so requests are
+    counted before the user is loaded. Requests without a validated API key are limited by IP.
     """
-    user_id = getattr(request.state, "user_id", None) or "global"
+    token_hash = _token_hash(request)
+    if token_hash is None:
+        return ip_based_key_func(request)
     path = request.url.path
     method = request.method
-    return f"rate_limiting:{method}:{path}:{user_id}"
+    return f"rate_limiting:{method}:{path}:user:{token_hash}"
+
+
+def client_cap_key_func(request: Request) -> str:
+    """
+    Key function of the cap shared by all rate limited routes for a client IP.
+    """
+    return f"rate_limiting:*:{_client_ip(request)}"
+
+
+def user_cap_key_func(request: Request) -> str | None:
+    """
+    Key function of the cap shared by all rate limited routes for a validated API key.
+    """
+    token_hash = _token_hash(request)
+    return f"rate_limiting:*:user:{token_hash}" if token_hash is not None else None
+
+
+def json_length_cost(field: str | None = None) -> RateLimitCostFunc:
+    """
+    Cost function charging the number of elements in a list of the JSON body,
+    either the body itself or one of its fields.
+
+    Malformed bodies cost a single unit, the request is rejected by validation afterwards.
+    """
+
+    async def cost(request: Request) -> int:
+        try:
+            body = orjson.loads(await request.body())
+            value = body if field is None else body[field]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            return 1
+        return len(value) if isinstance(value, list) else 1
+
+    return cost
+
+
+class RateLimitAlgorithm(enum.StrEnum):
+    # Weighted sum of the current and previous fixed windows, two counters per key and window
+    SLIDING_WINDOW = "sliding_window"
+    # Generic Cell Rate Algorithm, a single theoretical arrival time per key
+    GCRA = "gcra"
+
+
+@dataclasses.dataclass
+class RateLimitResult:
+    """
+    The outcome of counting one request against a limit.
+    """
+
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the limit resets
+    reset_after: float
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimitRule:
+    """
+    One limit that applies to a request, as evaluated by a composite rate limiter.
+    """
+
+    limit: int
+    period: int
+    key_func: OptionalRateLimitKeyFunc = ip_based_key_func
+    algorithm: RateLimitAlgorithm = RateLimitAlgorithm.SLIDING_WINDOW
+    # Requests cost a single unit if not set
+    cost_func: RateLimitCostFunc | None = None
+
+
+def most_restrictive(results: Sequence[RateLimitResult]) -> RateLimitResult:
+    """
+    Combine the results of all limits of a request: the request is denied by any limit,
+    and the headers describe the limit closest to being exceeded.
+    """
+    denied = [result for result in results if not result.allowed]
+    if denied:
+        return max(denied, key=lambda result: result.reset_after)
+    return min(results, key=lambda result: (result.remaining, -result.reset_after))
+
+
+def rate_limit_headers(result: RateLimitResult) -> dict[str, str]:
+    reset_after = str(math.ceil(result.reset_after))
+    if not result.allowed:
+        return {
+            "X-RateLimit-Limit": str(result.limit),
+            "X-RateLimit-Reset": reset_after,
+            "X-RateLimit-Remaining": "0",
+            "Retry-After": reset_after,
+        }
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Reset": reset_after,
+        "X-RateLimit-Remaining": str(max(0, result.remaining)),
+    }
+
+
+def enforce(request: Request, result: RateLimitResult) -> dict[str, str]:
+    """
+    Reject the request if it was denied.
+
+    :return: The rate limit headers to add to the response.
+    """
+    if not result.allowed:
+        RATE_LIMIT_DECISIONS.labels(route_label(request), "deny").inc()
+        raise HTTPException(HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests", headers=rate_limit_headers(result))
+
+    RATE_LIMIT_DECISIONS.labels(route_label(request), "allow").inc()
+    return rate_limit_headers(result)
+
+
+def gcra(tat: float | None, now: float, limit: int, period: int, cost: int = 1) -> tuple[RateLimitResult, float | None]:
+    """
+    Evaluate the Generic Cell Rate Algorithm for one request.
+
+    Units are spaced ``period / limit`` seconds apart on a virtual schedule, and bursts of up to
+    ``limit`` units are tolerated. ``tat`` is the theoretical arrival time stored for the key.
+
+    :return: The result and the new theoretical arrival time to store, ``None`` if the request is denied.
+    """
+    interval = period / limit
+    tat = max(tat or now, now)
+    new_tat = tat + cost * interval
+    allow_at = new_tat - period
+
+    if now < allow_at:
+        return RateLimitResult(allowed=False, limit=limit, remaining=0, reset_after=allow_at - now), None
+
+    remaining = math.floor((period - (new_tat - now)) / interval + 1e-9)
+    return RateLimitResult(allowed=True, limit=limit, remaining=remaining, reset_after=new_tat - now), new_tat
 
 
 class BaseRateLimiter(abc.ABC):
@@ -38,6 +200,16 @@ class BaseRateLimiter(abc.ABC):
         self.period = period
         self.key_func = key_func
 
-    @abc.abstractmethod
     async def __call__(self, request: Request, response: Response) -> Response:
-        pass
+        if is_warmup_request(request):
+            return response
+
+        response.headers.update(enforce(request, await self.hit(self.key_func(request))))
+        return response
+
+    @abc.abstractmethod
+    async def hit(self, key: str, cost: int = 1) -> RateLimitResult:
+        """
+        Count ``cost`` units for the given key, unless the key would exceed its limit.
+        """
+        ...
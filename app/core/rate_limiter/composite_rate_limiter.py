@@ -0,0 +1,216 @@
+import abc
+import dataclasses
+from collections.abc import Callable, Sequence
+from typing import ClassVar
+
+from fastapi import Request, Response
+
+from app.core.cache.warmup import is_warmup_request
+from app.core.metrics import RouteHandler
+
+from .base import BaseRateLimiter, RateLimitAlgorithm, RateLimitResult, RateLimitRule, enforce, most_restrictive
+
+type RateLimitHit = tuple[RateLimitRule, str]
+
+
+class CompositeRateLimiter(abc.ABC):
+    """
+    Rate limiter checking every limit that applies to a request: the limit of the route itself
+    and the caps shared by all rate limited routes. The headers describe the most restrictive limit.
+    """
+
+    rules: tuple[RateLimitRule, ...]
+
+    def __init__(self, rules: Sequence[RateLimitRule]):
+        self.rules = tuple(rules)
+
+    async def check(self, request: Request) -> RateLimitResult | None:
+        """
+        Count the request against all limits that apply to it.
+
+        :return: The most restrictive result, or ``None`` if no limit applies.
+        """
+        if is_warmup_request(request):
+            return None
+
+        hits = [(rule, key) for rule in self.rules if (key := rule.key_func(request)) is not None]
+        if not hits:
+            return None
+        costs = [await self.cost(rule, request) for rule, _ in hits]
+        return most_restrictive(await self.hit_all(hits, costs))
+
+    @staticmethod
+    async def cost(rule: RateLimitRule, request: Request) -> int:
+        """
+        Get the cost of the request for a limit. Requests cost at least one unit,
+        and at most the whole limit so that large requests can still pass once the limit is reset.
+        """
+        if rule.cost_func is None:
+            return 1
+        return min(max(1, await rule.cost_func(request)), rule.limit)
+
+    @abc.abstractmethod
+    async def hit_all(self, hits: Sequence[RateLimitHit], costs: Sequence[int]) -> list[RateLimitResult]:
+        """
+        Count the cost of the request against every limit and key, unless any of them would exceed its limit.
+        """
+        ...
+
+
+class SequentialRateLimiter(CompositeRateLimiter):
+    """
+    Composite rate limiter evaluating each limit with a single-key limiter, used by the in-process backends.
+
+    Limits are counted in order until one of them denies the request, limits counted before stay counted.
+    """
+
+    # Shared by all routes, so caps count the requests of every route
+    _limiters: ClassVar[dict[RateLimitRule, BaseRateLimiter]] = {}
+
+    get_limiter: Callable[[RateLimitAlgorithm], type[BaseRateLimiter]]
+
+    def __init__(
+        self, rules: Sequence[RateLimitRule], get_limiter: Callable[[RateLimitAlgorithm], type[BaseRateLimiter]]
+    ):
+        super().__init__(rules)
+        self.get_limiter = get_limiter
+
+    async def hit_all(self, hits: Sequence[RateLimitHit], costs: Sequence[int]) -> list[RateLimitResult]:
+        results = []
+        for (rule, key), cost in zip(hits, costs, strict=True):
+            limiter = self._limiters.get(rule)
+            if limiter is None:
+                limiter = self._limiters[rule] = self.get_limiter(rule.algorithm)(rule.limit, rule.period)
+
+            result = await limiter.hit(key, cost)
+            results.append(result)
+            if not result.allowed:
+                break
+        return results
+
+
+def limit_route_handler(handler: RouteHandler, limiter: CompositeRateLimiter) -> RouteHandler:
+    """
+    Wrap a route handler to enforce the rate limits before its dependencies are resolved,
+    so requests over the limit are rejected without authenticating the user or opening a session.
+    """
+
+    async def limited_handler(request: Request) -> Response:
+        result = await limiter.check(request)
+        if result is None:
+            return await handler(request)
+
+        headers = enforce(request, result)
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    return limited_handler
+
+
+@dataclasses.dataclass
+class _LocalEntry:
+    rule: RateLimitRule
+    remaining: int
+    reset_at: float
+    synced_at: float
+    # Requests allowed locally that have not been synced yet
+    pending: int = 0
+
+
+class LocalRateLimitCounter:
+    """
+    Approximate per-process counts of keys that are far below their limits.
+
+    The counter remembers what remained of each limit the last time Redis evaluated it. While more than
+    ``threshold`` of the limit would still remain after the requests counted locally since, requests are
+    allowed without a round trip and their counts are synced to Redis in the background.
+    Other workers count the same keys in the meantime, the threshold leaves room for them,
+    and keys close to their limits are always evaluated by Redis.
+    """
+
+    threshold: float
+    max_age: float
+    _entries: dict[str, _LocalEntry]
+
+    def __init__(self, threshold: float, max_age: float):
+        self.threshold = threshold
+        self.max_age = max_age
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def try_hit(self, hits: Sequence[RateLimitHit], costs: Sequence[int], now: float) -> list[RateLimitResult] | None:
+        """
+        Count the request locally if every key is far enough below its limit.
+
+        :return: The results, or ``None`` if the request has to be evaluated by Redis.
+        """
+        entries = []
+        for (rule, key), cost in zip(hits, costs, strict=True):
+            entry = self._entries.get(key)
+            if (
+                entry is None
+                or now - entry.synced_at > self.max_age
+                or entry.remaining - entry.pending - cost < rule.limit * self.threshold
+            ):
+                return None
+            entries.append(entry)
+
+        results = []
+        for (rule, _), cost, entry in zip(hits, costs, entries, strict=True):
+            entry.pending += cost
+            results.append(
+                RateLimitResult(
+                    allowed=True,
+                    limit=rule.limit,
+                    remaining=entry.remaining - entry.pending,
+                    reset_after=max(0.0, entry.reset_at - now),
+                )
+            )
+        return results
+
+    def take_pending(self, key: str) -> int:
+        """
+        Take the unsynced count of a key, to be sent along with the next evaluation by Redis.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        pending, entry.pending = entry.pending, 0
+        return pending
+
+    def restore(self, pending: Sequence[tuple[RateLimitHit, int]]) -> None:
+        """
+        Put back unsynced counts that could not be sent to Redis, to be sent with the next evaluation or sync.
+        """
+        for (_, key), count in pending:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.pending += count
+
+    def update(self, hits: Sequence[RateLimitHit], results: Sequence[RateLimitResult], now: float) -> None:
+        """
+        Remember the results of an evaluation by Redis.
+        """
+        for (rule, key), result in zip(hits, results, strict=True):
+            remaining = result.remaining if result.allowed else 0
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _LocalEntry(rule, remaining, now + result.reset_after, now)
+            else:
+                entry.remaining, entry.reset_at, entry.synced_at = remaining, now + result.reset_after, now
+
+    def drain(self, now: float) -> list[tuple[RateLimitHit, int]]:
+        """
+        Take the unsynced counts of all keys and forget keys that were not evaluated recently.
+        """
+        drained = []
+        for key, entry in list(self._entries.items()):
+            if entry.pending > 0:
+                drained.append(((entry.rule, key), entry.pending))
+                entry.pending = 0
+            elif now - entry.synced_at > self.max_age:
+                del self._entries[key]
+        return drained
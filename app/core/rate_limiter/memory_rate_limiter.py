@@ -1,10 +1,7 @@
 import math
 import time
 
-from fastapi import HTTPException, Request, Response
-from starlette.status import HTTP_429_TOO_MANY_REQUESTS
-
-from .base import BaseRateLimiter, RateLimitKeyFunc, ip_based_key_func
+from .base import BaseRateLimiter, RateLimitKeyFunc, RateLimitResult, gcra, ip_based_key_func
 
 
 class MemoryRateLimiter(BaseRateLimiter):
@@ -28,8 +25,7 @@ class MemoryRateLimiter(BaseRateLimiter):
         self.current_counts = {}
         self.current_window = window
 
-    async def __call__(self, request: Request, response: Response) -> Response:
-        key = self.key_func(request)
+    async def hit(self, key: str, cost: int = 1) -> RateLimitResult:
         now = time.time()
         window = int(now // self.period)
         elapsed_ratio = (now % self.period) / self.period
@@ -42,25 +38,39 @@ class MemoryRateLimiter(BaseRateLimiter):
 
         reset_after = self.period - (now % self.period)
 
-        response.headers["X-RateLimit-Limit"] = str(self.limit)
-        response.headers["X-RateLimit-Reset"] = str(math.ceil(reset_after))
-
-        if estimated >= self.limit:
-            response.headers["X-RateLimit-Remaining"] = "0"
-            response.headers["Retry-After"] = str(math.ceil(reset_after))
-            raise HTTPException(
-                HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many requests",
-                headers={
-                    "X-RateLimit-Limit": str(self.limit),
-                    "X-RateLimit-Reset": str(math.ceil(reset_after)),
-                    "X-RateLimit-Remaining": "0",
-                    "Retry-After": str(math.ceil(reset_after)),
-                },
-            )
-
-        self.current_counts[key] = curr + 1
-        remaining = self.limit - math.ceil(prev * (1 - elapsed_ratio) + curr + 1)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, remaining))
-
-        return response
+        if estimated + cost - 1 >= self.limit:
+            return RateLimitResult(allowed=False, limit=self.limit, remaining=0, reset_after=reset_after)
+
+        self.current_counts[key] = curr + cost
+        remaining = self.limit - math.ceil(prev * (1 - elapsed_ratio) + curr + cost)
+        return RateLimitResult(allowed=True, limit=self.limit, remaining=remaining, reset_after=reset_after)
+
+
+class MemoryGCRARateLimiter(BaseRateLimiter):
+    """
+    GCRA rate limiter keeping one theoretical arrival time per key in process memory.
+    """
+
+    # Keys whose arrival time has passed hold no state and are pruned once the table grows past this size
+    PRUNE_THRESHOLD = 1024
+
+    tats: dict[str, float]
+
+    def __init__(self, times: int, seconds: int, key_func: RateLimitKeyFunc = ip_based_key_func):
+        super().__init__(times, seconds, key_func)
+        self.tats = {}
+        self._prune_at = self.PRUNE_THRESHOLD
+
+    def _prune(self, now: float):
+        self.tats = {key: tat for key, tat in self.tats.items() if tat > now}
+        self._prune_at = max(self.PRUNE_THRESHOLD, len(self.tats) * 2)
+
+    async def hit(self, key: str, cost: int = 1) -> RateLimitResult:
+        now = time.time()
+        if len(self.tats) >= self._prune_at:
+            self._prune(now)
+
+        result, new_tat = gcra(self.tats.get(key), now, self.limit, self.period, cost)
+        if new_tat is not None:
+            self.tats[key] = new_tat
+        return result
@@ -1,20 +1,34 @@
-import math
+import itertools
 import time
+from collections.abc import Sequence
 
-from fastapi import HTTPException, Request, Response
+from apscheduler.triggers.interval import IntervalTrigger
 from redis.asyncio.client import Redis
 from redis.commands.core import AsyncScript
-from starlette.status import HTTP_429_TOO_MANY_REQUESTS
 
-from app.core.db.redis import RedisClient
+from app.config import RATE_LIMIT_CONFIG
+from app.core.db.redis import RedisClient, RedisUnavailableError
+from app.core.log import LOGGER
+from app.core.metrics import REDIS_COMMAND_DURATION, REDIS_FALLBACKS
+from app.core.scheduler import SCHEDULER
 
-from .base import BaseRateLimiter, RateLimitKeyFunc, ip_based_key_func
+from .base import (
+    BaseRateLimiter,
+    RateLimitAlgorithm,
+    RateLimitKeyFunc,
+    RateLimitResult,
+    RateLimitRule,
+    ip_based_key_func,
+)
+from .composite_rate_limiter import CompositeRateLimiter, LocalRateLimitCounter, RateLimitHit, SequentialRateLimiter
+from .memory_rate_limiter import MemoryGCRARateLimiter, MemoryRateLimiter
 
 LUA_SLIDING_WINDOW = """
 local key_prefix = KEYS[1]
 local limit = tonumber(ARGV[1])
 local window_size = tonumber(ARGV[2])
 local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4] or "1")
 
 local current_window = math.floor(now / window_size)
 local elapsed_ratio = (now % window_size) / window_size
@@ -26,13 +40,13 @@ local prev_count = tonumber(redis.call("GET", prev_key) or "0")
 local curr_count = tonumber(redis.call("GET", curr_key) or "0")
 local estimated = prev_count * (1 - elapsed_ratio) + curr_count
 
-if estimated >= limit then
+if estimated + cost - 1 >= limit then
     local reset_after = math.ceil(window_size - (now % window_size))
     return {-1, reset_after}
 end
 
-curr_count = redis.call("INCR", curr_key)
-if curr_count == 1 then
+curr_count = redis.call("INCRBY", curr_key, cost)
+if curr_count == cost then
     redis.call("EXPIRE", curr_key, window_size * 2)
 end
 
@@ -42,10 +56,138 @@ local reset_after = math.ceil(window_size - (now % window_size))
 return {remaining, reset_after}
 """
 
+# Generic Cell Rate Algorithm, see `base.gcra`. The key holds only the theoretical arrival time (TAT)
+# and expires once it lies in the past, so each allowed request costs a single GET and SET.
+# Floats are returned as strings since Redis truncates Lua numbers to integers.
+LUA_GCRA = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4] or "1")
+
+local interval = period / limit
+local tat = math.max(tonumber(redis.call("GET", key) or "0"), now)
+local new_tat = tat + cost * interval
+local allow_at = new_tat - period
+
+if now < allow_at then
+    return {-1, tostring(allow_at - now)}
+end
+
+redis.call("SET", key, string.format("%.6f", new_tat), "PX", math.ceil((new_tat - now) * 1000))
+
+local remaining = math.floor((period - (new_tat - now)) / interval + 1e-9)
+return {remaining, tostring(new_tat - now)}
+"""
+
+# Evaluates all limits of a request atomically, with the same keys and values as the scripts above.
+# ARGV[1] is the current time, followed by five arguments per key: algorithm, limit, period, the cost of
+# the request, and the number of requests allowed locally since the last call, which is counted unconditionally.
+# The request is only counted if no limit denies it. Returns the remaining count (-1 if denied) and
+# the seconds until reset of each key, the latter as a string since Redis truncates Lua numbers to integers.
+LUA_COMPOSITE = """
+local now = tonumber(ARGV[1])
+local limits = {}
+local denied = false
+
+for i, key in ipairs(KEYS) do
+    local offset = 1 + (i - 1) * 5
+    local l = {
+        algorithm = ARGV[offset + 1],
+        limit = tonumber(ARGV[offset + 2]),
+        period = tonumber(ARGV[offset + 3]),
+        cost = tonumber(ARGV[offset + 4]),
+        pending = tonumber(ARGV[offset + 5]),
+    }
+
+    if l.algorithm == "gcra" then
+        l.interval = l.period / l.limit
+        l.tat = math.max(tonumber(redis.call("GET", key) or "0"), now) + l.pending * l.interval
+        local allow_at = l.tat + l.cost * l.interval - l.period
+        if l.cost > 0 and now < allow_at then
+            l.denied_for = allow_at - now
+        end
+    else
+        local window = math.floor(now / l.period)
+        l.ratio = (now % l.period) / l.period
+        l.curr_key = key .. ":" .. window
+        l.prev = tonumber(redis.call("GET", key .. ":" .. (window - 1)) or "0")
+        l.curr = tonumber(redis.call("GET", l.curr_key) or "0")
+        if l.pending > 0 then
+            l.curr = redis.call("INCRBY", l.curr_key, l.pending)
+            redis.call("EXPIRE", l.curr_key, l.period * 2)
+        end
+        if l.cost > 0 and l.prev * (1 - l.ratio) + l.curr + l.cost - 1 >= l.limit then
+            l.denied_for = l.period - (now % l.period)
+        end
+    end
+
+    denied = denied or l.denied_for ~= nil
+    limits[i] = l
+end
+
+local result = {}
+for i, key in ipairs(KEYS) do
+    local l = limits[i]
+    local cost = l.cost
+    if denied then
+        cost = 0
+    end
+
+    local remaining, reset_after
+    if l.algorithm == "gcra" then
+        local new_tat = l.tat + cost * l.interval
+        if cost + l.pending > 0 and new_tat > now then
+            redis.call("SET", key, string.format("%.6f", new_tat), "PX", math.ceil((new_tat - now) * 1000))
+        end
+        remaining = math.floor((l.period - (new_tat - now)) / l.interval + 1e-9)
+        reset_after = new_tat - now
+    else
+        if cost > 0 then
+            l.curr = redis.call("INCRBY", l.curr_key, cost)
+            if l.curr == cost then
+                redis.call("EXPIRE", l.curr_key, l.period * 2)
+            end
+        end
+        remaining = math.floor(l.limit - (l.prev * (1 - l.ratio) + l.curr))
+        reset_after = l.period - (now % l.period)
+    end
+
+    if l.denied_for ~= nil then
+        table.insert(result, -1)
+        table.insert(result, tostring(l.denied_for))
+    else
+        table.insert(result, math.max(0, remaining))
+        table.insert(result, tostring(reset_after))
+    end
+end
+return result
+"""
+
+# Keys per script call when syncing local counts
+SYNC_BATCH_SIZE = 100
+
+_script_duration = REDIS_COMMAND_DURATION.labels("evalsha")
+_fallbacks = REDIS_FALLBACKS.labels("rate_limit")
+
+# Per-process limiters used while Redis is unavailable
+_FALLBACK_RATE_LIMITERS: dict[RateLimitAlgorithm, type[BaseRateLimiter]] = {
+    RateLimitAlgorithm.SLIDING_WINDOW: MemoryRateLimiter,
+    RateLimitAlgorithm.GCRA: MemoryGCRARateLimiter,
+}
+
 
 class RedisRateLimiter(BaseRateLimiter):
+    """
+    Sliding window rate limiter stored in Redis, counting in process while Redis is unavailable.
+    """
+
+    algorithm = RateLimitAlgorithm.SLIDING_WINDOW
+
     _redis: Redis | None = None
     _script: AsyncScript | None = None
+    fallback: BaseRateLimiter
 
     @property
     def redis(self) -> Redis:
@@ -61,32 +203,150 @@ class RedisRateLimiter(BaseRateLimiter):
 
     def __init__(self, times: int, seconds: int, key_func: RateLimitKeyFunc = ip_based_key_func):
         super().__init__(times, seconds, key_func)
+        self.fallback = _FALLBACK_RATE_LIMITERS[self.algorithm](times, seconds, key_func)
+
+    async def hit(self, key: str, cost: int = 1) -> RateLimitResult:
+        try:
+            return await RedisClient.breaker.call(lambda: self._hit(key, cost))
+        except RedisUnavailableError:
+            _fallbacks.inc()
+            return await self.fallback.hit(key, cost)
 
-    async def __call__(self, request: Request, response: Response) -> Response:
+    async def _hit(self, key: str, cost: int) -> RateLimitResult:
+        now = time.time()
+        with _script_duration.time():
+            result = await self.script(keys=[key], args=[self.limit, self.period, now, cost])
+        remaining, reset_after = int(result[0]), float(result[1])
+
+        if remaining < 0:
+            return RateLimitResult(allowed=False, limit=self.limit, remaining=0, reset_after=reset_after)
+        return RateLimitResult(allowed=True, limit=self.limit, remaining=remaining, reset_after=reset_after)
 
-        key = self.key_func(request)
 
+class RedisGCRARateLimiter(RedisRateLimiter):
+    """
+    GCRA rate limiter storing a single theoretical arrival time per key in Redis.
+    """
+
+    algorithm = RateLimitAlgorithm.GCRA
+
+    _script: AsyncScript | None = None
+
+    @property
+    def script(self) -> AsyncScript:
+        if self._script is None:
+            self._script = self.redis.register_script(LUA_GCRA)
+        return self._script
+
+
+class RedisCompositeRateLimiter(CompositeRateLimiter):
+    """
+    Composite rate limiter evaluating all limits of a request in a single script call.
+
+    With ``RATE_LIMIT_LOCAL_PRECHECK`` enabled, requests to keys far below their limits are counted
+    in process instead and synced by `sync_local_rate_limits`.
+    While Redis is unavailable, all limits are counted in process.
+    """
+
+    _script: AsyncScript | None = None
+    fallback: SequentialRateLimiter
+
+    # Shared by all routes of the process
+    local: LocalRateLimitCounter | None = (
+        LocalRateLimitCounter(RATE_LIMIT_CONFIG.local_threshold, RATE_LIMIT_CONFIG.sync_interval * 2)
+        if RATE_LIMIT_CONFIG.local_precheck
+        else None
+    )
+
+    def __init__(self, rules: Sequence[RateLimitRule]):
+        super().__init__(rules)
+        self.fallback = SequentialRateLimiter(rules, _FALLBACK_RATE_LIMITERS.__getitem__)
+
+    @classmethod
+    async def evaluate(
+        cls, hits: Sequence[RateLimitHit], costs: Sequence[int], pending: Sequence[int], now: float
+    ) -> list[RateLimitResult]:
+        """
+        Count ``costs`` and the locally allowed ``pending`` requests of each key in one script call.
+
+        :raises RedisUnavailableError: If Redis failed or the circuit is open.
+        """
+        args: list[str | int | float] = [now]
+        for (rule, _), cost, count in zip(hits, costs, pending, strict=True):
+            args += [rule.algorithm.value, rule.limit, rule.period, cost, count]
+
+        async def run():
+            if cls._script is None:
+                cls._script = RedisClient.get_instance().register_script(LUA_COMPOSITE)
+            with _script_duration.time():
+                return await cls._script(keys=[key for _, key in hits], args=args)
+
+        result = await RedisClient.breaker.call(run)
+
+        return [
+            RateLimitResult(
+                allowed=int(remaining) >= 0,
+                limit=rule.limit,
+                remaining=max(0, int(remaining)),
+                reset_after=float(reset_after),
+            )
+            for (rule, _), remaining, reset_after in zip(hits, result[::2], result[1::2], strict=True)
+        ]
+
+    async def hit_all(self, hits: Sequence[RateLimitHit], costs: Sequence[int]) -> list[RateLimitResult]:
+        try:
+            return await self._hit_all(hits, costs)
+        except RedisUnavailableError:
+            _fallbacks.inc()
+            return await self.fallback.hit_all(hits, costs)
+
+    async def _hit_all(self, hits: Sequence[RateLimitHit], costs: Sequence[int]) -> list[RateLimitResult]:
         now = time.time()
-        result = await self.script(keys=[key], args=[self.limit, self.period, now])
-        remaining, reset_after = int(result[0]), int(result[1])
+        if self.local is None:
+            return await self.evaluate(hits, costs, [0] * len(hits), now)
 
-        response.headers["X-RateLimit-Limit"] = str(self.limit)
-        response.headers["X-RateLimit-Reset"] = str(reset_after)
+        results = self.local.try_hit(hits, costs, now)
+        if results is not None:
+            return results
 
-        if remaining < 0:
-            response.headers["X-RateLimit-Remaining"] = "0"
-            response.headers["Retry-After"] = str(reset_after)
-            raise HTTPException(
-                HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many requests",
-                headers={
-                    "X-RateLimit-Limit": str(self.limit),
-                    "X-RateLimit-Reset": str(math.ceil(reset_after)),
-                    "X-RateLimit-Remaining": "0",
-                    "Retry-After": str(math.ceil(reset_after)),
-                },
+        pending = [self.local.take_pending(key) for _, key in hits]
+        try:
+            results = await self.evaluate(hits, costs, pending, now)
+        except RedisUnavailableError:
+            self.local.restore(list(zip(hits, pending, strict=True)))
+            raise
+        self.local.update(hits, results, now)
+        return results
+
+
+async def sync_local_rate_limits():
+    """
+    Send the counts of requests allowed locally to Redis and refresh what remains of their limits.
+    """
+    local = RedisCompositeRateLimiter.local
+    if local is None:
+        return
+
+    now = time.time()
+    drained = local.drain(now)
+    for batch in itertools.batched(drained, SYNC_BATCH_SIZE):
+        hits = [hit for hit, _ in batch]
+        try:
+            results = await RedisCompositeRateLimiter.evaluate(
+                hits, [0] * len(hits), [count for _, count in batch], now
             )
+        except Exception as e:
+            LOGGER.warning(f"Failed to sync {len(hits)} local rate limit counts: {e}")
+            local.restore(batch)
+            continue
+        local.update(hits, results, now)
 
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
 
-        return response
+if RATE_LIMIT_CONFIG.local_precheck:
+    SCHEDULER.add_job(
+        sync_local_rate_limits,
+        IntervalTrigger(seconds=RATE_LIMIT_CONFIG.sync_interval),
+        id="sync_local_rate_limits",
+        misfire_grace_time=10,
+        coalesce=True,
+    )
@@ -0,0 +1,121 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+
+from app.config import DB_CONFIG
+
+from .base import BaseRateLimiter, RateLimitKeyFunc, RateLimitResult, ip_based_key_func
+
+# key hash, window index, current count, previous count
+_SLOT = struct.Struct("<QqII")
+# Keys are hashed into buckets of a few slots, each bucket is locked as a whole
+_BUCKET_SLOTS = 8
+_BUCKET_SIZE = _SLOT.size * _BUCKET_SLOTS
+
+
+def _hash_key(key: str) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedWindowTable:
+    """
+    A fixed-size hash table of sliding window counters in a memory-mapped file.
+
+    Every worker on the host maps the same file, so they all see the same counters.
+    Each bucket is guarded by a ``fcntl`` record lock on its byte range, which makes
+    the read-modify-write of a counter atomic across processes without any network hop.
+    When a bucket is full, the slot with the oldest window is reused.
+    """
+
+    path: str
+    buckets: int
+
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        self.buckets = max(1, math.ceil(slots / _BUCKET_SLOTS))
+        size = self.buckets * _BUCKET_SIZE
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def hit(self, key: str, limit: int, period: int, now: float, cost: int = 1) -> RateLimitResult:
+        """
+        Count ``cost`` units for the key in the sliding window of ``period`` seconds.
+        """
+        key_hash = _hash_key(f"{key}:{period}")
+        bucket_offset = (key_hash % self.buckets) * _BUCKET_SIZE
+
+        window = int(now // period)
+        elapsed_ratio = (now % period) / period
+        reset_after = period - (now % period)
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _BUCKET_SIZE, bucket_offset)
+        try:
+            offset = self._find_slot(bucket_offset, key_hash, window)
+            stored_hash, stored_window, curr, prev = _SLOT.unpack_from(self._map, offset)
+
+            if stored_hash != key_hash or stored_window < window - 1:
+                prev, curr = 0, 0
+            elif stored_window == window - 1:
+                prev, curr = curr, 0
+
+            estimated = prev * (1 - elapsed_ratio) + curr
+            if estimated + cost - 1 >= limit:
+                return RateLimitResult(allowed=False, limit=limit, remaining=0, reset_after=reset_after)
+
+            _SLOT.pack_into(self._map, offset, key_hash, window, curr + cost, prev)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _BUCKET_SIZE, bucket_offset)
+
+        remaining = limit - math.ceil(prev * (1 - elapsed_ratio) + curr + cost)
+        return RateLimitResult(allowed=True, limit=limit, remaining=remaining, reset_after=reset_after)
+
+    def _find_slot(self, bucket_offset: int, key_hash: int, window: int) -> int:
+        """
+        Get the slot holding the key, or else the slot to reuse for it: an empty or expired one,
+        falling back to the slot with the oldest window.
+        """
+        victim, victim_window = bucket_offset, None
+        for offset in range(bucket_offset, bucket_offset + _BUCKET_SIZE, _SLOT.size):
+            stored_hash, stored_window, _, _ = _SLOT.unpack_from(self._map, offset)
+            if stored_hash == key_hash:
+                return offset
+            if stored_hash == 0 or stored_window < window - 1:
+                stored_window = -1
+            if victim_window is None or stored_window < victim_window:
+                victim, victim_window = offset, stored_window
+        return victim
+
+
+class SharedMemoryRateLimiter(BaseRateLimiter):
+    """
+    Sliding window rate limiter shared by all workers of the host through a memory-mapped table.
+    """
+
+    _table: SharedWindowTable | None = None
+
+    @property
+    def table(self) -> SharedWindowTable:
+        # One table per process, shared by every limiter
+        if SharedMemoryRateLimiter._table is None:
+            SharedMemoryRateLimiter._table = SharedWindowTable(
+                DB_CONFIG.rate_limit_shm_path, DB_CONFIG.rate_limit_shm_slots
+            )
+        return SharedMemoryRateLimiter._table
+
+    def __init__(self, times: int, seconds: int, key_func: RateLimitKeyFunc = ip_based_key_func):
+        super().__init__(times, seconds, key_func)
+
+    async def hit(self, key: str, cost: int = 1) -> RateLimitResult:
+        return self.table.hit(key, self.limit, self.period, time.time(), cost)
@@ -8,16 +8,28 @@ from fastapi import Depends, Request, Response, params
 from fastapi.routing import APIRoute
 from starlette.routing import get_name
 
-from app.core.cache import cached
+from app.core.cache import cache_route_handler, cached
 from app.core.metadata import EndpointMetadata
+from app.core.metrics import RouteHandler, instrument_route_handler
 from app.core.openapi import CACHE_DOCS, RATE_LIMIT_DOCS
-from app.core.rate_limiter import RateLimiter, user_based_key_func
-from app.core.security.auth import depends_permission, get_user
+from app.core.rate_limiter import (
+    CompositeRateLimiter,
+    RateLimitAlgorithm,
+    RateLimitRule,
+    cap_rules,
+    get_composite_rate_limiter,
+    limit_route_handler,
+    user_based_key_func,
+)
+from app.core.security.auth import depends_permission
 from app.schemas.constants import INJECTED_NAMESPACE
 from app.utils.time_utils import format_time
 
 
 class DocedAPIRoute(APIRoute):
+    rate_limiter: CompositeRateLimiter | None
+    cache_expire: int | None
+
     def __init__(
         self,
         path: str,
@@ -38,6 +50,27 @@ class DocedAPIRoute(APIRoute):
         # meta related processing
         meta: EndpointMetadata = getattr(endpoint, "__metadata__", EndpointMetadata())
 
+        # Rate limits are enforced by the route handler before dependencies are resolved,
+        # so they are set up even if the metadata has been processed already
+        self.rate_limiter = None
+        if meta.rate_limit:
+            self.rate_limiter = get_composite_rate_limiter(
+                [
+                    RateLimitRule(
+                        meta.rate_limit.limit,
+                        meta.rate_limit.period,
+                        meta.rate_limit.key_func,
+                        meta.rate_limit.algorithm,
+                        meta.rate_limit.cost_func,
+                    ),
+                    *cap_rules(),
+                ]
+            )
+
+        # Responses of routes without permissions are cached by the route handler, before dependencies are resolved.
+        # Routes with permissions cache in the endpoint, so the user is always authorized first.
+        self.cache_expire = meta.cache.expire if meta.cache and not meta.permission else None
+
         if meta.processed:
             super().__init__(
                 path,
@@ -59,7 +92,8 @@ class DocedAPIRoute(APIRoute):
 
         # Inject caching
         if meta.cache:
-            endpoint = cached(expire=meta.cache.expire)(self.inject_sig(endpoint))
+            if self.cache_expire is None:
+                endpoint = cached(expire=meta.cache.expire)(self.inject_sig(endpoint))
 
             for status_code, doc in CACHE_DOCS.items():
                 if status_code not in responses:
@@ -91,7 +125,7 @@ class DocedAPIRoute(APIRoute):
 
             dependencies = [*list(dependencies or []), Depends(depends_permission(meta.permission))]
 
-        # Add rate limit docs and inject rate limit dependency
+        # Add rate limit docs
         if meta.rate_limit:
             for status_code, doc in RATE_LIMIT_DOCS.items():
                 if status_code not in responses:
@@ -106,19 +140,13 @@ class DocedAPIRoute(APIRoute):
 
             description = self.add_description(
                 f"⏱️ Rate Limited: `{meta.rate_limit.limit}` requests per `{format_time(meta.rate_limit.period)}` "
-                + f" based on {'user' if meta.rate_limit.key_func == user_based_key_func else 'IP'}.",
+                + f" based on {'user' if meta.rate_limit.key_func == user_based_key_func else 'IP'}"
+                + (" (GCRA)." if meta.rate_limit.algorithm == RateLimitAlgorithm.GCRA else ".")
+                + (" Batched requests count once per entry." if meta.rate_limit.cost_func is not None else ""),
                 description,
                 endpoint,
             )
 
-            if meta.rate_limit.key_func == user_based_key_func:
-                self.add_dependency(Depends(get_user), dependencies)  # Ensure user is loaded
-
-            self.add_dependency(
-                Depends(RateLimiter(meta.rate_limit.limit, meta.rate_limit.period, meta.rate_limit.key_func)),
-                dependencies,
-            )
-
         super().__init__(
             path,
             endpoint,
@@ -131,6 +159,14 @@ class DocedAPIRoute(APIRoute):
             **kwargs,
         )
 
+    def get_route_handler(self) -> RouteHandler:
+        handler = super().get_route_handler()
+        if self.cache_expire is not None:
+            handler = cache_route_handler(handler, self.cache_expire)
+        if self.rate_limiter is not None:
+            handler = limit_route_handler(handler, self.rate_limiter)
+        return instrument_route_handler(handler, self.path, self.methods)
+
     def add_description(self, text: str, description: str | None, endpoint: Callable[..., Any]) -> str:
         description = description or inspect.cleandoc(endpoint.__doc__ or "")
         if description:
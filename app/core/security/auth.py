@@ -1,4 +1,3 @@
-import re
 from datetime import UTC, datetime
 from functools import lru_cache
 from hashlib import sha256
@@ -8,41 +7,26 @@ from fastapi import Depends, Header, HTTPException, Request, Security
 from fastapi.security import APIKeyHeader
 from starlette.status import HTTP_401_UNAUTHORIZED
 
-from app.config import ADMIN_CONFIG
+from app.config import ADMIN_CONFIG, USER_CONFIG
 from app.core.db import SessionDep
 from app.core.log import LOGGER
 
-from .model import User, UserRepository
+from .ip_tracker import IP_TRACKER
+from .model import User, UserRepository, merge_ips
+from .permission import PermissionSet
+from .principal import PRINCIPAL_CACHE
 
-
-@lru_cache(maxsize=256)
-def _compile_pattern(pattern: str) -> re.Pattern:
-    """
-    Compile user permission pattern (with optional *) into a regex pattern.
-    """
-    escaped = re.escape(pattern).replace(r"\*", ".*")
-    return re.compile(f"^{escaped}$")
+ADMIN_PERMISSIONS = PermissionSet(["*"])
 
 
-def has_permission(required: str | set[str] | None, user: set[str]) -> bool:
+def has_permission(required: str | set[str] | None, user: set[str] | PermissionSet) -> bool:
     """
     Check if the user's permissions satisfy the required permissions.
     Only user permissions can contain wildcards (*).
     """
-    if required is None:
-        return True
-
-    if isinstance(required, str):
-        required = {required}
-
-    for req in required:
-        # Check for exact match or wildcard match in user permissions
-        if not any(
-            _compile_pattern(user_perm).fullmatch(req) if "*" in user_perm else user_perm == req
-            for user_perm in user
-        ):
-            return False
-    return True
+    if not isinstance(user, PermissionSet):
+        user = PermissionSet(user)
+    return user.satisfies(required)
 
 
 async def verify_user(user: User):
@@ -50,7 +34,8 @@ async def verify_user(user: User):
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="API key has expired")
 
 
-api_key_scheme = APIKeyHeader(name="X-API-KEY", auto_error=False)
+API_KEY_HEADER = "X-API-KEY"
+api_key_scheme = APIKeyHeader(name=API_KEY_HEADER, auto_error=False)
 
 
 async def get_user(
@@ -62,6 +47,7 @@ async def get_user(
     if api_key == ADMIN_CONFIG.token and ADMIN_CONFIG.token is not None:
         # Create a dummy token with all permissions for the admin token
         LOGGER.info("Admin token used, granting all permissions")
+        request.state.permissions = ADMIN_PERMISSIONS
         return User(
             id=-1,
             token="<admin>",
@@ -79,7 +65,22 @@ async def get_user(
 
         userRepo = UserRepository(session)
         api_key = hash_token(api_key)
-        user = await userRepo.get_user_by_token(api_key)
+
+        # Warm authentication is served from the principal cache, the database is only queried on a miss
+        principal = await PRINCIPAL_CACHE.get(api_key)
+        cached = principal is not None
+        if principal is not None:
+            user, permissions = principal
+        elif PRINCIPAL_CACHE.is_unknown(api_key):
+            # Repeated invalid tokens do not reach the database
+            user = None
+        else:
+            user = await userRepo.get_user_by_token(api_key)
+            if user is not None:
+                # Changes to the user are not written back, like for cached users
+                session.expunge(user)
+            else:
+                PRINCIPAL_CACHE.set_unknown(api_key)
 
         if not user:
             raise HTTPException(
@@ -96,13 +97,21 @@ async def get_user(
                 status_code=HTTP_401_UNAUTHORIZED, detail="Cannot determine client IP address"
             )
 
-        await userRepo.update_user_ip(user, x_real_ip or request.client.host)
+        ip = x_real_ip or request.client.host
+        if user.common_ips[-1:] != [ip]:
+            # The IP is merged into the stored user in the background
+            IP_TRACKER.record(user.id, ip)
+            user.common_ips = merge_ips(user.common_ips, [ip], USER_CONFIG.max_ip_records)
+            permissions = await PRINCIPAL_CACHE.set(user)
+        elif not cached:
+            permissions = await PRINCIPAL_CACHE.set(user)
 
         await verify_user(user)
 
         request.state.user_id = (
             user.id
         )  # Store user ID in request state for later use (e.g. rate limiting)
+        request.state.permissions = permissions
         return user
 
 
@@ -111,8 +120,10 @@ IpDep = Annotated[str, Header(alias="X-Real-IP", include_in_schema=False)]
 
 
 def depends_permission(permission: str | set[str]):
-    async def dependency(user: UserDep) -> User:
-        if not has_permission(permission, set(user.permissions)):
+    async def dependency(request: Request, user: UserDep) -> User:
+        # Compiled by get_user along with the cached user
+        permissions = getattr(request.state, "permissions", None) or PermissionSet(user.permissions)
+        if not has_permission(permission, permissions):
             LOGGER.debug(f"User {user.token} does not have required permissions: {permission}")
             LOGGER.debug(f"User {user.token} permissions: {user.permissions}")
             raise HTTPException(status_code=403, detail="Insufficient permissions")
@@ -131,4 +142,4 @@ def hash_tokens(token_strs: list[str]) -> list[str]:
     return [hash_token(t) for t in token_strs]
 
 
-__all__ = ["UserDep", "depends_permission", "get_user", "hash_token", "hash_tokens"]
+__all__ = ["API_KEY_HEADER", "UserDep", "depends_permission", "get_user", "hash_token", "hash_tokens"]
@@ -0,0 +1,72 @@
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.config import USER_CONFIG
+from app.core.db import get_session, is_db_initialized
+from app.core.log import LOGGER
+from app.core.scheduler import SCHEDULER
+
+from .model import UserRepository
+
+
+class IpTracker:
+    """
+    Buffer of the IPs used by each user, merged into their common IPs in the background
+    so that authenticating does not write to the database.
+    """
+
+    _observed: dict[int, dict[str, None]]
+
+    def __init__(self):
+        self._observed = {}
+
+    def __len__(self) -> int:
+        return len(self._observed)
+
+    def record(self, user_id: int, ip: str) -> None:
+        ips = self._observed.setdefault(user_id, {})
+        # Keep the IPs ordered by their last use
+        ips.pop(ip, None)
+        ips[ip] = None
+
+    def drain(self) -> dict[int, list[str]]:
+        """
+        Take the IPs observed since the last drain, ordered from oldest to newest for each user.
+        """
+        observed, self._observed = self._observed, {}
+        return {user_id: list(ips) for user_id, ips in observed.items()}
+
+    def restore(self, observed: dict[int, list[str]]) -> None:
+        """
+        Put back drained IPs that could not be merged, before the IPs observed since.
+        """
+        for user_id, ips in observed.items():
+            newer = self._observed.get(user_id, {})
+            self._observed[user_id] = dict.fromkeys(ip for ip in ips if ip not in newer) | newer
+
+
+IP_TRACKER = IpTracker()
+
+
+@SCHEDULER.scheduled_job(
+    IntervalTrigger(seconds=USER_CONFIG.ip_flush_interval),
+    id="flush_user_ips",
+    misfire_grace_time=60,
+    coalesce=True,
+)
+async def flush_user_ips():
+    if not is_db_initialized():
+        return
+    observed = IP_TRACKER.drain()
+    if not observed:
+        return
+
+    try:
+        async with get_session() as session:
+            updated = await UserRepository(session).merge_user_ips(observed)
+    except Exception:
+        IP_TRACKER.restore(observed)
+        raise
+    LOGGER.debug(f"Merged the IPs of {len(observed)} users, {updated} changed")
+
+
+__all__ = ["IP_TRACKER", "IpTracker", "flush_user_ips"]
@@ -1,6 +1,7 @@
+from collections.abc import Iterable, Mapping, Sequence
 from datetime import datetime
 
-from sqlalchemy import DateTime, String, delete, func, select
+from sqlalchemy import ColumnElement, DateTime, String, cast, delete, func, insert, select, update
 from sqlalchemy.orm import (
     Mapped,
     mapped_column,
@@ -57,16 +58,84 @@ class UserRepository(BaseRepository):
         await self.session.flush()
         await self.session.refresh(user, attribute_names=["token"])
 
+    async def create_users(self, users: Sequence[Mapping[str, object]]) -> list[User]:
+        """
+        Insert the users given as column values with a multi-row insert, returning the created users.
+        """
+        if not users:
+            return []
+        result = await self.session.scalars(insert(User).returning(User), list(users))
+        return list(result.all())
+
+    async def add_permissions(self, token_strs: list[str], permissions: Sequence[str]) -> list[User]:
+        """
+        Add the permissions to the users in a single update, returning the updated users.
+        """
+        permissions = list(dict.fromkeys(permissions))
+        # Permissions the users already have are removed first, so they are not duplicated
+        granted = func.array_cat(
+            _remove_permissions(User.permissions, permissions), cast(permissions, ARRAY(String)), type_=ARRAY(String)
+        )
+        return await self._update_permissions(token_strs, granted)
+
+    async def remove_permissions(self, token_strs: list[str], permissions: Sequence[str]) -> list[User]:
+        """
+        Remove the permissions from the users in a single update, returning the updated users.
+        """
+        return await self._update_permissions(token_strs, _remove_permissions(User.permissions, permissions))
+
+    async def _update_permissions(self, token_strs: list[str], permissions: ColumnElement) -> list[User]:
+        result = await self.session.scalars(
+            update(User)
+            .where(User.token.in_(token_strs))
+            .values(permissions=permissions)
+            .returning(User)
+            .execution_options(synchronize_session="fetch")
+        )
+        return list(result.all())
+
     async def delete(self, token_strs: list[str]) -> None:
         await self.session.execute(delete(User).where(User.token.in_(token_strs)))
         await self.session.flush()
 
-    async def update_user_ip(self, user: User, ip: str) -> None:
-        if ip not in user.common_ips:
-            if len(user.common_ips) >= USER_CONFIG.max_ip_records:
-                user.common_ips.pop(0)
-            user.common_ips.append(ip)
-        else:
-            user.common_ips.remove(ip)
-            user.common_ips.append(ip)
-        await self.session.flush()
+    async def merge_user_ips(self, observed: Mapping[int, Sequence[str]]) -> int:
+        """
+        Merge the IPs observed for each user into their common IPs with a single bulk update.
+        The rows are locked while merging, so concurrent merges of the same users do not lose IPs.
+
+        :param observed: The IPs used by each user id, ordered from oldest to newest.
+        :return: The number of users whose common IPs changed.
+        """
+        if not observed:
+            return 0
+
+        query = select(User.id, User.common_ips).where(User.id.in_(observed.keys())).order_by(User.id).with_for_update()
+        result = await self.session.execute(query)
+
+        updates = []
+        for user_id, common_ips in result.all():
+            merged = merge_ips(common_ips, observed[user_id], USER_CONFIG.max_ip_records)
+            if merged != common_ips:
+                updates.append({"id": user_id, "common_ips": merged})
+
+        if updates:
+            await self.session.execute(update(User), updates)
+        return len(updates)
+
+
+def _remove_permissions(permissions: ColumnElement, removed: Iterable[str]) -> ColumnElement:
+    for permission in dict.fromkeys(removed):
+        permissions = func.array_remove(permissions, permission, type_=ARRAY(String))
+    return permissions
+
+
+def merge_ips(common_ips: Sequence[str], observed: Iterable[str], max_records: int) -> list[str]:
+    """
+    Move each observed IP to the newest end of the common IPs, dropping the oldest ones beyond ``max_records``.
+    """
+    merged = list(common_ips)
+    for ip in observed:
+        if ip in merged:
+            merged.remove(ip)
+        merged.append(ip)
+    return merged[-max_records:] if max_records > 0 else []
@@ -0,0 +1,46 @@
+import re
+from collections.abc import Iterable
+
+
+class PermissionSet:
+    """
+    Compiled permissions of a user.
+
+    Exact permissions are kept in a frozenset and wildcard permissions (with ``*``) are combined into
+    a single regex, so checking a required permission costs one lookup and at most one match,
+    however many permissions the user has.
+    """
+
+    granted: frozenset[str]
+    exact: frozenset[str]
+    wildcard: re.Pattern[str] | None
+
+    def __init__(self, permissions: Iterable[str]):
+        self.granted = frozenset(permissions)
+        exact = set()
+        wildcards = []
+        for permission in self.granted:
+            if "*" in permission:
+                wildcards.append(re.escape(permission).replace(r"\*", ".*"))
+            else:
+                exact.add(permission)
+        self.exact = frozenset(exact)
+        self.wildcard = re.compile("|".join(wildcards)) if wildcards else None
+
+    def __contains__(self, permission: str) -> bool:
+        if permission in self.exact:
+            return True
+        return self.wildcard is not None and self.wildcard.fullmatch(permission) is not None
+
+    def satisfies(self, required: str | set[str] | None) -> bool:
+        """
+        Check if the permissions satisfy all the required permissions.
+        """
+        if required is None:
+            return True
+        if isinstance(required, str):
+            return required in self
+        return all(permission in self for permission in required)
+
+
+__all__ = ["PermissionSet"]
@@ -0,0 +1,170 @@
+import time
+from collections.abc import Iterable
+from datetime import datetime
+
+import orjson
+
+from app.config import USER_CONFIG
+from app.core.cache import Cache, get_cache
+
+from .model import User
+from .permission import PermissionSet
+
+_PRINCIPAL_FIELDS = (
+    "id",
+    "token",
+    "permissions",
+    "created_at",
+    "expires_at",
+    "is_active",
+    "creation_ip",
+    "common_ips",
+    "score",
+)
+
+
+def _dump_user(user: User) -> str:
+    return orjson.dumps({field: getattr(user, field) for field in _PRINCIPAL_FIELDS}).decode()
+
+
+def _load_user(raw: str) -> User:
+    data = orjson.loads(raw)
+    data["created_at"] = datetime.fromisoformat(data["created_at"])
+    if data["expires_at"] is not None:
+        data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+    return User(**data)
+
+
+class _ExpiringSet:
+    """
+    Set of token hashes each kept for ``ttl`` seconds, expired entries are pruned once it grows past a threshold.
+    """
+
+    def __init__(self, ttl: float, prune_threshold: int):
+        self.ttl = ttl
+        self.prune_threshold = prune_threshold
+        self._expires: dict[str, float] = {}
+        self._prune_at = prune_threshold
+
+    def add(self, key: str) -> None:
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._expires) >= self._prune_at:
+            self._expires = {k: expires for k, expires in self._expires.items() if expires > now}
+            self._prune_at = max(self.prune_threshold, len(self._expires) * 2)
+        self._expires[key] = now + self.ttl
+
+    def discard(self, key: str) -> None:
+        self._expires.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        return expires is not None and expires > time.monotonic()
+
+
+class PrincipalCache:
+    """
+    Cache of authenticated users keyed by token hash, so that warm authentication needs no database query.
+
+    Users are kept in process for ``local_ttl`` seconds and in the shared cache for ``ttl`` seconds.
+    Every lookup returns a new detached ``User``, changes to it are not persisted, along with its compiled
+    permissions which are built once per user and process.
+
+    Endpoints changing users must `invalidate` them. This removes them from the shared cache and from
+    this process, other workers may keep serving them for up to ``local_ttl`` seconds.
+
+    Token hashes the database does not know are remembered for ``negative_ttl`` seconds, so repeating an
+    invalid token does not query the database again. Token hashes of users authenticated in this process
+    are remembered for ``ttl`` seconds, the rate limiter only keys requests by token once it is validated.
+    """
+
+    # Expired local entries are pruned once the table grows past this size
+    PRUNE_THRESHOLD = 1024
+
+    cache: Cache
+    ttl: int
+    local_ttl: float
+    negative_ttl: float
+    _local: dict[str, tuple[float, str, PermissionSet]]
+
+    def __init__(self, cache: Cache, ttl: int, local_ttl: float, negative_ttl: float):
+        self.cache = cache
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.negative_ttl = negative_ttl
+        self._local = {}
+        self._prune_at = self.PRUNE_THRESHOLD
+        self._validated = _ExpiringSet(ttl, self.PRUNE_THRESHOLD)
+        self._unknown = _ExpiringSet(negative_ttl, self.PRUNE_THRESHOLD)
+
+    @staticmethod
+    def _key(token_hash: str) -> str:
+        return f"principal:{token_hash}"
+
+    def _set_local(self, token_hash: str, raw: str, permissions: PermissionSet) -> None:
+        if self.local_ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._local) >= self._prune_at:
+            self._local = {key: entry for key, entry in self._local.items() if entry[0] > now}
+            self._prune_at = max(self.PRUNE_THRESHOLD, len(self._local) * 2)
+        self._local[token_hash] = (now + self.local_ttl, raw, permissions)
+
+    async def get(self, token_hash: str) -> tuple[User, PermissionSet] | None:
+        entry = self._local.get(token_hash)
+        if entry is not None and entry[0] > time.monotonic():
+            return _load_user(entry[1]), entry[2]
+
+        raw = await self.cache.get(self._key(token_hash))
+        if raw is None:
+            return None
+        user = _load_user(raw)
+        permissions = PermissionSet(user.permissions)
+        self._set_local(token_hash, raw, permissions)
+        self._validated.add(token_hash)
+        return user, permissions
+
+    async def set(self, user: User) -> PermissionSet:
+        raw = _dump_user(user)
+        entry = self._local.get(user.token)
+        if entry is not None and entry[2].granted == frozenset(user.permissions):
+            permissions = entry[2]
+        else:
+            permissions = PermissionSet(user.permissions)
+        self._set_local(user.token, raw, permissions)
+        self._validated.add(user.token)
+        self._unknown.discard(user.token)
+        await self.cache.set(self._key(user.token), raw, expire=self.ttl)
+        return permissions
+
+    async def invalidate(self, token_hashes: Iterable[str]) -> None:
+        for token_hash in token_hashes:
+            self._local.pop(token_hash, None)
+            self._validated.discard(token_hash)
+            await self.cache.delete(self._key(token_hash))
+
+    def is_validated(self, token_hash: str) -> bool:
+        """
+        Whether the token hash belongs to a user recently authenticated in this process.
+        """
+        return token_hash in self._validated
+
+    def is_unknown(self, token_hash: str) -> bool:
+        """
+        Whether the token hash was recently looked up and not found, the database need not be queried again.
+        """
+        return token_hash in self._unknown
+
+    def set_unknown(self, token_hash: str) -> None:
+        self._unknown.add(token_hash)
+
+
+PRINCIPAL_CACHE = PrincipalCache(
+    get_cache(),
+    USER_CONFIG.principal_cache_ttl,
+    USER_CONFIG.principal_local_cache_ttl,
+    USER_CONFIG.principal_negative_cache_ttl,
+)
+
+__all__ = ["PRINCIPAL_CACHE", "PrincipalCache"]
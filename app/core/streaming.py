@@ -0,0 +1,83 @@
+"""
+Incremental encodings of item lists, for responses streamed without building the whole list in memory.
+
+Items are encoded one at a time and gathered into chunks of about ``CHUNK_SIZE`` bytes,
+so a response holds at most one chunk and the rows fetched by the database cursor.
+"""
+
+from collections.abc import AsyncIterable, AsyncIterator
+from enum import StrEnum
+from typing import Any
+
+import orjson as json
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamFormat(StrEnum):
+    NDJSON = "ndjson"
+    """One JSON value per line."""
+    PROTOBUF = "protobuf"
+    """Serialized messages, each prefixed with its length as a varint, like ``writeDelimitedTo`` in Java."""
+
+    @property
+    def media_type(self) -> str:
+        match self:
+            case StreamFormat.NDJSON:
+                return "application/x-ndjson"
+            case StreamFormat.PROTOBUF:
+                return "application/x-protobuf; delimited=true"
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    Encode a non-negative integer as a protobuf varint.
+    """
+    if value < 0:
+        raise ValueError("Varints of negative values are not supported")
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+async def _chunked(parts: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for part in parts:
+        buffer += part
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def ndjson_stream(values: AsyncIterable[Any], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encode the values as newline delimited JSON.
+    """
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for value in values:
+            yield json.dumps(value, option=json.OPT_APPEND_NEWLINE)
+
+    async for chunk in _chunked(lines(), chunk_size):
+        yield chunk
+
+
+async def delimited_stream(messages: AsyncIterable[bytes], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encode serialized protobuf messages as a length-delimited stream.
+    """
+
+    async def frames() -> AsyncIterator[bytes]:
+        async for message in messages:
+            yield encode_varint(len(message)) + message
+
+    async for chunk in _chunked(frames(), chunk_size):
+        yield chunk
+
+
+__all__ = ["CHUNK_SIZE", "StreamFormat", "delimited_stream", "encode_varint", "ndjson_stream"]
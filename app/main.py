@@ -1,20 +1,25 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.exceptions import RequestValidationError, ResponseValidationError
 from fastapi.staticfiles import StaticFiles
 from scalar_fastapi import AgentScalarConfig, OpenAPISource, get_scalar_api_reference
 
-from app.config import DB_CONFIG
+from app.config import DB_CONFIG, WARMUP_CONFIG
 from app.core.db import RedisClient, close_db, init_db
+from app.core.log import LOGGER
+from app.core.metrics import CONTENT_TYPE_LATEST, mark_process_dead, render_metrics
 from app.core.openapi import custom_openapi
 from app.core.scheduler import SCHEDULER
+from app.core.security.ip_tracker import flush_user_ips
 from app.module.api.exception_handler import (
     generic_exception_handler,
     http_exception_handler,
     validation_exception_handler,
 )
+from app.module.api.mapping import MAPPING_STORAGE
 from app.module.api.router import Router
+from app.module.api.warmup import schedule_warmup
 from app.schemas.constants import __DESCRIPTION__, __NAME__, __VERSION__
 from app.schemas.response import STATUS_RESPONSE, StatusResponse
 
@@ -29,12 +34,21 @@ async def lifespan(app: FastAPI):
         await init_db()
         if DB_CONFIG.redis_dsn is not None:
             await RedisClient.init()
+        if WARMUP_CONFIG.enabled:
+            schedule_warmup(app)
         yield
     finally:
         SCHEDULER.shutdown(wait=False)
+        try:
+            await flush_user_ips()
+        except Exception:
+            # The buffered IPs are lost, but the remaining resources must still be released
+            LOGGER.exception("Failed to flush user IPs on shutdown")
+        await MAPPING_STORAGE.close()
         await close_db()
         if DB_CONFIG.redis_dsn is not None:
             await RedisClient.close()
+        mark_process_dead()
 
 
 app = FastAPI(
@@ -72,6 +86,11 @@ async def read_readyz() -> StatusResponse:
     return STATUS_RESPONSE
 
 
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics() -> Response:
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/docs", include_in_schema=False)
 @app.get("/doc", include_in_schema=False)
 async def scalar_ui():
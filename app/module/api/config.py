@@ -0,0 +1,37 @@
+from typing import Annotated
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class MappingConfig(BaseSettings):
+    """
+    Configuration for the ID to name mappings fetched from the schema repository.
+    """
+
+    base_url: Annotated[str, Field(alias="MAPPING_BASE_URL")] = (
+        "https://raw.githubusercontent.com/WynnSource/schema/refs/heads/main/mapping/"
+    )
+    refresh_interval: Annotated[
+        int, Field(alias="MAPPING_REFRESH_INTERVAL", ge=1, description="Minutes between two upstream checks")
+    ] = 60
+    request_timeout: Annotated[float, Field(alias="MAPPING_REQUEST_TIMEOUT", gt=0)] = 10.0
+    snapshot_expire: Annotated[
+        int,
+        Field(
+            alias="MAPPING_SNAPSHOT_EXPIRE",
+            description="Seconds the last good mappings are kept in the shared cache",
+        ),
+    ] = 7 * 24 * 3600
+    snapshot_dir: Annotated[
+        str | None,
+        Field(
+            alias="MAPPING_SNAPSHOT_DIR",
+            description="Directory the last good mappings are also written to, to survive restarts without Redis",
+        ),
+    ] = None
+
+
+MAPPING_CONFIG = MappingConfig()
+
+__all__ = ["MAPPING_CONFIG"]
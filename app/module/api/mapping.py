@@ -0,0 +1,254 @@
+"""
+Process-wide store of the ID to name mappings published in the schema repository.
+
+Upstream is checked with conditional requests, so an unchanged mapping costs a 304 and no parsing.
+The schema of a mapping is compiled once and reused until upstream changes it.
+The last good mappings are written to the shared cache, and optionally to disk,
+so other workers and restarted processes start from them instead of fetching again.
+"""
+
+import asyncio
+import dataclasses
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+import jsonschema
+import orjson
+from jsonschema.protocols import Validator
+
+from app.core.cache import Cache, get_cache
+from app.core.log import LOGGER
+
+from .config import MAPPING_CONFIG
+from .schema import MappingType
+
+JSON_FILE_EXTENSION = ".json"
+SCHEMA_FILE_EXTENSION = ".schema.json"
+SCHEMA_FIELD = "$schema"
+
+
+@dataclass
+class MappingSnapshot:
+    """
+    A validated mapping along with the validators of the upstream responses it was built from.
+    """
+
+    mapping: dict
+    schema: dict
+    etag: str | None = None
+    last_modified: str | None = None
+    schema_etag: str | None = None
+    schema_last_modified: str | None = None
+    checked_at: float = 0.0
+    """Time of the last successful check against upstream, whether it changed or not."""
+
+
+class MappingStorage:
+    """
+    Storage of the ID to name mappings, shared by the whole process through ``MAPPING_STORAGE``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        cache: Cache,
+        expire: int,
+        min_check_interval: float,
+        snapshot_dir: str | None = None,
+        timeout: float = 10.0,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.base_url = base_url
+        self.cache = cache
+        self.expire = expire
+        self.min_check_interval = min_check_interval
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.timeout = timeout
+        self._client = client
+        self._snapshots: dict[MappingType, MappingSnapshot] = {}
+        self._validators: dict[MappingType, tuple[str | None, Validator]] = {}
+        self._locks: defaultdict[MappingType, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The pooled HTTP client, created on first use so it is bound to the running event loop.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=len(MappingType) * 2),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_mapping(self, mapping_type: MappingType) -> dict:
+        snapshot = self._snapshots.get(mapping_type)
+        if snapshot is None:
+            # Concurrent requests on a cold process wait for a single load
+            async with self._locks[mapping_type]:
+                if mapping_type not in self._snapshots:
+                    await self._refresh(mapping_type)
+            snapshot = self._snapshots.get(mapping_type)
+        return snapshot.mapping if snapshot is not None else {}
+
+    async def update_mapping(self, mapping_type: MappingType):
+        """
+        Check upstream for a newer mapping, unless another worker did so recently.
+        The current mapping is kept if upstream fails or serves an invalid one.
+        """
+        async with self._locks[mapping_type]:
+            await self._refresh(mapping_type)
+
+    async def _refresh(self, mapping_type: MappingType):
+        current = self._snapshots.get(mapping_type)
+        stored = await self._load(mapping_type)
+        if stored is not None and (current is None or stored.checked_at > current.checked_at):
+            self._snapshots[mapping_type] = current = stored
+        if current is not None and time.time() - current.checked_at < self.min_check_interval:
+            return
+
+        url = f"{self.base_url}{mapping_type.value}{JSON_FILE_EXTENSION}"
+        schema_url = f"{self.base_url}{mapping_type.value}{SCHEMA_FILE_EXTENSION}"
+        try:
+            schema_response = await self._fetch(
+                schema_url, *((current.schema_etag, current.schema_last_modified) if current else (None, None))
+            )
+            # A new schema may reject the current mapping, so the mapping is then fetched and validated again
+            response = await self._fetch(
+                url, *((current.etag, current.last_modified) if current and schema_response is None else (None, None))
+            )
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            LOGGER.error(f"Failed to fetch mapping for {mapping_type.value} from {self.base_url}: {e!r}")
+            return
+
+        if response is None:
+            assert current is not None  # only conditional requests are answered with 304
+            snapshot = dataclasses.replace(current, checked_at=time.time())
+        else:
+            mapping, etag, last_modified = response
+            if schema_response is not None:
+                schema, schema_etag, schema_last_modified = schema_response
+            else:
+                assert current is not None
+                schema, schema_etag, schema_last_modified = (
+                    current.schema,
+                    current.schema_etag,
+                    current.schema_last_modified,
+                )
+            try:
+                self._get_validator(mapping_type, schema, schema_etag, schema_response is not None).validate(mapping)
+            except jsonschema.SchemaError as e:
+                LOGGER.error(f"Schema for {mapping_type.value} is invalid: {e.message}")
+                return
+            except jsonschema.ValidationError as e:
+                LOGGER.error(f"Mapping data for {mapping_type.value} failed schema validation: {e.message}")
+                return
+
+            mapping.pop(SCHEMA_FIELD, None)  # we don't need the schema reference as it's relative path in the repo
+            snapshot = MappingSnapshot(
+                mapping=mapping,
+                schema=schema,
+                etag=etag,
+                last_modified=last_modified,
+                schema_etag=schema_etag,
+                schema_last_modified=schema_last_modified,
+                checked_at=time.time(),
+            )
+
+        self._snapshots[mapping_type] = snapshot
+        await self._store(mapping_type, snapshot)
+
+    async def _fetch(
+        self, url: str, etag: str | None, last_modified: str | None
+    ) -> tuple[dict, str | None, str | None] | None:
+        """
+        Fetch a JSON document, returning None if it did not change since the given validators.
+        """
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        response = await self.client.get(url, headers=headers)
+        if response.status_code == 304 and headers:
+            return None
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"Unexpected status {response.status_code} for {url}", request=response.request, response=response
+            )
+        return orjson.loads(response.content), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def _get_validator(
+        self, mapping_type: MappingType, schema: dict, schema_etag: str | None, changed: bool
+    ) -> Validator:
+        cached = self._validators.get(mapping_type)
+        if changed or cached is None or cached[0] != schema_etag:
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            cached = self._validators[mapping_type] = (schema_etag, validator_class(schema))
+        return cached[1]
+
+    @staticmethod
+    def _key(mapping_type: MappingType) -> str:
+        return f"mapping:snapshot:{mapping_type.value}"
+
+    def _path(self, mapping_type: MappingType) -> Path | None:
+        return self.snapshot_dir / f"{mapping_type.value}{JSON_FILE_EXTENSION}" if self.snapshot_dir else None
+
+    async def _load(self, mapping_type: MappingType) -> MappingSnapshot | None:
+        raw: str | bytes | None = await self.cache.get(self._key(mapping_type))
+        path = self._path(mapping_type)
+        if raw is None and path is not None:
+            try:
+                raw = await asyncio.to_thread(path.read_bytes)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                LOGGER.warning(f"Failed to read mapping snapshot {path}: {e!r}")
+        if raw is None:
+            return None
+        try:
+            return MappingSnapshot(**orjson.loads(raw))
+        except (orjson.JSONDecodeError, TypeError):
+            LOGGER.warning(f"Ignoring unreadable mapping snapshot for {mapping_type.value}")
+            return None
+
+    async def _store(self, mapping_type: MappingType, snapshot: MappingSnapshot):
+        raw = orjson.dumps(dataclasses.asdict(snapshot))
+        await self.cache.set(self._key(mapping_type), raw.decode(), expire=self.expire)
+        path = self._path(mapping_type)
+        if path is not None:
+            try:
+                await asyncio.to_thread(_write_atomic, path, raw)
+            except OSError as e:
+                LOGGER.warning(f"Failed to write mapping snapshot {path}: {e!r}")
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(f".{os.getpid()}.tmp")
+    temp.write_bytes(data)
+    temp.replace(path)
+
+
+MAPPING_STORAGE = MappingStorage(
+    MAPPING_CONFIG.base_url,
+    get_cache(),
+    expire=MAPPING_CONFIG.snapshot_expire,
+    # Workers share the snapshot, so only the first one to run its job in an interval checks upstream
+    min_check_interval=MAPPING_CONFIG.refresh_interval * 60 / 2,
+    snapshot_dir=MAPPING_CONFIG.snapshot_dir,
+    timeout=MAPPING_CONFIG.request_timeout,
+)
+
+__all__ = ["MAPPING_STORAGE", "MappingSnapshot", "MappingStorage"]
@@ -9,8 +9,9 @@ from app.module.pool.router import PoolRouter
 from app.schemas.enums import ApiTag, ItemReturnType
 from app.schemas.response import StatusResponse, WCSResponse
 
+from .mapping import MAPPING_STORAGE
 from .schema import MappingResponse, MappingType, RandomItemResponse, ValidationErrorResponse
-from .service import MappingStorage, generate_random_item
+from .service import generate_random_item
 
 Router = APIRouter(
     route_class=DocedAPIRoute, prefix="/api/v2", responses={422: {"model": ValidationErrorResponse}}
@@ -40,8 +41,7 @@ async def get_mappings(mapping_type: MappingType) -> MappingResponse:
     Get ID mappings for a given type.
     """
 
-    storage = MappingStorage().get_instance()
-    return MappingResponse.model_validate(await storage.get_mapping(mapping_type), extra="ignore")
+    return MappingResponse.model_validate(await MAPPING_STORAGE.get_mapping(mapping_type), extra="ignore")
 
 
 @Router.get("/item/random", summary="Get Random Item", tags=[ApiTag.MISC])
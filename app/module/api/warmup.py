@@ -0,0 +1,82 @@
+import datetime
+
+from apscheduler.triggers.date import DateTrigger
+from fastapi import FastAPI
+
+from app.config import WARMUP_CONFIG
+from app.core.cache.warmup import warm_up
+from app.core.scheduler import SCHEDULER
+from app.module.pool.config import POOL_REFRESH_CONFIG
+from app.module.pool.schema import VALID_REGIONS, PoolType
+from app.schemas.enums import ItemReturnType
+
+from .schema import MappingType
+
+# Clients either omit the return type or pass it explicitly, both produce different cache keys.
+ITEM_RETURN_TYPE_QUERIES = ["", *(f"?item_return_type={t.value}" for t in ItemReturnType)]
+
+
+def pool_warmup_urls(app: FastAPI, pool_type: PoolType) -> list[str]:
+    return [
+        app.url_path_for("get_pools_by_type_and_region", pool_type=pool_type.value, region=region.value) + query
+        for region in VALID_REGIONS[pool_type]
+        for query in ITEM_RETURN_TYPE_QUERIES
+    ]
+
+
+def warmup_urls(app: FastAPI) -> list[str]:
+    """
+    Get the URLs of all hot cache keys.
+    """
+    urls = [url for pool_type in PoolType for url in pool_warmup_urls(app, pool_type)]
+    urls += [app.url_path_for("list_beta_items") + query for query in ITEM_RETURN_TYPE_QUERIES]
+    urls += [app.url_path_for("get_mappings", mapping_type=mapping_type.value) for mapping_type in MappingType]
+    return urls
+
+
+async def warm_up_all(app: FastAPI):
+    await warm_up(app, warmup_urls(app))
+
+
+async def warm_up_rotation(app: FastAPI, pool_type: PoolType):
+    """
+    Refresh the pool caches of a pool type right after its rotation started and schedule the next run.
+    """
+    await warm_up(app, pool_warmup_urls(app, pool_type))
+    schedule_rotation_warmup(app, pool_type)
+
+
+def schedule_rotation_warmup(app: FastAPI, pool_type: PoolType):
+    rotation = POOL_REFRESH_CONFIG[pool_type].get_rotation(datetime.datetime.now(tz=datetime.UTC))
+    SCHEDULER.add_job(
+        warm_up_rotation,
+        DateTrigger(run_date=rotation.end + datetime.timedelta(seconds=WARMUP_CONFIG.rotation_delay)),
+        args=[app, pool_type],
+        id=f"cache_warmup_{pool_type.value}",
+        name=f"Cache Warm-up ({pool_type.value})",
+        misfire_grace_time=300,
+        replace_existing=True,
+    )
+
+
+def schedule_warmup(app: FastAPI):
+    """
+    Schedule a warm-up of all hot cache keys shortly after startup,
+    and a warm-up of the pool caches after every rotation start.
+    """
+    SCHEDULER.add_job(
+        warm_up_all,
+        DateTrigger(
+            run_date=datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(seconds=WARMUP_CONFIG.startup_delay)
+        ),
+        args=[app],
+        id="cache_warmup_startup",
+        name="Cache Warm-up (startup)",
+        misfire_grace_time=300,
+        replace_existing=True,
+    )
+    for pool_type in POOL_REFRESH_CONFIG:
+        schedule_rotation_warmup(app, pool_type)
+
+
+__all__ = ["schedule_warmup", "warmup_urls"]
@@ -8,6 +8,20 @@ from app.core.log import LOGGER
 
 class BetaConfig(BaseSettings):
     beta_allowed_versions: Annotated[str, Field(alias="BETA_ALLOWED_VERSIONS")] = ""
+    beta_snapshot_expire: Annotated[
+        int,
+        Field(
+            alias="BETA_SNAPSHOT_EXPIRE",
+            description="Seconds the beta list snapshot of a revision is kept in the shared cache",
+        ),
+    ] = 3600
+    beta_change_tombstone_retention: Annotated[
+        int,
+        Field(
+            alias="BETA_CHANGE_TOMBSTONE_RETENTION",
+            description="Days deletions are kept in the change log, clients syncing less often must reload the list",
+        ),
+    ] = 30
 
     @property
     def allowed_versions(self) -> list[str]:
@@ -1,11 +1,32 @@
-from collections.abc import Sequence
+import hashlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
+from typing import Any
 
-from sqlalchemy import LargeBinary, String, UniqueConstraint, select
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+    cast,
+    delete,
+    func,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, distinct_on, insert
+from sqlalchemy.orm import Mapped, aliased, mapped_column
 
 from app.core.db import Base, BaseRepository
 from wynnsource import WynnSourceItem
 
+from .schema import BetaItemSearchQuery
+
 
 class BetaItem(Base):
     __tablename__ = "beta_items"
@@ -13,36 +34,261 @@ class BetaItem(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
     item: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Digest of the submitted item, before powders are merged in, to detect repeated submissions
+    digest: Mapped[bytes] = mapped_column(LargeBinary(32), nullable=False, index=True)
+
+    # Searchable attributes, extracted from the item at ingest
+    level: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    rarity: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    gear_type: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    class_req: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    identification_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, default=[], server_default="{}"
+    )
+
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_beta_item_name"),
+        Index("ix_beta_items_identification_ids", "identification_ids", postgresql_using="gin"),
+    )
+
+
+def searchable_attributes(item: WynnSourceItem) -> dict[str, Any]:
+    """
+    Extract the column values of the searchable attributes of an item.
+    """
+    return {
+        "level": item.level,
+        "rarity": item.rarity,
+        "gear_type": item.gear.type,
+        "class_req": item.gear.requirements.class_req,
+        "identification_ids": sorted({identification.id for identification in item.gear.unidentified.identifications}),
+    }
+
+
+class BetaRevision(Base):
+    """
+    Single row counting the changes to the beta list, bumped in the transaction of every write.
+    """
+
+    __tablename__ = "beta_revision"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # Tombstones up to this revision were pruned from the change log
+    pruned_revision: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class BetaItemChange(Base):
+    """
+    Change log of the beta list, one row per item changed in a revision.
+    Only the latest change of each item is needed, older ones are pruned.
+    """
+
+    __tablename__ = "beta_item_changes"
+
+    revision: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), primary_key=True, index=True)
+    deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+REVISION_ROW_ID = 1
+
+# Columns overwritten when an item is submitted again
+UPSERTED_COLUMNS = ("item", "digest", "level", "rarity", "gear_type", "class_req", "identification_ids")
+
+
+def item_digest(data: bytes) -> bytes:
+    """
+    Digest of a serialized item, computed over the bytes as given without canonicalizing them.
+    The submission fast path hashes the raw submitted bytes with it, before decoding the items.
+    """
+    return hashlib.sha256(data).digest()
+
 
-    __table_args__ = (UniqueConstraint("name", name="uq_beta_item_name"),)
+def canonical_digest(item: WynnSourceItem) -> bytes:
+    return item_digest(item.SerializeToString(deterministic=True))
 
 
 class BetaItemRepository(BaseRepository):
-    async def add_item(self, item: WynnSourceItem):
-        existing = (await self.session.execute(select(BetaItem).where(BetaItem.name == item.name))).scalar_one_or_none()
-        if existing:
-            existing.item = item.SerializeToString()
-            self.session.add(existing)
-        else:
-            beta_item = BetaItem(name=item.name, item=item.SerializeToString())
-            self.session.add(beta_item)
-        await self.session.flush()
-
-    async def get_item(self, name: str) -> BetaItem | None:
-        result = await self.session.execute(select(BetaItem).where(BetaItem.name == name))
-        return result.scalar_one_or_none()
+    async def upsert_items(self, items: Sequence[tuple[WynnSourceItem, bytes]]) -> None:
+        """
+        Insert the items with their digests, or overwrite the stored items with the same names, in a single statement.
+        Names must be unique within ``items``.
+
+        Rows are written in name order, so concurrent batches lock the rows they share in the same order
+        and cannot deadlock.
+        """
+        if not items:
+            return
+        statement = insert(BetaItem)
+        await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[BetaItem.name],
+                set_={column: statement.excluded[column] for column in UPSERTED_COLUMNS},
+            ),
+            [
+                {"name": item.name, "item": item.SerializeToString(), "digest": digest, **searchable_attributes(item)}
+                for item, digest in sorted(items, key=lambda entry: entry[0].name)
+            ],
+        )
+
+    async def get_known_digests(self, digests: list[bytes]) -> set[bytes]:
+        """
+        Get which of the given digests belong to stored items.
+        """
+        result = await self.session.execute(select(BetaItem.digest).where(BetaItem.digest.in_(digests)))
+        return set(result.scalars().all())
+
+    async def get_revision(self) -> int:
+        result = await self.session.execute(select(BetaRevision.revision).where(BetaRevision.id == REVISION_ROW_ID))
+        return result.scalar_one_or_none() or 0
+
+    async def bump_revision(self) -> int:
+        """
+        Increment the beta revision. The row stays locked until the end of the transaction,
+        so concurrent writes are numbered in commit order.
+
+        :return: The new revision.
+        """
+        statement = insert(BetaRevision).values(id=REVISION_ROW_ID, revision=1)
+        result = await self.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[BetaRevision.id],
+                set_={"revision": BetaRevision.revision + 1, "updated_at": func.now()},
+            ).returning(BetaRevision.revision)
+        )
+        return result.scalar_one()
+
+    async def get_pruned_revision(self) -> int:
+        result = await self.session.execute(
+            select(BetaRevision.pruned_revision).where(BetaRevision.id == REVISION_ROW_ID)
+        )
+        return result.scalar_one_or_none() or 0
+
+    async def record_changes(self, upserted: Iterable[str] = (), deleted: Iterable[str] = ()) -> int:
+        """
+        Bump the beta revision and log the given items as changed in it.
+        Names must be unique across both.
+
+        :return: The new revision.
+        """
+        revision = await self.bump_revision()
+        for names, is_deleted in ((list(upserted), False), (list(deleted), True)):
+            if not names:
+                continue
+            # One INSERT ... SELECT unnest(...) however many items changed
+            await self.session.execute(
+                insert(BetaItemChange).from_select(
+                    ["revision", "name", "deleted"],
+                    select(
+                        literal(revision, BigInteger),
+                        func.unnest(cast(names, ARRAY(String))),
+                        literal(is_deleted),
+                    ),
+                )
+            )
+        return revision
+
+    async def list_changes(self, since: int, until: int) -> Sequence[tuple[str, bool]]:
+        """
+        List the name and whether it was deleted of every item changed after revision ``since``
+        and up to ``until``, by its latest change.
+        """
+        result = await self.session.execute(
+            select(BetaItemChange.name, BetaItemChange.deleted)
+            .where(BetaItemChange.revision > since, BetaItemChange.revision <= until)
+            .ext(distinct_on(BetaItemChange.name))
+            .order_by(BetaItemChange.name, BetaItemChange.revision.desc())
+        )
+        return [(name, deleted) for name, deleted in result.all()]
+
+    async def prune_changes(self, tombstones_before: datetime) -> int:
+        """
+        Delete the changes superseded by a later change of the same item,
+        and the deletions older than ``tombstones_before``.
+
+        :return: The number of deleted changes.
+        """
+        newer = aliased(BetaItemChange)
+        superseded = await self.session.execute(
+            delete(BetaItemChange).where(
+                select(newer)
+                .where(newer.name == BetaItemChange.name, newer.revision > BetaItemChange.revision)
+                .exists()
+            )
+        )
+        tombstones = await self.session.execute(
+            delete(BetaItemChange)
+            .where(BetaItemChange.deleted, BetaItemChange.changed_at < tombstones_before)
+            .returning(BetaItemChange.revision)
+        )
+        pruned = tombstones.scalars().all()
+        if pruned:
+            # Clients that synced before the pruned tombstones cannot be told about them anymore
+            await self.session.execute(
+                update(BetaRevision)
+                .where(BetaRevision.id == REVISION_ROW_ID)
+                .values(pruned_revision=func.greatest(BetaRevision.pruned_revision, max(pruned)))
+            )
+        return superseded.rowcount + len(pruned)
+
+    async def list_item_blobs(self) -> Sequence[bytes]:
+        """
+        List the serialized items only, without loading them as ORM objects.
+        """
+        result = await self.session.execute(select(BetaItem.item).order_by(BetaItem.id))
+        return result.scalars().all()
+
+    async def stream_item_blobs(self, batch_size: int) -> AsyncIterator[bytes]:
+        """
+        Iterate over the serialized items through a server-side cursor, fetching ``batch_size`` rows at a time.
+        """
+        result = await self.session.stream_scalars(
+            select(BetaItem.item).order_by(BetaItem.id).execution_options(yield_per=batch_size)
+        )
+        async for item in result:
+            yield item
+
+    async def search_items(self, query: BetaItemSearchQuery) -> Sequence[bytes]:
+        """
+        List the serialized items matching all the filters of the query, ordered by id.
+        """
+        statement = select(BetaItem.item)
+        if query.min_level is not None:
+            statement = statement.where(BetaItem.level >= query.min_level)
+        if query.max_level is not None:
+            statement = statement.where(BetaItem.level <= query.max_level)
+        if query.rarity:
+            statement = statement.where(BetaItem.rarity.in_(query.rarity))
+        if query.gear_type:
+            statement = statement.where(BetaItem.gear_type.in_(query.gear_type))
+        if query.class_req:
+            statement = statement.where(BetaItem.class_req.in_(query.class_req))
+        if query.identifications:
+            statement = statement.where(BetaItem.identification_ids.contains(query.identifications))
+        result = await self.session.execute(statement.order_by(BetaItem.id).limit(query.limit).offset(query.offset))
+        return result.scalars().all()
 
     async def get_items_by_names(self, names: list[str]) -> Sequence[BetaItem]:
         result = await self.session.execute(select(BetaItem).where(BetaItem.name.in_(names)))
         return result.scalars().all()
 
-    async def list_items(self) -> Sequence[BetaItem]:
-        result = await self.session.execute(select(BetaItem))
-        return result.scalars().all()
+    async def delete_items(self, names: list[str]) -> list[str]:
+        """
+        Delete the items with the given names in a single statement.
+
+        :return: The names of the deleted items.
+        """
+        result = await self.session.execute(delete(BetaItem).where(BetaItem.name.in_(names)).returning(BetaItem.name))
+        return list(result.scalars().all())
+
+    async def clear_items(self) -> list[str]:
+        """
+        Delete all items in a single statement. Unlike TRUNCATE, it does not lock out concurrent readers.
 
-    async def delete_item(self, name: str) -> None:
-        result = await self.session.execute(select(BetaItem).where(BetaItem.name == name))
-        beta_item = result.scalar_one_or_none()
-        if beta_item:
-            await self.session.delete(beta_item)
-            await self.session.flush()
+        :return: The names of the deleted items.
+        """
+        result = await self.session.execute(delete(BetaItem).returning(BetaItem.name))
+        return list(result.scalars().all())
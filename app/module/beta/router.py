@@ -1,43 +1,135 @@
-from fastapi import APIRouter, Body
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.status import HTTP_304_NOT_MODIFIED
 
 from app.core import metadata
-from app.core.db import SessionDep
+from app.core.db import ReadSessionDep, SessionDep
+from app.core.rate_limiter import json_length_cost
 from app.core.router import DocedAPIRoute
+from app.core.streaming import StreamFormat
 from app.schemas.enums import ItemReturnType
 from app.schemas.enums.tag import ApiTag
 from app.schemas.response import EmptyResponse, WCSResponse
 
-from .schema import BetaItemListResponse, ItemPatchSubmission, NewItemSubmission
+from .schema import (
+    BetaItemChangesResponse,
+    BetaItemListResponse,
+    BetaItemSearchQuery,
+    BetaRevisionResponse,
+    ItemPatchSubmission,
+    NewItemSubmission,
+)
 from .service import (
-    get_beta_items,
+    get_beta_changes,
     get_beta_items_by_name,
+    get_beta_revision,
+    get_beta_snapshot,
     handle_clear_beta_items,
     handle_delete_beta_items,
     handle_item_submission,
     handle_patch_submission,
+    search_beta_items,
+    stream_beta_items,
 )
+from .snapshot import etag_revision, snapshot_etag
+
+BETA_REVISION_HEADER = "X-Beta-Revision"
 
 BetaRouter = APIRouter(route_class=DocedAPIRoute, prefix="/beta", tags=[ApiTag.BETA])
 
 
-@BetaRouter.get("/items", summary="List Beta Items")
+@BetaRouter.get("/items", summary="List Beta Items", response_model=WCSResponse[BetaItemListResponse])
 @metadata.rate_limit(limit=10, period=60)
-@metadata.cached(expire=30)
 async def list_beta_items(
-    session: SessionDep,
+    request: Request,
+    session: ReadSessionDep,
     item_return_type: ItemReturnType = ItemReturnType.B64,
-) -> WCSResponse[BetaItemListResponse]:
+    stream: StreamFormat | None = Query(
+        default=None,
+        description="Stream the items one by one instead, as newline delimited JSON "
+        + "or as length-delimited protobuf messages",
+    ),
+) -> Response:
     """
     List all items in the beta list.
+
+    The response is built once per revision of the list. It carries the revision in its `ETag`,
+    and requests with an `If-None-Match` of that revision or a newer one get an empty `304 Not Modified`.
+
+    Streamed lists are read from the database as they are sent, and hold the items of the revision
+    in `X-Beta-Revision` or newer ones.
+    """
+    if stream is not None:
+        revision = await get_beta_revision(session)
+        return StreamingResponse(
+            stream_beta_items(session, stream, item_return_type),
+            media_type=stream.media_type,
+            headers={BETA_REVISION_HEADER: str(revision)},
+        )
+
+    revision = await get_beta_revision(session)
+    # A replica lagging behind the one the client got its list from must not hand out an older list
+    client_revision = etag_revision(request.headers.get("If-None-Match"), item_return_type)
+    if client_revision is not None and client_revision >= revision:
+        return Response(
+            status_code=HTTP_304_NOT_MODIFIED,
+            headers={
+                "ETag": snapshot_etag(client_revision, item_return_type),
+                BETA_REVISION_HEADER: str(client_revision),
+            },
+        )
+
+    snapshot = await get_beta_snapshot(session, revision, item_return_type)
+    headers = {"ETag": snapshot_etag(revision, item_return_type), BETA_REVISION_HEADER: str(revision)}
+    return Response(content=snapshot, media_type="application/json", headers=headers)
+
+
+@BetaRouter.get("/items/revision", summary="Get Beta Revision")
+@metadata.rate_limit(limit=60, period=60)
+async def get_beta_items_revision(session: ReadSessionDep) -> WCSResponse[BetaRevisionResponse]:
+    """
+    Get the current revision of the beta list, to check whether it changed without downloading it.
     """
-    return WCSResponse(data=BetaItemListResponse(items=item_return_type.format_items(await get_beta_items(session))))
+    return WCSResponse(data=BetaRevisionResponse(revision=await get_beta_revision(session)))
+
+
+@BetaRouter.get("/items/changes", summary="List Beta Item Changes")
+@metadata.rate_limit(limit=60, period=60)
+async def list_beta_item_changes(
+    session: ReadSessionDep,
+    since: int = Query(ge=0, description="Revision the client is synced to, 0 to get every item"),
+    item_return_type: ItemReturnType = ItemReturnType.B64,
+) -> WCSResponse[BetaItemChangesResponse]:
+    """
+    List the items added, changed and deleted since a revision of the beta list, and the current revision.
+    If `reset` is true, the changes are not available anymore and the whole list must be reloaded.
+    """
+    return WCSResponse(data=await get_beta_changes(session, since, item_return_type))
+
+
+@BetaRouter.get("/items/search", summary="Search Beta Items")
+@metadata.rate_limit(limit=30, period=60)
+@metadata.cached(expire=30)
+async def search_beta_items_route(
+    session: ReadSessionDep,
+    query: Annotated[BetaItemSearchQuery, Query()],
+) -> WCSResponse[BetaItemListResponse]:
+    """
+    Search the beta list by level range, rarities, gear types, class requirements and identifications.
+    List filters match any of their values, except `identifications` which the items must all have.
+    """
+    return WCSResponse(
+        data=BetaItemListResponse(items=query.item_return_type.format_items(await search_beta_items(session, query)))
+    )
 
 
 @BetaRouter.post("/items/filter", summary="List Beta Items Filtered")
 @metadata.rate_limit(limit=10, period=60)
 @metadata.cached(expire=30)
 async def list_beta_items_filtered(
-    session: SessionDep,
+    session: ReadSessionDep,
     names: list[str] = Body(default_factory=list, description="Optional list of item names to filter by"),
     item_return_type: ItemReturnType = ItemReturnType.B64,
 ) -> WCSResponse[BetaItemListResponse]:
@@ -51,7 +143,7 @@ async def list_beta_items_filtered(
 
 
 @BetaRouter.post("/items", summary="Submit new Beta Item")
-@metadata.rate_limit(limit=300, period=60)
+@metadata.rate_limit(limit=300, period=60, cost=json_length_cost("items"))
 async def submit_beta_item(items: NewItemSubmission, session: SessionDep) -> EmptyResponse:
     """
     Submit new items to be added to the beta list.
@@ -61,7 +153,7 @@ async def submit_beta_item(items: NewItemSubmission, session: SessionDep) -> Emp
 
 
 @BetaRouter.post("/items/patch", summary="Patch existing Beta Items")
-@metadata.rate_limit(limit=300, period=60)
+@metadata.rate_limit(limit=300, period=60, cost=json_length_cost("items"))
 async def patch_beta_items(submission: ItemPatchSubmission, session: SessionDep) -> EmptyResponse:
     """
     Patch existing items in the beta list. Only fields specified in the submission will be updated.
@@ -3,6 +3,8 @@ from enum import StrEnum
 
 from pydantic import BaseModel, Field
 
+from app.schemas.enums import ItemReturnType
+
 
 class NewItemSubmission(BaseModel):
     client_timestamp: datetime
@@ -20,6 +22,46 @@ class BetaItemListResponse(BaseModel):
     )
 
 
+class BetaRevisionResponse(BaseModel):
+    revision: int = Field(
+        description="Revision of the beta list, increased by every change to it",
+        examples=[42],
+    )
+
+
+class BetaItemChangesResponse(BaseModel):
+    revision: int = Field(
+        description="Current revision of the beta list, to pass as `since` in the next request",
+        examples=[42],
+    )
+    reset: bool = Field(
+        description="Whether the changes since the given revision are unavailable, "
+        + "in which case the whole list must be reloaded",
+        examples=[False],
+    )
+    items: list[str] | list[dict] = Field(
+        description="Items added or changed since the given revision, "
+        + "format depends on item_return_type query parameter",
+        examples=[["aXRlbV9kYXRhXzE="]],
+    )
+    deleted: list[str] = Field(
+        description="Names of the items deleted since the given revision",
+        examples=[["Item Name"]],
+    )
+
+
+class BetaItemSearchQuery(BaseModel):
+    min_level: int | None = Field(default=None, ge=0, description="Minimum level of the items")
+    max_level: int | None = Field(default=None, ge=0, description="Maximum level of the items")
+    rarity: list[int] = Field(default_factory=list, description="Rarities to match, any of them")
+    gear_type: list[int] = Field(default_factory=list, description="Gear types to match, any of them")
+    class_req: list[int] = Field(default_factory=list, description="Class requirements to match, any of them")
+    identifications: list[int] = Field(default_factory=list, description="Identification ids the items must all have")
+    limit: int = Field(default=100, ge=1, le=1000, description="Maximum number of items to return")
+    offset: int = Field(default=0, ge=0, description="Number of matching items to skip")
+    item_return_type: ItemReturnType = ItemReturnType.B64
+
+
 class PatchableItemField(StrEnum):
     POWDER = "powder"
 
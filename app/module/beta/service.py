@@ -1,46 +1,121 @@
+import datetime
 from base64 import b64decode
+from collections.abc import AsyncIterator, Iterable, Sequence
 
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.db import get_session
 from app.core.log import LOGGER
+from app.core.metrics import JOB_DURATION, SUBMISSION_ITEMS
+from app.core.scheduler import SCHEDULER
+from app.core.streaming import StreamFormat, delimited_stream, ndjson_stream
+from app.schemas.enums import ItemReturnType
 from wynnsource import WynnSourceItem
 
 from .config import BETA_CONFIG
-from .model import BetaItemRepository
-from .schema import ItemPatchSubmission, NewItemSubmission, PatchableItemField
+from .model import BetaItem, BetaItemRepository, canonical_digest, item_digest
+from .schema import (
+    BetaItemChangesResponse,
+    BetaItemSearchQuery,
+    ItemPatchSubmission,
+    NewItemSubmission,
+    PatchableItemField,
+)
+from .snapshot import BETA_SNAPSHOTS
 
 allowed_version = BETA_CONFIG.allowed_versions
 
+_prune_duration = JOB_DURATION.labels("prune_beta_changes")
+
+# Rows fetched at a time by the cursor of streamed lists
+STREAM_BATCH_SIZE = 500
+
 
 async def handle_item_submission(submission: NewItemSubmission, session: AsyncSession) -> None:
     if not any(version in submission.mod_version for version in allowed_version):
         LOGGER.debug(f"Submission version {submission.mod_version} is not allowed, skipping submission")
         return
     itemRepo = BetaItemRepository(session)
-    succeeds = 0
-    for item in submission.items:
+    payloads = [(payload, item_digest(payload)) for payload in decode_payloads(submission.items)]
+
+    # Most submissions repeat stored items, which are recognized by their digest without being parsed
+    known_digests = await itemRepo.get_known_digests(list({digest for _, digest in payloads})) if payloads else set()
+    items: dict[str, tuple[WynnSourceItem, bytes]] = {}
+    for payload, digest in payloads:
+        if digest in known_digests:
+            LOGGER.debug("Item from submission is identical to an existing item")
+            continue
         try:
-            item = WynnSourceItem.FromString(b64decode(item))
-            existing = await itemRepo.get_item(item.name)
-            existing = WynnSourceItem.FromString(existing.item) if existing else None
-            if not check_item_validity(item):
-                LOGGER.debug(f"Item from submission is invalid: {item.name}")
-                continue
-            if existing and item == existing:
-                LOGGER.debug(f"Item from submission is identical to existing item: {item.name}")
+            item = WynnSourceItem.FromString(payload)
+        except Exception as e:
+            LOGGER.debug(f"Failed to decode item from submission, error: {e}")
+            continue
+        if not check_item_validity(item):
+            LOGGER.debug(f"Item from submission is invalid: {item.name}")
+            continue
+        items[item.name] = (item, canonical_digest(item))
+
+    existing_items = await get_existing_items(itemRepo, items)
+    changed: list[tuple[WynnSourceItem, bytes]] = []
+    for name, (item, digest) in items.items():
+        existing = existing_items.get(name)
+        if existing is not None:
+            if existing.digest == digest:
+                LOGGER.debug(f"Item from submission is identical to existing item: {name}")
                 continue
-            if existing and item != existing:
-                LOGGER.debug(f"Item from submission is different from existing item: {item.name}," + " overwriting")
-            if existing and existing.gear.powders:
-                item.gear.powders.extend(existing.gear.powders)
-            await itemRepo.add_item(item)
-            succeeds += 1
+            LOGGER.debug(f"Item from submission is different from existing item: {name}," + " overwriting")
+            # Only changed items are parsed, to carry their powders over
+            existing_item = WynnSourceItem.FromString(existing.item)
+            item.gear.powders.extend(existing_item.gear.powders)
+        changed.append((item, digest))
+
+    await itemRepo.upsert_items(changed)
+    succeeds = len(changed)
+    if changed:
+        await itemRepo.record_changes(upserted=[item.name for item, _ in changed])
+
+    SUBMISSION_ITEMS.labels("beta", "accepted").inc(succeeds)
+    SUBMISSION_ITEMS.labels("beta", "rejected").inc(len(submission.items) - succeeds)
+    LOGGER.info(f"Processed {succeeds}/{len(submission.items)} items from beta submission")
+
+
+def decode_payloads(encoded_items: Sequence[str]) -> list[bytes]:
+    """
+    Decode the base64 encoding of the items of a submission, skipping the ones that fail to decode.
+    """
+    payloads = []
+    for encoded in encoded_items:
+        try:
+            payloads.append(b64decode(encoded))
         except Exception as e:
-            LOGGER.debug(f"Failed to add item from submission, error: {e}")
+            LOGGER.debug(f"Failed to decode item from submission, error: {e}")
             # Silently ignore failed items
-            pass
+    return payloads
 
-    LOGGER.info(f"Processed {succeeds}/{len(submission.items)} items from beta submission")
+
+def decode_items(encoded_items: Sequence[str]) -> list[WynnSourceItem]:
+    """
+    Decode the items of a submission, skipping the ones that fail to decode.
+    """
+    items = []
+    for payload in decode_payloads(encoded_items):
+        try:
+            items.append(WynnSourceItem.FromString(payload))
+        except Exception as e:
+            LOGGER.debug(f"Failed to decode item from submission, error: {e}")
+            # Silently ignore failed items
+    return items
+
+
+async def get_existing_items(itemRepo: BetaItemRepository, names: Iterable[str]) -> dict[str, BetaItem]:
+    """
+    Fetch the stored items with the given names in one query, keyed by name.
+    """
+    names = list(names)
+    if not names:
+        return {}
+    return {beta_item.name: beta_item for beta_item in await itemRepo.get_items_by_names(names)}
 
 
 def check_item_validity(item: WynnSourceItem) -> bool:
@@ -64,10 +139,65 @@ def check_item_validity(item: WynnSourceItem) -> bool:
     return True
 
 
-async def get_beta_items(session: AsyncSession) -> list[bytes]:
+async def get_beta_revision(session: AsyncSession) -> int:
+    return await BetaItemRepository(session).get_revision()
+
+
+async def get_beta_snapshot(session: AsyncSession, revision: int, item_return_type: ItemReturnType) -> bytes:
+    """
+    Get the serialized list response of a beta revision, which must be the current one of the session.
+    """
+    return await BETA_SNAPSHOTS.get(session, revision, item_return_type)
+
+
+async def stream_beta_items(
+    session: AsyncSession, stream: StreamFormat, item_return_type: ItemReturnType
+) -> AsyncIterator[bytes]:
+    """
+    Stream the beta list in the given format, reading it through a server-side cursor.
+    The session must stay open until the stream ends, like the session dependencies of streaming responses do.
+    """
+    blobs = BetaItemRepository(session).stream_item_blobs(STREAM_BATCH_SIZE)
+    match stream:
+        case StreamFormat.NDJSON:
+            chunks = ndjson_stream(item_return_type.format_item(blob) async for blob in blobs)
+        case StreamFormat.PROTOBUF:
+            # The protobuf stream carries the serialized items as stored, whatever the return type
+            chunks = delimited_stream(blobs)
+    async for chunk in chunks:
+        yield chunk
+
+
+async def get_beta_changes(
+    session: AsyncSession, since: int, item_return_type: ItemReturnType
+) -> BetaItemChangesResponse:
+    """
+    Get the items changed and deleted after revision ``since``, up to the current revision.
+    """
     itemRepo = BetaItemRepository(session)
-    beta_items = await itemRepo.list_items()
-    return [item.item for item in beta_items]
+    revision = await itemRepo.get_revision()
+    # Deletions the client has not seen may have been pruned
+    if since < await itemRepo.get_pruned_revision():
+        return BetaItemChangesResponse(revision=revision, reset=True, items=[], deleted=[])
+    # A replica lagging behind the one the client synced on has nothing newer, the client keeps its revision
+    if since > revision:
+        return BetaItemChangesResponse(revision=since, reset=False, items=[], deleted=[])
+
+    changes = await itemRepo.list_changes(since, revision) if since < revision else []
+    upserted = [name for name, deleted in changes if not deleted]
+    # Items deleted since the revision was read are missing here, and reported by the next poll
+    items = await itemRepo.get_items_by_names(upserted) if upserted else []
+    return BetaItemChangesResponse(
+        revision=revision,
+        reset=False,
+        items=item_return_type.format_items([item.item for item in items]),
+        deleted=[name for name, deleted in changes if deleted],
+    )
+
+
+async def search_beta_items(session: AsyncSession, query: BetaItemSearchQuery) -> list[bytes]:
+    itemRepo = BetaItemRepository(session)
+    return list(await itemRepo.search_items(query))
 
 
 async def get_beta_items_by_name(session: AsyncSession, name: list[str]) -> list[bytes]:
@@ -81,53 +211,68 @@ async def handle_patch_submission(submission: ItemPatchSubmission, session: Asyn
         LOGGER.debug(f"Submission version {submission.mod_version} is not allowed, skipping submission")
         return
     itemRepo = BetaItemRepository(session)
-    succeeds = 0
+    patches = {item.name: item for item in decode_items(submission.items)}
+    existing_items = await get_existing_items(itemRepo, patches)
+    patched: list[tuple[WynnSourceItem, bytes]] = []
     match submission.patch:
         case PatchableItemField.POWDER:
-            for item in submission.items:
-                try:
-                    item = WynnSourceItem.FromString(b64decode(item))
-                    existing = await itemRepo.get_item(item.name)
-                    if not existing:
-                        LOGGER.debug(f"Item from patch submission does not exist in beta: {item.name}")
-                        continue
-                    existing_item = WynnSourceItem.FromString(existing.item)
-                    del existing_item.gear.powders[:]
-                    existing_item.gear.powders.extend(item.gear.powders)
-                    await itemRepo.add_item(existing_item)
-                    succeeds += 1
-                except Exception as e:
-                    LOGGER.debug(f"Failed to patch item from submission, error: {e}")
-                    # Silently ignore failed items
-                    pass
+            for name, item in patches.items():
+                existing = existing_items.get(name)
+                if existing is None:
+                    LOGGER.debug(f"Item from patch submission does not exist in beta: {name}")
+                    continue
+                existing_item = WynnSourceItem.FromString(existing.item)
+                del existing_item.gear.powders[:]
+                existing_item.gear.powders.extend(item.gear.powders)
+                # Patches keep the digest of the submitted item, so repeats of it are still recognized
+                patched.append((existing_item, existing.digest))
+
+    await itemRepo.upsert_items(patched)
+    succeeds = len(patched)
+    if patched:
+        await itemRepo.record_changes(upserted=[item.name for item, _ in patched])
 
+    SUBMISSION_ITEMS.labels("beta_patch", "accepted").inc(succeeds)
+    SUBMISSION_ITEMS.labels("beta_patch", "rejected").inc(len(submission.items) - succeeds)
     LOGGER.info(f"Processed {succeeds}/{len(submission.items)} items from beta patch submission")
 
 
 async def handle_delete_beta_items(items: list[str], session: AsyncSession):
     itemRepo = BetaItemRepository(session)
-    deleted_count = 0
-    for item in items:
-        try:
-            await itemRepo.delete_item(item)
-            deleted_count += 1
-        except Exception as e:
-            LOGGER.debug(f"Failed to delete item: {item}, error: {e}")
-            # Silently ignore failed deletions
-            pass
-    LOGGER.info(f"Deleted {deleted_count}/{len(items)} items from beta")
+    deleted = await itemRepo.delete_items(items)
+    if deleted:
+        await itemRepo.record_changes(deleted=deleted)
+    LOGGER.info(f"Deleted {len(deleted)}/{len(items)} items from beta")
 
 
 async def handle_clear_beta_items(session: AsyncSession):
     itemRepo = BetaItemRepository(session)
-    beta_items = await itemRepo.list_items()
-    deleted_count = 0
-    for item in beta_items:
-        try:
-            await itemRepo.delete_item(item.name)
-            deleted_count += 1
-        except Exception as e:
-            LOGGER.debug(f"Failed to delete item: {item.name}, error: {e}")
-            # Silently ignore failed deletions
-            pass
-    LOGGER.info(f"Cleared {deleted_count} items from beta")
+    deleted = await itemRepo.clear_items()
+    if deleted:
+        await itemRepo.record_changes(deleted=deleted)
+    LOGGER.info(f"Cleared {len(deleted)} items from beta")
+
+
+@SCHEDULER.scheduled_job(
+    IntervalTrigger(hours=6),
+    id="prune_beta_changes",
+    misfire_grace_time=60,
+    coalesce=True,
+)
+async def prune_beta_changes():
+    """
+    Prune the beta change log down to the latest change of each item, dropping deletions past the retention.
+    """
+    with _prune_duration.time():
+        async with get_session() as session:
+            itemRepo = BetaItemRepository(session)
+            # The lock is held until the pruning transaction ends, so the other workers skip it
+            if not await itemRepo.try_advisory_lock("beta_change_pruning"):
+                LOGGER.debug("Beta change pruning is running in another worker, skipping")
+                return
+            pruned = await itemRepo.prune_changes(
+                datetime.datetime.now(tz=datetime.UTC)
+                - datetime.timedelta(days=BETA_CONFIG.beta_change_tombstone_retention)
+            )
+        if pruned:
+            LOGGER.info(f"Pruned {pruned} beta item changes")
@@ -0,0 +1,91 @@
+"""
+Precomputed responses of the full beta list.
+
+The beta list only changes on submissions, and every write bumps the beta revision.
+A snapshot of the list response is built at most once per revision and return type,
+shared between the workers through the cache, and kept in process until the revision changes.
+"""
+
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import Cache, get_cache
+from app.schemas.enums import ItemReturnType
+from app.schemas.response import WCSResponse
+
+from .config import BETA_CONFIG
+from .model import BetaItemRepository
+from .schema import BetaItemListResponse
+
+
+class BetaSnapshotCache:
+    def __init__(self, cache: Cache, expire: int):
+        self.cache = cache
+        self.expire = expire
+        self._local: dict[ItemReturnType, tuple[int, bytes]] = {}
+        self._locks: defaultdict[ItemReturnType, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    @staticmethod
+    def _key(revision: int, return_type: ItemReturnType) -> str:
+        return f"beta:snapshot:{revision}:{return_type.value}"
+
+    def _get_local(self, revision: int, return_type: ItemReturnType) -> bytes | None:
+        local = self._local.get(return_type)
+        return local[1] if local is not None and local[0] == revision else None
+
+    async def get(self, session: AsyncSession, revision: int, return_type: ItemReturnType) -> bytes:
+        """
+        Get the serialized list response of the given revision, building it if no worker has yet.
+        """
+        snapshot = self._get_local(revision, return_type)
+        if snapshot is not None:
+            return snapshot
+
+        # Concurrent requests for a new revision wait for a single build
+        async with self._locks[return_type]:
+            snapshot = self._get_local(revision, return_type)
+            if snapshot is not None:
+                return snapshot
+
+            raw = await self.cache.get(self._key(revision, return_type))
+            if raw is None:
+                itemRepo = BetaItemRepository(session)
+                items = await itemRepo.list_item_blobs()
+                raw = WCSResponse[BetaItemListResponse](
+                    data=BetaItemListResponse(items=return_type.format_items(list(items)))
+                ).model_dump_json()
+                # The items are read in their own statement and may hold writes committed after the revision,
+                # such a list is served to this request but not cached as the snapshot of the revision
+                if await itemRepo.get_revision() != revision:
+                    return raw.encode()
+                await self.cache.set(self._key(revision, return_type), raw, expire=self.expire)
+
+            snapshot = raw.encode()
+            # A slow request must not replace the snapshot of a newer revision
+            local = self._local.get(return_type)
+            if local is None or local[0] < revision:
+                self._local[return_type] = (revision, snapshot)
+            return snapshot
+
+
+def snapshot_etag(revision: int, return_type: ItemReturnType) -> str:
+    return f'"{revision}-{return_type.value}"'
+
+
+def etag_revision(if_none_match: str | None, return_type: ItemReturnType) -> int | None:
+    """
+    Get the newest revision of the list in the return type that an ``If-None-Match`` header holds, if any.
+    """
+    revisions = []
+    for etag in (if_none_match or "").split(","):
+        revision, _, etag_type = etag.strip().removeprefix("W/").strip('"').partition("-")
+        if etag_type == return_type.value and revision.isdigit():
+            revisions.append(int(revision))
+    return max(revisions, default=None)
+
+
+BETA_SNAPSHOTS = BetaSnapshotCache(get_cache(), BETA_CONFIG.beta_snapshot_expire)
+
+__all__ = ["BETA_SNAPSHOTS", "BetaSnapshotCache", "etag_revision", "snapshot_etag"]
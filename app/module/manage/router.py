@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Query
 
 import app.core.metadata as metadata
-from app.core.db import SessionDep
+from app.core.db import ReadSessionDep, SessionDep
 from app.core.log import LOGGER
 from app.core.router import DocedAPIRoute
 from app.core.security.auth import IpDep, UserDep, hash_token, hash_tokens
 from app.core.security.model import User, UserRepository
+from app.core.security.principal import PRINCIPAL_CACHE
 from app.schemas.enums import ApiTag
 from app.schemas.response import EMPTY_RESPONSE, WCSResponse
 
@@ -17,7 +18,7 @@ ManageRouter = APIRouter(route_class=DocedAPIRoute, prefix="/manage", tags=[ApiT
 @ManageRouter.get("/user", summary="Get User Info by Token")
 @metadata.permission(permission="admin.users.read")
 async def get_user_info_by_token(
-    session: SessionDep,
+    session: ReadSessionDep,
     token: list[str] = Query(),
 ) -> WCSResponse[list[UserInfoResponse]]:
     """
@@ -33,7 +34,7 @@ async def get_user_info_by_token(
 @ManageRouter.get("/user/all", summary="List Users")
 @metadata.permission("admin.users.read")
 async def get_users(
-    session: SessionDep,
+    session: ReadSessionDep,
     inactive: bool = False,
 ) -> WCSResponse[list[UserInfoResponse]]:
     """
@@ -83,17 +84,19 @@ async def create_user(
     Create a new user with specified token and permissions.
     """
     userRepo = UserRepository(session)
-    created_tokens: list[UserInfoResponse] = []
-    for token_info in tokens:
-        user = User(
-            token=hash_token(token_info.token),
-            is_active=True,
-            permissions=token_info.permissions,
-            expires_at=token_info.expires_at,
-            creation_ip=ip,
-        )
-        await userRepo.save(user)
-        created_tokens.append(UserInfoResponse.model_validate(user))
+    users = await userRepo.create_users(
+        [
+            {
+                "token": hash_token(token_info.token),
+                "is_active": True,
+                "permissions": token_info.permissions,
+                "expires_at": token_info.expires_at,
+                "creation_ip": ip,
+            }
+            for token_info in tokens
+        ]
+    )
+    created_tokens = [UserInfoResponse.model_validate(user) for user in users]
 
     LOGGER.info(
         f"Created {len(created_tokens)} new users: {[hash_token(u.token) for u in created_tokens]}"
@@ -110,6 +113,9 @@ async def delete_user(tokens: list[str], session: SessionDep) -> WCSResponse[dic
     tokens = hash_tokens(tokens)
     userRepo = UserRepository(session)
     await userRepo.delete(tokens)
+    # Commit first, a request authenticating in between would otherwise cache the old row again
+    await session.commit()
+    await PRINCIPAL_CACHE.invalidate(tokens)
     LOGGER.info(f"Deleted {len(tokens)} users: {tokens}")
     return EMPTY_RESPONSE
 
@@ -124,10 +130,9 @@ async def add_permissions_to_user(
     """
     userRepo = UserRepository(session)
     token_strs = hash_tokens(token_str)
-    users = await userRepo.get_users_by_tokens(token_strs, include_inactive=True)
-
-    for user in users:
-        user.permissions = list(set(user.permissions + permissions))
+    users = await userRepo.add_permissions(token_strs, permissions)
+    await session.commit()
+    await PRINCIPAL_CACHE.invalidate(token_strs)
 
     updated_user_infos = [UserInfoResponse.model_validate(user) for user in users]
     LOGGER.info(f"Added permissions {permissions} to users: {token_strs}")
@@ -144,10 +149,9 @@ async def remove_permissions_from_user(
     """
     token_strs = hash_tokens(token_str)
     userRepo = UserRepository(session)
-    users = await userRepo.get_users_by_tokens(token_strs, include_inactive=True)
-
-    for user in users:
-        user.permissions = list(set(user.permissions) - set(permissions))
+    users = await userRepo.remove_permissions(token_strs, permissions)
+    await session.commit()
+    await PRINCIPAL_CACHE.invalidate(token_strs)
 
     updated_user_infos = [UserInfoResponse.model_validate(user) for user in users]
     LOGGER.info(f"Removed permissions {permissions} from users: {token_strs}")
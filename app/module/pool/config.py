@@ -1,7 +1,11 @@
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
+from typing import Annotated
 from zoneinfo import ZoneInfo
 
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
 from app.core.score import Tier
 
 from .schema import PoolType
@@ -62,6 +66,8 @@ POOL_REFRESH_CONFIG = {
 }
 
 FUZZY_WINDOW = timedelta(minutes=90)
+# Submissions are accepted with client timestamps this far from the server time
+CLIENT_TIMESTAMP_SKEW = timedelta(minutes=10)
 
 WEIGHT_MAP: dict[Tier | str, float] = {
     Tier.Rookie: 0.1,
@@ -76,3 +82,47 @@ WEIGHT_MAP: dict[Tier | str, float] = {
 }
 
 CONSENSUS_THRESHOLD = 0.6
+
+# Upper bounds of the weight histogram buckets of archived pools, heavier submissions go in a last bucket
+ARCHIVE_WEIGHT_BUCKETS = tuple(sorted(set(WEIGHT_MAP.values())))
+
+
+class PoolStorageConfig(BaseSettings):
+    """
+    Storage of pool submissions, which are partitioned by rotation week.
+    """
+
+    partition_premake_weeks: Annotated[
+        int, Field(alias="POOL_PARTITION_PREMAKE_WEEKS", ge=1, description="Weeks of partitions created ahead")
+    ] = 4
+    submission_retention_weeks: Annotated[
+        int,
+        Field(
+            alias="POOL_SUBMISSION_RETENTION_WEEKS",
+            ge=0,
+            description="Weeks after which submission partitions are removed, 0 to keep them forever",
+        ),
+    ] = 12
+    drop_expired_partitions: Annotated[
+        bool,
+        Field(
+            alias="POOL_DROP_EXPIRED_PARTITIONS",
+            description="Drop expired partitions instead of only detaching them from the submissions table",
+        ),
+    ] = False
+    compaction_delay: Annotated[
+        int,
+        Field(
+            alias="POOL_COMPACTION_DELAY",
+            # Late submissions must not land in pools already archived
+            ge=int(CLIENT_TIMESTAMP_SKEW.total_seconds()),
+            description="Seconds after the end of a rotation before its pools are archived and compacted, "
+            + "at least the accepted client timestamp skew",
+        ),
+    ] = 2 * 60 * 60
+    compaction_batch_size: Annotated[
+        int, Field(alias="POOL_COMPACTION_BATCH_SIZE", ge=1, description="Raw submissions deleted per transaction")
+    ] = 1000
+
+
+POOL_STORAGE_CONFIG = PoolStorageConfig()
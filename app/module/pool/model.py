@@ -1,3 +1,4 @@
+from collections.abc import AsyncIterator
 from datetime import datetime
 from typing import Literal
 
@@ -11,8 +12,11 @@ from sqlalchemy import (
     LargeBinary,
     String,
     UniqueConstraint,
+    delete,
     func,
     select,
+    tuple_,
+    update,
 )
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
@@ -64,6 +68,8 @@ class PoolSubmission(Base):
     __tablename__ = "pool_submissions"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Copied from the pool, the table is partitioned by rotation week (see .partition)
+    rotation_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
 
     rotation_id: Mapped[int | None] = mapped_column(
         ForeignKey("pools.id", ondelete="CASCADE"), index=True, nullable=True
@@ -84,6 +90,29 @@ class PoolSubmission(Base):
 
     weight: Mapped[float] = mapped_column(Float, nullable=False)
 
+    __table_args__ = ({"postgresql_partition_by": "RANGE (rotation_start)"},)
+
+
+class PoolArchive(Base):
+    """
+    Final summary of a pool whose rotation has ended, kept after its raw submissions are deleted.
+    """
+
+    __tablename__ = "pool_archives"
+
+    pool_id: Mapped[int] = mapped_column(ForeignKey("pools.id", ondelete="CASCADE"), primary_key=True)
+
+    consensus_data: Mapped[list[bytes]] = mapped_column(ARRAY(LargeBinary), nullable=False)
+    confidence: Mapped[float] = mapped_column(Float, nullable=False)
+    submission_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Number of submissions per weight bucket, see ARCHIVE_WEIGHT_BUCKETS
+    weight_histogram: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+    contributor_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Set once all raw submissions of the pool have been deleted
+    compacted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
 
 class PoolRepository(BaseRepository):
     async def get_by_key(
@@ -107,7 +136,13 @@ class PoolRepository(BaseRepository):
         needs_recalc: bool | None = None,
         order_by: Literal["rotation_start", "page"] | None = None,
     ) -> list[Pool]:
-        query = select(Pool).options(selectinload(Pool.submissions))
+        if rotation_start:
+            # Only scan the partition of the rotation
+            query = select(Pool).options(
+                selectinload(Pool.submissions.and_(PoolSubmission.rotation_start == rotation_start))
+            )
+        else:
+            query = select(Pool).options(selectinload(Pool.submissions))
         if pool_type is not None:
             query = query.where(Pool.pool_type == pool_type.value)
         if region is not None:
@@ -127,6 +162,26 @@ class PoolRepository(BaseRepository):
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
+    async def stream_consensus(
+        self, pool_type: PoolType, region: str, rotation_start: datetime, batch_size: int
+    ) -> AsyncIterator[tuple[int, list[bytes], float]]:
+        """
+        Iterate over the page, consensus and confidence of the pools of a rotation, ordered by page,
+        through a server-side cursor and without loading the submissions.
+        """
+        result = await self.session.stream(
+            select(Pool.page, Pool.consensus_data, Pool.confidence)
+            .where(
+                Pool.pool_type == pool_type.value,
+                Pool.region == region,
+                Pool.rotation_start == rotation_start,
+            )
+            .order_by(Pool.page)
+            .execution_options(yield_per=batch_size)
+        )
+        async for page, consensus_data, confidence in result:
+            yield page, consensus_data, confidence
+
     async def save(self, pool: Pool) -> None:
         self.session.add(pool)
         await self.session.flush()
@@ -173,17 +228,19 @@ class PoolSubmissionRepository(BaseRepository):
         await self.session.delete(submission)
         await self.session.flush()
 
-    async def list_submissions_for_rotation(self, rotation_id: int) -> list[PoolSubmission]:
-        query = select(PoolSubmission).where(PoolSubmission.rotation_id == rotation_id)
+    async def list_submissions_for_rotation(self, pool: Pool) -> list[PoolSubmission]:
+        query = select(PoolSubmission).where(
+            PoolSubmission.rotation_id == pool.id,
+            PoolSubmission.rotation_start == pool.rotation_start,
+        )
         result = await self.session.execute(query)
         return list(result.scalars().all())
 
-    async def get_user_submission_for_rotation(
-        self, user_id: int, rotation_id: int
-    ) -> PoolSubmission | None:
+    async def get_user_submission_for_rotation(self, user_id: int, pool: Pool) -> PoolSubmission | None:
         query = select(PoolSubmission).where(
             PoolSubmission.user_id == user_id,
-            PoolSubmission.rotation_id == rotation_id,
+            PoolSubmission.rotation_id == pool.id,
+            PoolSubmission.rotation_start == pool.rotation_start,
         )
         result = await self.session.execute(query)
         return result.scalars().first()
@@ -192,3 +249,57 @@ class PoolSubmissionRepository(BaseRepository):
         query = select(PoolSubmission).where(PoolSubmission.user_id == user_id)
         result = await self.session.execute(query)
         return list(result.scalars().all())
+
+    async def delete_submissions_for_rotation(self, pool: Pool, limit: int) -> int:
+        """
+        Delete up to ``limit`` submissions of the pool.
+
+        :return: The number of deleted submissions.
+        """
+        batch = (
+            select(PoolSubmission.id, PoolSubmission.rotation_start)
+            .where(
+                PoolSubmission.rotation_id == pool.id,
+                PoolSubmission.rotation_start == pool.rotation_start,
+            )
+            .limit(limit)
+        )
+        result = await self.session.execute(
+            delete(PoolSubmission).where(tuple_(PoolSubmission.id, PoolSubmission.rotation_start).in_(batch))
+        )
+        return result.rowcount  # type: ignore[attr-defined]
+
+
+class PoolArchiveRepository(BaseRepository):
+    async def list_pools_to_archive(self, ended_before: datetime, limit: int) -> list[Pool]:
+        query = (
+            select(Pool)
+            .outerjoin(PoolArchive, PoolArchive.pool_id == Pool.id)
+            .where(PoolArchive.pool_id.is_(None), Pool.rotation_end < ended_before)
+            .order_by(Pool.rotation_end)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def list_uncompacted_pools(self) -> list[Pool]:
+        """
+        List the archived pools whose raw submissions have not all been deleted yet.
+        """
+        query = (
+            select(Pool)
+            .join(PoolArchive, PoolArchive.pool_id == Pool.id)
+            .where(PoolArchive.compacted_at.is_(None))
+            .order_by(Pool.id)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def save(self, archive: PoolArchive) -> None:
+        self.session.add(archive)
+        await self.session.flush()
+
+    async def mark_compacted(self, pool_id: int) -> None:
+        await self.session.execute(
+            update(PoolArchive).where(PoolArchive.pool_id == pool_id).values(compacted_at=func.now())
+        )
@@ -0,0 +1,105 @@
+"""
+Weekly range partitions of the ``pool_submissions`` table, keyed by the rotation start of each submission.
+
+Partitions cover Monday to Monday in UTC. All rotations start on the same weekday,
+so every rotation falls in exactly one partition and queries on the active rotation only scan that one.
+"""
+
+from datetime import UTC, date, datetime, time, timedelta
+
+from sqlalchemy import text
+
+from app.core.db import BaseRepository
+
+PARTITIONED_TABLE = "pool_submissions"
+
+
+def partition_week(moment: datetime) -> date:
+    """
+    Get the first day of the partition holding the given rotation start.
+    """
+    day = moment.astimezone(UTC).date()
+    return day - timedelta(days=day.weekday())
+
+
+def partition_name(week: date) -> str:
+    return f"{PARTITIONED_TABLE}_{week:%Y%m%d}"
+
+
+def _is_weekly_partition(name: str) -> bool:
+    suffix = name.removeprefix(f"{PARTITIONED_TABLE}_")
+    return suffix != name and len(suffix) == 8 and suffix.isdigit()
+
+
+def partition_bounds(week: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(week, time(), tzinfo=UTC)
+    return start, start + timedelta(weeks=1)
+
+
+class PoolPartitionRepository(BaseRepository):
+    async def lock(self) -> None:
+        """
+        Serialize partition maintenance until the end of the transaction.
+        """
+        await self.advisory_lock("pool_partitions")
+
+    async def list_partitions(self) -> list[str]:
+        result = await self.session.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                + "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                + "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                + "WHERE parent.relname = :table ORDER BY child.relname"
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        return list(result.scalars().all())
+
+    async def create_partitions(self, first_week: date, weeks: int) -> list[str]:
+        """
+        Create the partitions of ``weeks`` weeks starting at ``first_week`` that do not exist yet.
+
+        :return: The names of the created partitions.
+        """
+        existing = set(await self.list_partitions())
+        created = []
+        for offset in range(weeks):
+            week = first_week + timedelta(weeks=offset)
+            name = partition_name(week)
+            if name in existing:
+                continue
+            start, end = partition_bounds(week)
+            await self.session.execute(
+                text(
+                    f'CREATE TABLE "{name}" PARTITION OF "{PARTITIONED_TABLE}" '
+                    + f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+            created.append(name)
+        return created
+
+    async def remove_partitions_before(self, week: date, drop: bool) -> list[str]:
+        """
+        Detach the partitions of the weeks before ``week`` from the submissions table, and drop them if ``drop``.
+
+        :return: The names of the removed partitions.
+        """
+        removed = []
+        for name in await self.list_partitions():
+            # Names end with the first day of their week, so they sort by week
+            if not _is_weekly_partition(name) or name >= partition_name(week):
+                continue
+            await self.session.execute(text(f'ALTER TABLE "{PARTITIONED_TABLE}" DETACH PARTITION "{name}"'))
+            if drop:
+                await self.session.execute(text(f'DROP TABLE "{name}"'))
+            removed.append(name)
+        return removed
+
+
+__all__ = [
+    "PARTITIONED_TABLE",
+    "PoolPartitionRepository",
+    "partition_bounds",
+    "partition_name",
+    "partition_week",
+]
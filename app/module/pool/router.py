@@ -1,13 +1,15 @@
 import datetime
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from starlette.status import HTTP_422_UNPROCESSABLE_CONTENT
 
 from app.core import metadata
-from app.core.db import SessionDep, get_session
-from app.core.rate_limiter import ip_based_key_func, user_based_key_func
+from app.core.db import ReadSessionDep, get_session
+from app.core.rate_limiter import ip_based_key_func, json_length_cost, user_based_key_func
 from app.core.router import DocedAPIRoute
 from app.core.security.auth import UserDep
+from app.core.streaming import StreamFormat
 from app.schemas.enums import ApiTag, ItemReturnType
 from app.schemas.response import EMPTY_RESPONSE, EmptyResponse, WCSResponse
 
@@ -19,14 +21,14 @@ from .schema import (
     PoolType,
     RaidRegion,
 )
-from .service import compute_pool_consensus, get_pool_consensus
+from .service import compute_pool_consensus, get_pool_consensus, iter_pool_consensus, stream_pool_consensus
 from .service import submit_pool_data as svc_submit_pool_data
 
 PoolRouter = APIRouter(route_class=DocedAPIRoute, prefix="/pool", tags=[ApiTag.POOL])
 
 
 @PoolRouter.post("/submit", summary="Submit Pool Data")
-@metadata.rate_limit(limit=30, period=60, key_func=user_based_key_func)
+@metadata.rate_limit(limit=30, period=60, key_func=user_based_key_func, cost=json_length_cost())
 async def submit_pool_data(data: list[PoolSubmissionSchema], user: UserDep) -> EmptyResponse:
     """
     Endpoint for clients to submit pool data.
@@ -43,22 +45,45 @@ async def submit_pool_data(data: list[PoolSubmissionSchema], user: UserDep) -> E
     return EMPTY_RESPONSE
 
 
-@PoolRouter.get("/pools/{pool_type}/{region}", summary="Get Current Pool by Type and Region")
+@PoolRouter.get(
+    "/pools/{pool_type}/{region}",
+    summary="Get Current Pool by Type and Region",
+    response_model=WCSResponse[PoolConsensusResponse],
+)
 @metadata.rate_limit(limit=10, period=60, key_func=ip_based_key_func)
 @metadata.cached(expire=120)
 async def get_pools_by_type_and_region(
     pool_type: PoolType,
     region: LootPoolRegion | RaidRegion,
-    session: SessionDep,
+    session: ReadSessionDep,
     item_return_type: ItemReturnType = ItemReturnType.B64,
-) -> WCSResponse[PoolConsensusResponse]:
+    stream: StreamFormat | None = Query(
+        default=None,
+        description="Stream the consensus instead, as one line of newline delimited JSON per page",
+    ),
+) -> WCSResponse[PoolConsensusResponse] | StreamingResponse:
     """
     Get pools by type and region.
+
+    Streamed responses carry the rotation in the `X-Rotation-Start` and `X-Rotation-End` headers.
     """
     try:
         rotation = POOL_REFRESH_CONFIG[pool_type].get_rotation(
             datetime.datetime.now(tz=datetime.UTC)
         )
+        if stream is not None:
+            if stream != StreamFormat.NDJSON:
+                raise ValueError(f"Pools can only be streamed as {StreamFormat.NDJSON}")
+            pages = iter_pool_consensus(session, pool_type, region, rotation.start)
+            return StreamingResponse(
+                stream_pool_consensus(pages, item_return_type),
+                media_type=stream.media_type,
+                headers={
+                    "X-Rotation-Start": rotation.start.isoformat(),
+                    "X-Rotation-End": rotation.end.isoformat(),
+                },
+            )
+
         consensus_by_page = await get_pool_consensus(
             session,
             pool_type,
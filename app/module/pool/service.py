@@ -1,21 +1,42 @@
 import base64
+import bisect
 import datetime
 from collections import defaultdict
+from collections.abc import AsyncIterator, Sequence
 
 from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_session
 from app.core.log import LOGGER
+from app.core.metrics import JOB_DURATION, POOL_CONSENSUS_DIRTY_POOLS, SUBMISSION_ITEMS
 from app.core.scheduler import SCHEDULER
 from app.core.score import Tier
 from app.core.security.model import User
+from app.core.streaming import ndjson_stream
+from app.schemas.enums import ItemReturnType
 from wynnsource import WynnSourceItem
 
-from .config import CONSENSUS_THRESHOLD, FUZZY_WINDOW, POOL_REFRESH_CONFIG, WEIGHT_MAP
-from .model import PoolRepository, PoolSubmission, PoolSubmissionRepository
+from .config import (
+    ARCHIVE_WEIGHT_BUCKETS,
+    CLIENT_TIMESTAMP_SKEW,
+    CONSENSUS_THRESHOLD,
+    FUZZY_WINDOW,
+    POOL_REFRESH_CONFIG,
+    POOL_STORAGE_CONFIG,
+    WEIGHT_MAP,
+)
+from .model import Pool, PoolArchive, PoolArchiveRepository, PoolRepository, PoolSubmission, PoolSubmissionRepository
+from .partition import PoolPartitionRepository, partition_week
 from .schema import VALID_REGIONS, LootPoolRegion, PoolSubmissionSchema, PoolType, RaidRegion
 
+_consensus_duration = JOB_DURATION.labels("compute_pool_consensus")
+_partitions_duration = JOB_DURATION.labels("maintain_pool_partitions")
+_compaction_duration = JOB_DURATION.labels("compact_pool_rotations")
+
+# Pools archived per run of the compaction, so a backlog is worked off over several runs
+ARCHIVE_POOLS_PER_RUN = 50
+
 
 async def submit_pool_data(session: AsyncSession, data: PoolSubmissionSchema, user: User):
     # validation
@@ -25,7 +46,7 @@ async def submit_pool_data(session: AsyncSession, data: PoolSubmissionSchema, us
 
     # client timestamp check (we allow skew up to 10 minutes)
     now = datetime.datetime.now(tz=datetime.UTC)
-    if abs(now - data.client_timestamp) > datetime.timedelta(minutes=10):
+    if abs(now - data.client_timestamp) > CLIENT_TIMESTAMP_SKEW:
         raise ValueError("Client timestamp is too far from server time")
 
     #  items check and decoding
@@ -43,6 +64,9 @@ async def submit_pool_data(session: AsyncSession, data: PoolSubmissionSchema, us
             )
             continue  # we silently skip invalid items
 
+    SUBMISSION_ITEMS.labels("pool", "accepted").inc(len(items_decoded))
+    SUBMISSION_ITEMS.labels("pool", "rejected").inc(len(data.items) - len(items_decoded))
+
     if not items_decoded:
         raise ValueError("No valid items provided in the submission")
 
@@ -63,6 +87,7 @@ async def submit_pool_data(session: AsyncSession, data: PoolSubmissionSchema, us
     )
     submission = PoolSubmission(
         user_id=user.id,
+        rotation_start=pool.rotation_start,
         client_timestamp=data.client_timestamp,
         item_data=items_decoded,
         weight=calculate_submission_weight(user, fuzzy),
@@ -71,7 +96,7 @@ async def submit_pool_data(session: AsyncSession, data: PoolSubmissionSchema, us
     )
 
     #  user can have one submission of each pool for each rotation
-    existingSubmission = await submissionRepo.get_user_submission_for_rotation(user.id, pool.id)
+    existingSubmission = await submissionRepo.get_user_submission_for_rotation(user.id, pool)
 
     if existingSubmission is not None:
         # we delete it infavor of the new submission
@@ -106,11 +131,18 @@ def calculate_submission_weight(user: User, fuzzy: bool = False) -> float:
     coalesce=True,  # Coalesce multiple missed executions into one
 )
 async def compute_pool_consensus():
-    for pool_type in PoolType:
-        await compute_pool_consensus_for_pool(pool_type)
-
-
-async def compute_pool_consensus_for_pool(pool_type: PoolType):
+    with _consensus_duration.time():
+        dirty_pools = 0
+        for pool_type in PoolType:
+            dirty_pools += await compute_pool_consensus_for_pool(pool_type)
+        POOL_CONSENSUS_DIRTY_POOLS.set(dirty_pools)
+
+
+async def compute_pool_consensus_for_pool(pool_type: PoolType) -> int:
+    """
+    Recalculate the consensus of all active pools of the given type that need it.
+    Returns the number of pools that were recalculated.
+    """
     async with get_session() as session:
         # Step 1: Fetch all active pools that need consensus computation
         poolRepo = PoolRepository(session)
@@ -125,55 +157,159 @@ async def compute_pool_consensus_for_pool(pool_type: PoolType):
 
         # Step 2: For each pool, compute consensus and update the pool record
         for pool in active_pools:
-            submissions = pool.submissions
+            update_pool_consensus(pool, pool.submissions)
+
+        return len(active_pools)
+
+
+def update_pool_consensus(pool: Pool, submissions: Sequence[PoolSubmission]) -> None:
+    """
+    Compute the consensus of the pool from its submissions and clear its recalculation flag.
+    """
+    item_weights: dict[tuple[bytes, int], float] = defaultdict(float)
 
-            item_weights: dict[tuple[bytes, int], float] = defaultdict(float)
+    for submission in submissions:
+        local_counts = defaultdict(int)
 
-            for submission in submissions:
-                local_counts = defaultdict(int)
+        for item_data in submission.item_data:
+            local_counts[item_data] += 1
+            occurrence = local_counts[item_data]
 
-                for item_data in submission.item_data:
-                    local_counts[item_data] += 1
-                    occurrence = local_counts[item_data]
+            item_weights[(item_data, occurrence)] += submission.weight
 
-                    item_weights[(item_data, occurrence)] += submission.weight
+    pool.needs_recalc = False
 
-            if not item_weights:
-                pool.consensus_data = []
-                pool.confidence = 0.0
-                pool.needs_recalc = False
-                continue
+    if not item_weights:
+        pool.consensus_data = []
+        pool.confidence = 0.0
+        return
 
-            highest_weight = max(item_weights.values())
+    highest_weight = max(item_weights.values())
 
-            if highest_weight <= 0:
-                pool.consensus_data = []
-                pool.confidence = 0.0
-                pool.needs_recalc = False
-                continue
+    if highest_weight <= 0:
+        pool.consensus_data = []
+        pool.confidence = 0.0
+        return
 
-            threshold = highest_weight * CONSENSUS_THRESHOLD
+    threshold = highest_weight * CONSENSUS_THRESHOLD
 
-            consensus_items = []
-            consensus_weights = []
+    consensus_items = []
+    consensus_weights = []
 
-            for (item, _), weight in item_weights.items():
-                if weight >= threshold:
-                    consensus_items.append(item)
-                    consensus_weights.append(weight)
+    for (item, _), weight in item_weights.items():
+        if weight >= threshold:
+            consensus_items.append(item)
+            consensus_weights.append(weight)
 
-            pool.consensus_data = consensus_items
-            confidence = (
-                sum(consensus_weights) / (highest_weight * len(consensus_weights))
-                if consensus_weights
-                else 0.0
+    pool.consensus_data = consensus_items
+    confidence = sum(consensus_weights) / (highest_weight * len(consensus_weights)) if consensus_weights else 0.0
+    pool.confidence = round(confidence, 4)
+
+
+@SCHEDULER.scheduled_job(
+    IntervalTrigger(hours=6),
+    id="maintain_pool_partitions",
+    misfire_grace_time=60,
+    coalesce=True,
+    # Also run at startup, so the partition of the current week exists before the first submission
+    next_run_time=datetime.datetime.now(tz=datetime.UTC),
+)
+async def maintain_pool_partitions():
+    """
+    Create the submission partitions of the coming weeks and remove the partitions past the retention.
+    """
+    with _partitions_duration.time():
+        current_week = partition_week(datetime.datetime.now(tz=datetime.UTC))
+        async with get_session() as session:
+            partitionRepo = PoolPartitionRepository(session)
+            await partitionRepo.lock()
+
+            created = await partitionRepo.create_partitions(
+                current_week, POOL_STORAGE_CONFIG.partition_premake_weeks + 1
             )
-            pool.confidence = round(confidence, 4)
-            pool.needs_recalc = False
+            if created:
+                LOGGER.info(f"Created submission partitions {created}")
+
+            if POOL_STORAGE_CONFIG.submission_retention_weeks > 0:
+                removed = await partitionRepo.remove_partitions_before(
+                    current_week - datetime.timedelta(weeks=POOL_STORAGE_CONFIG.submission_retention_weeks),
+                    drop=POOL_STORAGE_CONFIG.drop_expired_partitions,
+                )
+                if removed:
+                    action = "Dropped" if POOL_STORAGE_CONFIG.drop_expired_partitions else "Detached"
+                    LOGGER.info(f"{action} expired submission partitions {removed}")
+
+
+def build_pool_archive(pool: Pool, submissions: Sequence[PoolSubmission]) -> PoolArchive:
+    histogram = [0] * (len(ARCHIVE_WEIGHT_BUCKETS) + 1)
+    for submission in submissions:
+        histogram[bisect.bisect_left(ARCHIVE_WEIGHT_BUCKETS, submission.weight)] += 1
+
+    return PoolArchive(
+        pool_id=pool.id,
+        consensus_data=list(pool.consensus_data),
+        confidence=pool.confidence,
+        submission_count=len(submissions),
+        weight_histogram=histogram,
+        contributor_ids=sorted({submission.user_id for submission in submissions}),
+    )
+
+
+@SCHEDULER.scheduled_job(
+    IntervalTrigger(minutes=10),
+    id="compact_pool_rotations",
+    misfire_grace_time=60,
+    coalesce=True,
+)
+async def compact_pool_rotations():
+    """
+    Archive the pools of ended rotations, then delete their raw submissions in batches.
+    """
+    with _compaction_duration.time():
+        ended_before = datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(
+            seconds=POOL_STORAGE_CONFIG.compaction_delay
+        )
+        # The lock is held by a transaction of its own for the whole run, so the other workers skip it
+        async with get_session() as lock_session:
+            if not await PoolArchiveRepository(lock_session).try_advisory_lock("pool_compaction"):
+                LOGGER.debug("Pool compaction is running in another worker, skipping")
+                return
+
+            # Archives are committed before any submission of their pool is deleted
+            async with get_session() as session:
+                archiveRepo = PoolArchiveRepository(session)
+                submissionRepo = PoolSubmissionRepository(session)
+                for pool in await archiveRepo.list_pools_to_archive(ended_before, ARCHIVE_POOLS_PER_RUN):
+                    submissions = await submissionRepo.list_submissions_for_rotation(pool)
+                    if pool.needs_recalc:
+                        # Submissions received since the last consensus run
+                        update_pool_consensus(pool, submissions)
+                    await archiveRepo.save(build_pool_archive(pool, submissions))
+
+                pending = await archiveRepo.list_uncompacted_pools()
+
+            # Every batch is deleted in its own transaction, to keep locks and WAL bursts short
+            for pool in pending:
+                deleted = 0
+                while True:
+                    async with get_session() as session:
+                        batch = await PoolSubmissionRepository(session).delete_submissions_for_rotation(
+                            pool, POOL_STORAGE_CONFIG.compaction_batch_size
+                        )
+                    deleted += batch
+                    if batch < POOL_STORAGE_CONFIG.compaction_batch_size:
+                        break
+
+                async with get_session() as session:
+                    await PoolArchiveRepository(session).mark_compacted(pool.id)
+                LOGGER.debug(f"Compacted pool {pool.id}, deleted {deleted} submissions")
 
 
 type ConsensusByPage = dict[int, tuple[list[bytes], float]]
 
+# Pools fetched at a time by the cursor of streamed consensus
+STREAM_BATCH_SIZE = 20
+
 
 async def get_pool_consensus(
     session: AsyncSession,
@@ -182,19 +318,38 @@ async def get_pool_consensus(
     rotation_start: datetime.datetime,
 ) -> ConsensusByPage:
 
+    consensus_by_page: ConsensusByPage = {}
+    async for page, consensus_data, confidence in iter_pool_consensus(session, pool_type, region, rotation_start):
+        consensus_by_page[page] = consensus_data, confidence
+
+    return consensus_by_page
+
+
+def iter_pool_consensus(
+    session: AsyncSession,
+    pool_type: PoolType,
+    region: LootPoolRegion | RaidRegion,
+    rotation_start: datetime.datetime,
+) -> AsyncIterator[tuple[int, list[bytes], float]]:
+    """
+    Iterate over the consensus of each page of a rotation, without loading the submissions of the pools.
+    """
     if region not in VALID_REGIONS[pool_type]:
         raise ValueError(f"Invalid region {region} for pool type {pool_type}")
 
     poolRepo = PoolRepository(session)
-
-    pool = await poolRepo.list_pools(
-        pool_type=pool_type, region=region, rotation_start=rotation_start, order_by="page"
+    return poolRepo.stream_consensus(pool_type, region, rotation_start, STREAM_BATCH_SIZE)
+
+
+async def stream_pool_consensus(
+    pages: AsyncIterator[tuple[int, list[bytes], float]], item_return_type: ItemReturnType
+) -> AsyncIterator[bytes]:
+    """
+    Stream the consensus of each page as a line of newline delimited JSON.
+    """
+    lines = (
+        {"page": page, "items": item_return_type.format_items(consensus_data), "confidence": confidence}
+        async for page, consensus_data, confidence in pages
     )
-    if not pool:
-        return {}
-
-    consensus_by_page: ConsensusByPage = {}
-    for p in pool:
-        consensus_by_page[p.page] = p.consensus_data, p.confidence
-
-    return consensus_by_page
+    async for chunk in ndjson_stream(lines):
+        yield chunk
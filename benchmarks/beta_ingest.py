@@ -0,0 +1,120 @@
+"""
+Measure the beta item submission pipeline on batches of items.
+
+Submits ``--rounds`` batches of ``--items`` new items, the same batches again unchanged, then changed,
+and finally powder patches of them, against the database configured by ``POSTGRES_*``.
+Reports the wall time and the SQL statements executed per batch. Items are named ``benchmark_item_*``
+and are deleted afterwards like through the API, so that the change log and the revision record it.
+Use a database without such items:
+
+    python -m benchmarks.beta_ingest --items 300
+"""
+
+import argparse
+import asyncio
+import time
+from base64 import b64encode
+from datetime import UTC, datetime
+
+from sqlalchemy import event
+
+from app.core.db import close_db, get_session, init_db
+from app.core.log import LOGGER
+from app.module.beta.config import BETA_CONFIG
+from app.module.beta.schema import ItemPatchSubmission, NewItemSubmission, PatchableItemField
+from app.module.beta.service import handle_delete_beta_items, handle_item_submission, handle_patch_submission
+from wynnsource import WynnSourceItem
+
+NAME_PREFIX = "benchmark_item"
+
+
+def item_name(round_: int, index: int) -> str:
+    return f"{NAME_PREFIX}_{round_}_{index}"
+
+
+def make_items(round_: int, count: int, level: int, powders: int = 0) -> list[str]:
+    items = []
+    for index in range(count):
+        item = WynnSourceItem(name=item_name(round_, index), level=level, rarity=1)
+        item.gear.type = 1
+        item.gear.requirements.SetInParent()
+        item.gear.unidentified.identifications.add()
+        for _ in range(powders):
+            item.gear.powders.add()
+        items.append(b64encode(item.SerializeToString()).decode())
+    return items
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+async def benchmark(name: str, submissions: list[NewItemSubmission | ItemPatchSubmission], counter: StatementCounter):
+    counter.count = 0
+    started = time.perf_counter()
+    for submission in submissions:
+        async with get_session() as session:
+            if isinstance(submission, ItemPatchSubmission):
+                await handle_patch_submission(submission, session)
+            else:
+                await handle_item_submission(submission, session)
+    elapsed = time.perf_counter() - started
+
+    items = len(submissions[0].items)
+    LOGGER.info(
+        f"{name}: {len(submissions)} batches of {items} items\n"
+        + f"  time per batch:       {elapsed / len(submissions) * 1000:.1f} ms\n"
+        + f"  statements per batch: {counter.count / len(submissions):.1f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = await init_db()
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+
+    now = datetime.now(tz=UTC)
+    mod_version = BETA_CONFIG.allowed_versions[0]
+
+    def submissions(level: int) -> list[NewItemSubmission]:
+        return [
+            NewItemSubmission(client_timestamp=now, mod_version=mod_version, items=make_items(r, args.items, level))
+            for r in range(args.rounds)
+        ]
+
+    try:
+        await benchmark("new items", submissions(level=1), counter)
+        await benchmark("unchanged items", submissions(level=1), counter)
+        await benchmark("changed items", submissions(level=2), counter)
+        await benchmark(
+            "powder patches",
+            [
+                ItemPatchSubmission(
+                    client_timestamp=now,
+                    mod_version=mod_version,
+                    patch=PatchableItemField.POWDER,
+                    items=make_items(r, args.items, level=2, powders=2),
+                )
+                for r in range(args.rounds)
+            ],
+            counter,
+        )
+    finally:
+        async with get_session() as session:
+            await handle_delete_beta_items(
+                [item_name(r, index) for r in range(args.rounds) for index in range(args.items)], session
+            )
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
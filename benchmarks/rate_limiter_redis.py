@@ -0,0 +1,94 @@
+"""
+Compare the Redis cost of the sliding window and GCRA rate limiters.
+
+For each algorithm, simulates ``--clients`` clients sending ``--requests`` requests each against the Redis
+configured by ``REDIS_HOST``, ``REDIS_PORT`` and ``REDIS_DB`` and reports the Redis commands executed per request
+and the memory held per client. Commands are counted from the server wide statistics, so run it against
+an otherwise idle Redis. It writes and deletes keys, so it refuses to run on database 0, the default one of the server:
+
+    REDIS_HOST=localhost REDIS_PORT=6379 REDIS_DB=15 python -m benchmarks.rate_limiter_redis
+"""
+
+import argparse
+import asyncio
+import time
+
+from redis.asyncio.client import Redis
+
+from app.config import DB_CONFIG
+from app.core.db.redis import RedisClient
+from app.core.log import LOGGER
+from app.core.rate_limiter import RateLimitAlgorithm
+from app.core.rate_limiter.base import BaseRateLimiter
+from app.core.rate_limiter.redis_rate_limiter import RedisGCRARateLimiter, RedisRateLimiter
+
+LIMITERS: dict[RateLimitAlgorithm, type[BaseRateLimiter]] = {
+    RateLimitAlgorithm.SLIDING_WINDOW: RedisRateLimiter,
+    RateLimitAlgorithm.GCRA: RedisGCRARateLimiter,
+}
+
+KEY_PREFIX = "rate_limit_benchmark"
+
+
+async def command_calls(redis: Redis) -> dict[str, int]:
+    stats = await redis.info("commandstats")
+    return {name.removeprefix("cmdstat_"): value["calls"] for name, value in stats.items()}
+
+
+async def benchmark(redis: Redis, algorithm: RateLimitAlgorithm, clients: int, requests: int, limit: int, period: int):
+    limiter = LIMITERS[algorithm](limit, period)
+    prefix = f"{KEY_PREFIX}:{algorithm.value}"
+
+    calls_before = await command_calls(redis)
+    memory_before = (await redis.info("memory"))["used_memory"]
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        await asyncio.gather(*(limiter.hit(f"{prefix}:{client}") for client in range(clients)))
+
+    elapsed = time.perf_counter() - started
+    memory_after = (await redis.info("memory"))["used_memory"]
+    calls = {
+        name: count - calls_before.get(name, 0)
+        for name, count in (await command_calls(redis)).items()
+        if name != "info" and count > calls_before.get(name, 0)
+    }
+
+    keys = [key async for key in redis.scan_iter(f"{prefix}:*", count=1000)]
+    key_usage = [await redis.memory_usage(key) or 0 for key in keys]
+    total = clients * requests
+
+    commands = ", ".join(f"{name}={count}" for name, count in calls.items())
+    LOGGER.info(
+        f"{algorithm.value}: {total} requests ({total / elapsed:.0f}/s)\n"
+        + f"  commands per request: {sum(calls.values()) / total:.2f} ({commands})\n"
+        + f"  keys per client:      {len(keys) / clients:.2f}\n"
+        + f"  bytes per client:     {sum(key_usage) / clients:.0f} (MEMORY USAGE)\n"
+        + f"  used_memory delta:    {(memory_after - memory_before) / clients:.0f} bytes per client"
+    )
+
+    if keys:
+        await redis.delete(*keys)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=60)
+    parser.add_argument("--period", type=int, default=60)
+    args = parser.parse_args()
+    if DB_CONFIG.redis_db == 0:
+        parser.error("set REDIS_DB to a database other than 0, the default one of the server")
+
+    await RedisClient.init()
+    redis = RedisClient.get_instance()
+    try:
+        for algorithm in LIMITERS:
+            await benchmark(redis, algorithm, args.clients, args.requests, args.limit, args.period)
+    finally:
+        await RedisClient.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
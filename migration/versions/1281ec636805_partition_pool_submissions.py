@@ -0,0 +1,123 @@
+"""partition pool_submissions by rotation week
+
+Revision ID: 1281ec636805
+Revises: b6251978ce59
+Create Date: 2026-10-18 23:58:12.482113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1281ec636805'
+down_revision: Union[str, Sequence[str], None] = 'b6251978ce59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Weeks of partitions created ahead, the maintenance job keeps them ahead afterwards
+PREMAKE_WEEKS = 4
+
+COLUMNS = "id, rotation_id, user_id, submitted_at, client_timestamp, mod_version, fuzzy, item_data, weight"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Carry the rotation start of each pool onto its submissions
+    op.add_column('pool_submissions', sa.Column('rotation_start', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE pool_submissions SET rotation_start = pools.rotation_start "
+        "FROM pools WHERE pools.id = pool_submissions.rotation_id"
+    )
+    op.execute("UPDATE pool_submissions SET rotation_start = client_timestamp WHERE rotation_start IS NULL")
+
+    # Move the old table aside, keeping its id sequence for the partitioned table
+    op.execute("ALTER TABLE pool_submissions RENAME TO pool_submissions_old")
+    op.drop_index(op.f('ix_pool_submissions_user_id'), table_name='pool_submissions_old')
+    op.drop_index(op.f('ix_pool_submissions_rotation_id'), table_name='pool_submissions_old')
+    op.execute("ALTER TABLE pool_submissions_old DROP CONSTRAINT pool_submissions_pkey")
+
+    op.create_table('pool_submissions',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('pool_submissions_id_seq')"), nullable=False),
+    sa.Column('rotation_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('rotation_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('client_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('mod_version', sa.String(length=50), nullable=False),
+    sa.Column('fuzzy', sa.Boolean(), nullable=False),
+    sa.Column('item_data', sa.ARRAY(sa.LargeBinary()), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['rotation_id'], ['pools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'rotation_start'),
+    postgresql_partition_by='RANGE (rotation_start)',
+    )
+    op.execute("ALTER SEQUENCE pool_submissions_id_seq OWNED BY pool_submissions.id")
+
+    # One partition per week (Monday 00:00 UTC) from the oldest submission until a few weeks ahead
+    op.execute(f"""
+        DO $$
+        DECLARE
+            week date;
+        BEGIN
+            FOR week IN
+                SELECT generate_series(
+                    date_trunc('week', LEAST(
+                        COALESCE((SELECT min(rotation_start) FROM pool_submissions_old), now()), now()
+                    ) AT TIME ZONE 'UTC'),
+                    date_trunc('week', now() AT TIME ZONE 'UTC') + interval '{PREMAKE_WEEKS} weeks',
+                    interval '1 week'
+                )::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF pool_submissions FOR VALUES FROM (%L) TO (%L)',
+                    'pool_submissions_' || to_char(week, 'YYYYMMDD'),
+                    week::timestamp AT TIME ZONE 'UTC',
+                    (week + 7)::timestamp AT TIME ZONE 'UTC'
+                );
+            END LOOP;
+        END
+        $$
+    """)
+
+    op.execute(
+        f"INSERT INTO pool_submissions (rotation_start, {COLUMNS}) "
+        f"SELECT rotation_start, {COLUMNS} FROM pool_submissions_old"
+    )
+    op.drop_table('pool_submissions_old')
+
+    op.create_index(op.f('ix_pool_submissions_rotation_id'), 'pool_submissions', ['rotation_id'], unique=False)
+    op.create_index(op.f('ix_pool_submissions_user_id'), 'pool_submissions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Partitions detached by the maintenance job are left in place as standalone tables
+    op.execute("ALTER TABLE pool_submissions RENAME TO pool_submissions_partitioned")
+    op.drop_index(op.f('ix_pool_submissions_user_id'), table_name='pool_submissions_partitioned')
+    op.drop_index(op.f('ix_pool_submissions_rotation_id'), table_name='pool_submissions_partitioned')
+    op.execute("ALTER TABLE pool_submissions_partitioned DROP CONSTRAINT pool_submissions_pkey")
+
+    op.create_table('pool_submissions',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('pool_submissions_id_seq')"), nullable=False),
+    sa.Column('rotation_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('client_timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('mod_version', sa.String(length=50), nullable=False),
+    sa.Column('fuzzy', sa.Boolean(), nullable=False),
+    sa.Column('item_data', sa.ARRAY(sa.LargeBinary()), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['rotation_id'], ['pools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE pool_submissions_id_seq OWNED BY pool_submissions.id")
+    op.execute(f"INSERT INTO pool_submissions ({COLUMNS}) SELECT {COLUMNS} FROM pool_submissions_partitioned")
+    op.drop_table('pool_submissions_partitioned')
+
+    op.create_index(op.f('ix_pool_submissions_rotation_id'), 'pool_submissions', ['rotation_id'], unique=False)
+    op.create_index(op.f('ix_pool_submissions_user_id'), 'pool_submissions', ['user_id'], unique=False)
@@ -0,0 +1,96 @@
+import asyncio
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+
+@dataclass
+class StoredItem:
+    name: str
+    item: bytes
+    digest: bytes = b""
+
+
+class FakeBetaItemRepository:
+    """
+    In-memory stand-in for the beta repository, with the change log as a list of (revision, name, deleted).
+    """
+
+    def __init__(self):
+        self.items: dict[str, StoredItem] = {}
+        self.changes: list[tuple[int, str, bool]] = []
+        self.revision = 0
+        self.pruned_revision = 0
+        # Names of the upserted items, in order
+        self.upserted: list[str] = []
+        # Number of full list reads
+        self.reads = 0
+        # Called while the list is read, to commit a write concurrently
+        self.on_read: Callable[[], None] | None = None
+
+    def write(self, upserted: Iterable[str] = (), deleted: Iterable[str] = ()) -> None:
+        """
+        Commit a revision upserting items whose serialization is their name, and deleting others.
+        """
+        upserted = list(upserted)
+        for name in upserted:
+            self.items[name] = StoredItem(name, name.encode())
+        for name in deleted:
+            self.items.pop(name, None)
+        self._log(upserted, deleted)
+
+    def _log(self, upserted: Iterable[str], deleted: Iterable[str]) -> int:
+        self.revision += 1
+        self.changes.extend((self.revision, name, False) for name in upserted)
+        self.changes.extend((self.revision, name, True) for name in deleted)
+        return self.revision
+
+    async def get_revision(self) -> int:
+        return self.revision
+
+    async def get_pruned_revision(self) -> int:
+        return self.pruned_revision
+
+    async def record_changes(self, upserted: Iterable[str] = (), deleted: Iterable[str] = ()) -> int:
+        return self._log(upserted, deleted)
+
+    async def list_changes(self, since: int, until: int) -> list[tuple[str, bool]]:
+        latest = {}
+        for revision, name, deleted in sorted(self.changes):
+            if since < revision <= until:
+                latest[name] = deleted
+        return sorted(latest.items())
+
+    async def list_item_blobs(self) -> list[bytes]:
+        self.reads += 1
+        await asyncio.sleep(0)
+        if self.on_read is not None:
+            self.on_read()
+        return [stored.item for stored in self.items.values()]
+
+    async def get_known_digests(self, digests: list[bytes]) -> set[bytes]:
+        return {stored.digest for stored in self.items.values()} & set(digests)
+
+    async def get_items_by_names(self, names: list[str]) -> list[StoredItem]:
+        return [self.items[name] for name in names if name in self.items]
+
+    async def upsert_items(self, items: Sequence[tuple[Any, bytes]]) -> None:
+        for item, digest in items:
+            self.items[item.name] = StoredItem(item.name, item.SerializeToString(), digest)
+            self.upserted.append(item.name)
+
+
+@pytest.fixture
+def beta_repository(monkeypatch) -> FakeBetaItemRepository:
+    """
+    A fake beta repository, returned by the beta modules for any session.
+    """
+    # Imported here, the beta modules need the generated protobuf package that other tests do not
+    from app.module.beta import service, snapshot
+
+    repository = FakeBetaItemRepository()
+    for module in (service, snapshot):
+        monkeypatch.setattr(module, "BetaItemRepository", lambda session: repository)
+    return repository
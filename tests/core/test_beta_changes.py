@@ -0,0 +1,63 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+from app.module.beta.model import BetaItemRepository
+from app.module.beta.service import get_beta_changes
+from app.schemas.enums import ItemReturnType
+
+
+def test_beta_changes(beta_repository):
+    repository = beta_repository
+    repository.write(upserted=["a", "b"])
+    repository.write(upserted=["a", "c"])
+    repository.write(deleted=["b"])
+
+    async def changes(since: int):
+        return await get_beta_changes(repository, since, ItemReturnType.B64)
+
+    async def run():
+        # every item by its latest change
+        synced = await changes(0)
+        assert (synced.revision, synced.reset) == (3, False)
+        assert synced.items == ["YQ==", "Yw=="]
+        assert synced.deleted == ["b"]
+
+        partial = await changes(2)
+        assert (partial.items, partial.deleted) == ([], ["b"])
+        assert (await changes(3)).model_dump() == {"revision": 3, "reset": False, "items": [], "deleted": []}
+
+        # deletions the client has not seen were pruned
+        repository.pruned_revision = 2
+        reset = await changes(1)
+        assert (reset.revision, reset.reset, reset.items) == (3, True, [])
+        assert not (await changes(2)).reset
+
+        # a replica behind the one the client synced on keeps the client at its revision
+        ahead = await changes(5)
+        assert (ahead.revision, ahead.reset, ahead.items, ahead.deleted) == (5, False, [], [])
+
+    asyncio.run(run())
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    async def execute(self, statement, *args, **kwargs):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return self
+
+    def all(self) -> list:
+        return []
+
+
+def test_list_changes_latest_per_item():
+    session = CapturingSession()
+    asyncio.run(BetaItemRepository(session).list_changes(1, 3))  # type: ignore[arg-type]
+    (statement,) = session.statements
+    # The latest change of each item within the range
+    assert "SELECT DISTINCT ON (beta_item_changes.name)" in statement
+    assert "WHERE beta_item_changes.revision > %(revision_1)s" in statement
+    assert "AND beta_item_changes.revision <= %(revision_2)s" in statement
+    assert statement.endswith("ORDER BY beta_item_changes.name, beta_item_changes.revision DESC")
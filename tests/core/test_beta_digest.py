@@ -0,0 +1,68 @@
+import asyncio
+from base64 import b64encode
+from datetime import UTC, datetime
+
+from app.module.beta.model import canonical_digest, item_digest
+from app.module.beta.schema import ItemPatchSubmission, NewItemSubmission, PatchableItemField
+from app.module.beta.service import handle_item_submission, handle_patch_submission
+from wynnsource import WynnSourceItem
+
+
+def _item(name: str, level: int = 1, powders: int = 0) -> WynnSourceItem:
+    item = WynnSourceItem(name=name, level=level, rarity=1)
+    item.gear.type = 1
+    item.gear.requirements.SetInParent()
+    item.gear.unidentified.identifications.add()
+    for _ in range(powders):
+        item.gear.powders.add()
+    return item
+
+
+def _submission(*items: WynnSourceItem) -> NewItemSubmission:
+    return NewItemSubmission(
+        client_timestamp=datetime.now(tz=UTC),
+        mod_version="",
+        items=[b64encode(item.SerializeToString(deterministic=True)).decode() for item in items],
+    )
+
+
+def test_item_digest():
+    item = _item("a")
+    assert canonical_digest(item) == item_digest(item.SerializeToString(deterministic=True))
+    assert canonical_digest(WynnSourceItem.FromString(item.SerializeToString())) == canonical_digest(item)
+    assert canonical_digest(_item("a", level=2)) != canonical_digest(item)
+
+
+def test_repeated_submissions(beta_repository):
+    repository = beta_repository
+
+    async def run():
+        await handle_item_submission(_submission(_item("a"), _item("b")), repository)
+        assert repository.upserted == ["a", "b"]
+
+        # repeats are recognized by their digest and not written again
+        repository.upserted.clear()
+        await handle_item_submission(_submission(_item("a"), _item("b", level=2)), repository)
+        assert repository.upserted == ["b"]
+
+        # a patch keeps the digest of the submitted item, so repeating that item is still recognized
+        digest = repository.items["a"].digest
+        patch = ItemPatchSubmission(
+            client_timestamp=datetime.now(tz=UTC),
+            mod_version="",
+            patch=PatchableItemField.POWDER,
+            items=_submission(_item("a", powders=2)).items,
+        )
+        await handle_patch_submission(patch, repository)
+        assert len(WynnSourceItem.FromString(repository.items["a"].item).gear.powders) == 2
+        assert repository.items["a"].digest == digest
+
+        repository.upserted.clear()
+        await handle_item_submission(_submission(_item("a")), repository)
+        assert repository.upserted == []
+
+        # a changed item carries the powders of the stored one over
+        await handle_item_submission(_submission(_item("a", level=3)), repository)
+        assert len(WynnSourceItem.FromString(repository.items["a"].item).gear.powders) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import asyncio
+
+import orjson as json
+
+from app.core.cache.memory_cache import MemoryCache
+from app.module.beta.snapshot import BetaSnapshotCache, etag_revision, snapshot_etag
+from app.schemas.enums import ItemReturnType
+
+
+def _items(raw: bytes) -> list[str]:
+    return json.loads(raw)["data"]["items"]
+
+
+def test_beta_snapshot_per_revision(beta_repository):
+    repository = beta_repository
+    repository.write(upserted=["a", "b"])
+    cache = MemoryCache(max_bytes=1024 * 1024)
+
+    async def run():
+        snapshots = BetaSnapshotCache(cache, expire=60)
+        # concurrent requests for a new revision build it once
+        built = await asyncio.gather(*(snapshots.get(repository, 1, ItemReturnType.B64) for _ in range(5)))
+        assert len(set(built)) == 1
+        assert _items(built[0]) == ["YQ==", "Yg=="]
+        assert repository.reads == 1
+
+        # another worker reuses the snapshot from the shared cache
+        assert await BetaSnapshotCache(cache, expire=60).get(repository, 1, ItemReturnType.B64) == built[0]
+        assert repository.reads == 1
+
+        repository.write(upserted=["c"], deleted=["a", "b"])
+        newer = await snapshots.get(repository, 2, ItemReturnType.B64)
+        assert _items(newer) == ["Yw=="]
+        assert repository.reads == 2
+
+        # a slow request still on the previous revision does not replace the newer snapshot
+        await snapshots.get(repository, 1, ItemReturnType.B64)
+        assert snapshots._local[ItemReturnType.B64] == (2, newer)
+
+        # a list read after another write is not cached as the snapshot of the revision it started on
+        repository.write(upserted=["d"])
+        repository.on_read = lambda: repository.write(upserted=["e"])
+        assert _items(await snapshots.get(repository, 3, ItemReturnType.B64)) == ["Yw==", "ZA==", "ZQ=="]
+        assert snapshots._local[ItemReturnType.B64] == (2, newer)
+        assert await cache.get(snapshots._key(3, ItemReturnType.B64)) is None
+
+    asyncio.run(run())
+
+
+def test_beta_snapshot_etag():
+    assert etag_revision(snapshot_etag(7, ItemReturnType.B64), ItemReturnType.B64) == 7
+    assert etag_revision(f'"3-{ItemReturnType.B64.value}", W/"9-{ItemReturnType.B64.value}"', ItemReturnType.B64) == 9
+    assert etag_revision(snapshot_etag(7, ItemReturnType.JSON), ItemReturnType.B64) is None
+    assert etag_revision("*", ItemReturnType.B64) is None
+    assert etag_revision(None, ItemReturnType.B64) is None
@@ -0,0 +1,25 @@
+from app.core.security.ip_tracker import IpTracker
+from app.core.security.model import merge_ips
+
+
+def test_merge_ips():
+    assert merge_ips(["a", "b", "c"], ["b"], 3) == ["a", "c", "b"]
+    assert merge_ips(["a", "b", "c"], ["d", "a"], 3) == ["c", "d", "a"]
+    assert merge_ips([], ["a", "b"], 1) == ["b"]
+    assert merge_ips(["a", "b"], ["b"], 2) == ["a", "b"]
+
+
+def test_ip_tracker():
+    tracker = IpTracker()
+    tracker.record(1, "a")
+    tracker.record(1, "b")
+    tracker.record(1, "a")
+    tracker.record(2, "c")
+    observed = tracker.drain()
+    assert observed == {1: ["b", "a"], 2: ["c"]}
+    assert len(tracker) == 0
+
+    # IPs of a failed merge go before the IPs observed since
+    tracker.record(1, "b")
+    tracker.restore(observed)
+    assert tracker.drain() == {1: ["a", "b"], 2: ["c"]}
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+
+import httpx
+import orjson as json
+
+from app.core.cache.memory_cache import MemoryCache
+from app.module.api.mapping import MappingStorage
+from app.module.api.schema import MappingType
+
+SCHEMA = {
+    "type": "object",
+    "required": ["lastUpdated", "data"],
+    "properties": {"data": {"type": "array", "items": {"type": "object", "required": ["id", "key"]}}},
+}
+
+
+def _mapping(*keys: str) -> dict:
+    return {
+        "$schema": "./identification.schema.json",
+        "lastUpdated": "2026-01-01T00:00:00Z",
+        "data": [{"id": i, "key": key} for i, key in enumerate(keys)],
+    }
+
+
+class Upstream:
+    """
+    Stand-in for the schema repository, answering conditional requests like a static file host.
+    """
+
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+        self.requests: list[tuple[str, int]] = []
+
+    def publish(self, name: str, document: dict):
+        self.files[name] = json.dumps(document)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        name = request.url.path.rsplit("/", 1)[-1]
+        if name not in self.files:
+            response = httpx.Response(404)
+        else:
+            etag = f'"{hashlib.sha1(self.files[name]).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                response = httpx.Response(304, headers={"ETag": etag})
+            else:
+                response = httpx.Response(200, content=self.files[name], headers={"ETag": etag})
+        self.requests.append((name, response.status_code))
+        return response
+
+
+def _storage(upstream: Upstream, cache: MemoryCache, min_check_interval: float = 0) -> MappingStorage:
+    return MappingStorage(
+        "http://upstream/mapping/",
+        cache,
+        expire=3600,
+        min_check_interval=min_check_interval,
+        client=httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle)),
+    )
+
+
+def test_mapping_conditional_refresh():
+    upstream = Upstream()
+    upstream.publish("identification.schema.json", SCHEMA)
+    upstream.publish("identification.json", _mapping("a", "b"))
+
+    async def run():
+        storage = _storage(upstream, MemoryCache(max_bytes=1024 * 1024))
+        mapping = await storage.get_mapping(MappingType.IDENTIFICATION)
+        assert [entry["key"] for entry in mapping["data"]] == ["a", "b"]
+        assert "$schema" not in mapping
+        validator = storage._validators[MappingType.IDENTIFICATION][1]
+
+        upstream.requests.clear()
+        await storage.update_mapping(MappingType.IDENTIFICATION)
+        assert upstream.requests == [("identification.schema.json", 304), ("identification.json", 304)]
+
+        upstream.publish("identification.json", _mapping("a", "b", "c"))
+        await storage.update_mapping(MappingType.IDENTIFICATION)
+        mapping = await storage.get_mapping(MappingType.IDENTIFICATION)
+        assert len(mapping["data"]) == 3
+        assert storage._validators[MappingType.IDENTIFICATION][1] is validator
+
+        # An invalid mapping or a failing upstream keeps the last good one
+        upstream.publish("identification.json", {"data": []})
+        await storage.update_mapping(MappingType.IDENTIFICATION)
+        del upstream.files["identification.schema.json"]
+        await storage.update_mapping(MappingType.IDENTIFICATION)
+        assert await storage.get_mapping(MappingType.IDENTIFICATION) == mapping
+        await storage.close()
+
+    asyncio.run(run())
+
+
+def test_mapping_schema_change_revalidates():
+    upstream = Upstream()
+    upstream.publish("shiny.schema.json", SCHEMA)
+    upstream.publish("shiny.json", _mapping("a"))
+
+    async def run():
+        storage = _storage(upstream, MemoryCache(max_bytes=1024 * 1024))
+        await storage.get_mapping(MappingType.SHINY)
+        validator = storage._validators[MappingType.SHINY][1]
+
+        upstream.publish("shiny.schema.json", {**SCHEMA, "required": ["lastUpdated", "data", "version"]})
+        upstream.requests.clear()
+        await storage.update_mapping(MappingType.SHINY)
+        assert upstream.requests == [("shiny.schema.json", 200), ("shiny.json", 200)]
+        assert storage._validators[MappingType.SHINY][1] is not validator
+        # The mapping is rejected by the new schema and the previous one is kept
+        assert len((await storage.get_mapping(MappingType.SHINY))["data"]) == 1
+        await storage.close()
+
+    asyncio.run(run())
+
+
+def test_mapping_snapshot_shared():
+    upstream = Upstream()
+    upstream.publish("shiny.schema.json", SCHEMA)
+    upstream.publish("shiny.json", _mapping("a"))
+    cache = MemoryCache(max_bytes=1024 * 1024)
+
+    async def run():
+        first = _storage(upstream, cache, min_check_interval=60)
+        mapping = await first.get_mapping(MappingType.SHINY)
+
+        # Another worker, or a restarted process, starts from the snapshot without fetching
+        upstream.requests.clear()
+        second = _storage(upstream, cache, min_check_interval=60)
+        assert await second.get_mapping(MappingType.SHINY) == mapping
+        await second.update_mapping(MappingType.SHINY)
+        assert upstream.requests == []
+
+        # Once the snapshot is stale, the validators it carries make the check conditional
+        second.min_check_interval = 0
+        await second.update_mapping(MappingType.SHINY)
+        assert upstream.requests == [("shiny.schema.json", 304), ("shiny.json", 304)]
+        await first.close()
+        await second.close()
+
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from app.core.cache.memory_cache import MemoryCache
+
+
+def test_memory_cache_get_set_delete():
+    async def run():
+        cache = MemoryCache(max_bytes=1024 * 1024)
+        assert await cache.get("key") is None
+
+        await cache.set("key", "value", expire=60)
+        assert await cache.get("key") == "value"
+
+        await cache.set("key", "other", expire=60)
+        assert await cache.get("key") == "other"
+        assert len(cache) == 1
+
+        await cache.delete("key")
+        assert await cache.get("key") is None
+        assert cache.size == 0
+
+    asyncio.run(run())
+
+
+def test_memory_cache_expire(monkeypatch):
+    async def run():
+        cache = MemoryCache(max_bytes=1024 * 1024)
+        await cache.set("short", "value", expire=1)
+        await cache.set("long", "value", expire=60)
+
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+
+        assert await cache.get("short") is None
+        assert await cache.get("long") == "value"
+        assert len(cache) == 1
+
+    asyncio.run(run())
+
+
+def test_memory_cache_evicts_least_recently_used():
+    async def run():
+        value = "x" * 100
+        cache = MemoryCache(max_bytes=600)
+
+        for key in ("a", "b", "c", "d"):
+            await cache.set(key, value, expire=60)
+        assert len(cache) == 3
+        assert await cache.get("a") is None
+
+        # touching "b" makes "c" the least recently used entry
+        assert await cache.get("b") == value
+        await cache.set("e", value, expire=60)
+
+        assert await cache.get("c") is None
+        assert await cache.get("b") == value
+        assert cache.size <= cache.max_bytes
+
+        # values larger than the whole budget are never stored
+        await cache.set("huge", "x" * 1000, expire=60)
+        assert await cache.get("huge") is None
+
+    asyncio.run(run())
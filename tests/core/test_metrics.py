@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from prometheus_client import REGISTRY
+
+from app.core.metrics import instrument_route_handler
+
+
+def _requests(route: str, status: int) -> float:
+    labels = {"method": "GET", "route": route, "status": str(status)}
+    return REGISTRY.get_sample_value("wcs_http_requests_total", labels) or 0.0
+
+
+def test_instrumented_handler_status():
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+    async def ok(request: Request) -> Response:
+        return Response(status_code=204)
+
+    async def invalid(request: Request) -> Response:
+        raise RequestValidationError([])
+
+    async def forbidden(request: Request) -> Response:
+        raise HTTPException(status_code=403)
+
+    async def broken(request: Request) -> Response:
+        raise RuntimeError
+
+    for name, handler, status, error in [
+        ("ok", ok, 204, None),
+        ("invalid", invalid, 422, RequestValidationError),
+        ("forbidden", forbidden, 403, HTTPException),
+        ("broken", broken, 500, RuntimeError),
+    ]:
+        route = f"/test/metrics/{name}"
+        instrumented = instrument_route_handler(handler, route, ["GET"])
+        if error is None:
+            asyncio.run(instrumented(request))
+        else:
+            with pytest.raises(error):
+                asyncio.run(instrumented(request))
+        assert _requests(route, status) == 1
@@ -0,0 +1,24 @@
+from app.core.security.auth import has_permission
+from app.core.security.permission import PermissionSet
+
+
+def test_permission_set():
+    permissions = PermissionSet(["pool.submit", "beta.*", "admin.users.read"])
+    assert "pool.submit" in permissions
+    assert "beta.items.write" in permissions
+    assert "pool.read" not in permissions
+    assert "admin.users.write" not in permissions
+    # Wildcards match whole permissions only
+    assert "xbeta.items" not in permissions
+
+    assert permissions.satisfies(None)
+    assert permissions.satisfies({"pool.submit", "beta.items.read"})
+    assert not permissions.satisfies({"pool.submit", "pool.read"})
+    assert PermissionSet(["*"]).satisfies({"admin.users.write"})
+    assert not PermissionSet([]).satisfies("pool.submit")
+
+
+def test_has_permission():
+    assert has_permission("beta.items.read", {"beta.*"})
+    assert not has_permission({"beta.items.read", "pool.submit"}, {"beta.*"})
+    assert has_permission(None, set())
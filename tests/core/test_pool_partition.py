@@ -0,0 +1,17 @@
+from datetime import UTC, date, datetime
+
+from app.module.pool.config import POOL_REFRESH_CONFIG
+from app.module.pool.partition import partition_bounds, partition_name, partition_week
+from app.module.pool.schema import PoolType
+
+
+def test_rotations_fall_in_one_weekly_partition():
+    week = partition_week(datetime(2026, 10, 18, 23, 0, tzinfo=UTC))
+    assert week == date(2026, 10, 12)
+    assert partition_name(week) == "pool_submissions_20261012"
+    assert partition_bounds(week) == (datetime(2026, 10, 12, tzinfo=UTC), datetime(2026, 10, 19, tzinfo=UTC))
+
+    # All pool types of the same week share a partition
+    now = datetime(2026, 10, 18, tzinfo=UTC)
+    assert len({partition_week(config.get_rotation(now).start) for config in POOL_REFRESH_CONFIG.values()}) == 1
+    assert partition_week(POOL_REFRESH_CONFIG[PoolType.LR_ITEM].get_rotation(now).start) == week
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import UTC, datetime
+
+from app.core.cache.memory_cache import MemoryCache
+from app.core.security.model import User
+from app.core.security.principal import PrincipalCache
+
+
+def make_user(token: str) -> User:
+    return User(
+        id=1,
+        token=token,
+        permissions=["pool.submit", "beta.*"],
+        created_at=datetime(2026, 1, 1, tzinfo=UTC),
+        expires_at=None,
+        is_active=True,
+        creation_ip="10.0.0.1",
+        common_ips=["10.0.0.1", "10.0.0.2"],
+        score=42,
+    )
+
+
+def test_principal_cache(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.core.security.principal.time.monotonic", lambda: now)
+
+    async def run():
+        nonlocal now
+        shared = MemoryCache(max_bytes=1 << 16)
+        cache = PrincipalCache(shared, ttl=60, local_ttl=5, negative_ttl=30)
+        assert await cache.get("hash") is None
+
+        await cache.set(make_user("hash"))
+        principal = await cache.get("hash")
+        assert principal is not None
+        user, permissions = principal
+        assert "beta.items.read" in permissions
+        assert "pool.read" not in permissions
+        assert (user.id, user.permissions, user.common_ips, user.score) == (
+            1,
+            ["pool.submit", "beta.*"],
+            ["10.0.0.1", "10.0.0.2"],
+            42,
+        )
+        assert user.created_at == datetime(2026, 1, 1, tzinfo=UTC)
+        # The compiled permissions are kept while the grants do not change
+        assert await cache.set(user) is permissions
+
+        # Another worker reads the shared cache once its local entry expired
+        other = PrincipalCache(shared, ttl=60, local_ttl=5, negative_ttl=30)
+        assert await other.get("hash") is not None
+
+        await cache.invalidate(["hash"])
+        assert await cache.get("hash") is None
+        assert await other.get("hash") is not None
+        now += 5
+        assert await other.get("hash") is None
+
+    asyncio.run(run())
+
+
+def test_principal_cache_known_tokens(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.core.security.principal.time.monotonic", lambda: now)
+
+    async def run():
+        nonlocal now
+        cache = PrincipalCache(MemoryCache(max_bytes=1 << 16), ttl=60, local_ttl=5, negative_ttl=30)
+        assert not cache.is_validated("hash")
+        cache.set_unknown("hash")
+        assert cache.is_unknown("hash")
+        now += 30
+        assert not cache.is_unknown("hash")
+
+        # A user created for a token remembered as unknown is no longer rejected
+        cache.set_unknown("hash")
+        await cache.set(make_user("hash"))
+        assert cache.is_validated("hash")
+        assert not cache.is_unknown("hash")
+
+        # Validated tokens outlive the local entry of the user
+        now += 10
+        assert cache.is_validated("hash")
+        await cache.invalidate(["hash"])
+        assert not cache.is_validated("hash")
+
+    asyncio.run(run())
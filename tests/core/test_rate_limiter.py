@@ -0,0 +1,222 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+from fastapi import Request
+
+from app.core.db.redis import RedisUnavailableError
+from app.core.rate_limiter.base import (
+    RateLimitResult,
+    RateLimitRule,
+    gcra,
+    json_length_cost,
+    user_based_key_func,
+    user_cap_key_func,
+)
+from app.core.rate_limiter.composite_rate_limiter import LocalRateLimitCounter, SequentialRateLimiter
+from app.core.rate_limiter.memory_rate_limiter import MemoryRateLimiter
+from app.core.rate_limiter.redis_rate_limiter import RedisCompositeRateLimiter, sync_local_rate_limits
+from app.core.rate_limiter.shared_memory_rate_limiter import SharedWindowTable
+from app.core.security.auth import hash_token
+from app.core.security.principal import PRINCIPAL_CACHE
+
+
+def test_memory_rate_limiter():
+    async def run():
+        limiter = MemoryRateLimiter(3, 60)
+        results = [await limiter.hit("key") for _ in range(4)]
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert [r.remaining for r in results[:3]] == [2, 1, 0]
+        assert all(0 < r.reset_after <= 60 for r in results)
+
+        assert (await limiter.hit("other")).allowed
+
+    asyncio.run(run())
+
+
+def test_rate_limit_cost():
+    async def run():
+        limiter = MemoryRateLimiter(10, 60)
+        assert (await limiter.hit("key", cost=7)).remaining == 3
+        assert not (await limiter.hit("key", cost=4)).allowed
+        assert (await limiter.hit("key", cost=3)).remaining == 0
+
+        result, tat = gcra(None, 1000.0, limit=10, period=60, cost=7)
+        assert result.remaining == 3
+        assert not gcra(tat, 1000.0, limit=10, period=60, cost=4)[0].allowed
+
+        def request(body: bytes) -> Request:
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            return Request({"type": "http", "method": "POST", "path": "/", "headers": []}, receive)
+
+        assert await json_length_cost("items")(request(b'{"items": ["a", "b", "c"]}')) == 3
+        assert await json_length_cost()(request(b"[{}, {}]")) == 2
+        assert await json_length_cost("items")(request(b"not json")) == 1
+
+    asyncio.run(run())
+
+
+def test_user_based_key_func_uses_token_hash(monkeypatch):
+    validated = {hash_token("token")}
+    monkeypatch.setattr(PRINCIPAL_CACHE, "is_validated", lambda token_hash: token_hash in validated)
+
+    def request(headers: dict[str, str]) -> Request:
+        return Request(
+            {
+                "type": "http",
+                "method": "POST",
+                "path": "/pool/submit",
+                "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+                "client": ("10.0.0.1", 1234),
+            }
+        )
+
+    key = user_based_key_func(request({"X-API-KEY": "token", "X-Real-IP": "1.2.3.4"}))
+    assert key.startswith("rate_limiting:POST:/pool/submit:user:")
+    assert "token" not in key
+    assert key == user_based_key_func(request({"X-API-KEY": "token", "X-Real-IP": "5.6.7.8"}))
+    assert user_based_key_func(request({"X-Real-IP": "1.2.3.4"})) == "rate_limiting:POST:/pool/submit:1.2.3.4"
+
+    # Unknown keys are limited by IP, so sending a new key on each request does not reset the limit
+    unknown = request({"X-API-KEY": "random", "X-Real-IP": "1.2.3.4"})
+    assert user_based_key_func(unknown) == "rate_limiting:POST:/pool/submit:1.2.3.4"
+    assert user_cap_key_func(unknown) is None
+
+
+def test_gcra():
+    now = 1000.0
+    tat = None
+    for remaining in [2, 1, 0]:
+        result, tat = gcra(tat, now, limit=3, period=60)
+        assert result.allowed
+        assert result.remaining == remaining
+
+    result, new_tat = gcra(tat, now, limit=3, period=60)
+    assert not result.allowed
+    assert new_tat is None
+    assert result.reset_after == pytest.approx(20)
+
+    # one emission interval later exactly one request is allowed again
+    result, tat = gcra(tat, now + 20, limit=3, period=60)
+    assert result.allowed
+    assert result.remaining == 0
+    assert not gcra(tat, now + 20, limit=3, period=60)[0].allowed
+
+    # an idle key starts with a full burst
+    result, _ = gcra(tat, now + 1000, limit=3, period=60)
+    assert result.remaining == 2
+
+
+def test_sequential_rate_limiter_shares_caps():
+    async def run():
+        route_a, route_b, cap = RateLimitRule(3, 60), RateLimitRule(3, 61), RateLimitRule(4, 60)
+        limiter_a = SequentialRateLimiter([route_a, cap], lambda _: MemoryRateLimiter)
+        limiter_b = SequentialRateLimiter([route_b, cap], lambda _: MemoryRateLimiter)
+
+        for _ in range(2):
+            assert all(r.allowed for r in await limiter_a.hit_all([(route_a, "a"), (cap, "cap")], [1, 1]))
+            assert all(r.allowed for r in await limiter_b.hit_all([(route_b, "b"), (cap, "cap")], [1, 1]))
+
+        results = await limiter_a.hit_all([(route_a, "a"), (cap, "cap")], [1, 1])
+        assert [r.allowed for r in results] == [True, False]
+
+    asyncio.run(run())
+
+
+def test_local_rate_limit_counter():
+    rule = RateLimitRule(10, 60)
+    counter = LocalRateLimitCounter(threshold=0.5, max_age=2)
+    hits = [(rule, "key")]
+
+    assert counter.try_hit(hits, [1], now=0) is None
+    counter.update(hits, [RateLimitResult(allowed=True, limit=10, remaining=9, reset_after=30)], now=0)
+
+    # counted locally while at least half of the limit remains
+    assert [counter.try_hit(hits, [1], now=1)[0].remaining for _ in range(4)] == [8, 7, 6, 5]
+    assert counter.try_hit(hits, [1], now=1) is None
+    assert counter.take_pending("key") == 4
+
+    counter.update(hits, [RateLimitResult(allowed=True, limit=10, remaining=5, reset_after=29)], now=1)
+    assert counter.try_hit(hits, [1], now=1) is None
+
+    counter.update(hits, [RateLimitResult(allowed=True, limit=10, remaining=9, reset_after=30)], now=2)
+    assert counter.try_hit(hits, [1], now=3) is not None
+    assert counter.drain(now=3) == [(hits[0], 1)]
+    # stale entries are evaluated by Redis again and forgotten by the next sync
+    assert counter.try_hit(hits, [1], now=5) is None
+    assert counter.drain(now=5) == []
+    assert len(counter) == 0
+
+
+def test_local_counts_restored_when_sync_fails(monkeypatch):
+    rule = RateLimitRule(10, 60)
+    counter = LocalRateLimitCounter(threshold=0.5, max_age=60)
+    hits = [(rule, "key")]
+    counter.update(hits, [RateLimitResult(allowed=True, limit=10, remaining=9, reset_after=30)], now=time.time())
+    counter.try_hit(hits, [1], now=time.time())
+    counter.try_hit(hits, [1], now=time.time())
+
+    async def unavailable(*args, **kwargs):
+        raise RedisUnavailableError("Redis circuit is open")
+
+    monkeypatch.setattr(RedisCompositeRateLimiter, "local", counter)
+    monkeypatch.setattr(RedisCompositeRateLimiter, "evaluate", unavailable)
+    asyncio.run(sync_local_rate_limits())
+    assert counter.take_pending("key") == 2
+
+
+def test_shared_window_table_is_shared(tmp_path):
+    path = str(tmp_path / "rate-limit")
+    worker_a = SharedWindowTable(path, slots=64)
+    worker_b = SharedWindowTable(path, slots=64)
+    now = 60.0 * 20_000  # start of a window
+
+    assert worker_a.hit("key", limit=2, period=60, now=now).remaining == 1
+    assert worker_b.hit("key", limit=2, period=60, now=now).remaining == 0
+    assert not worker_a.hit("key", limit=2, period=60, now=now).allowed
+
+    # the previous window is weighted by the part of the period that has not elapsed yet
+    assert not worker_b.hit("key", limit=2, period=60, now=now + 60).allowed
+    assert worker_b.hit("key", limit=2, period=60, now=now + 90).allowed
+    assert worker_a.hit("key", limit=2, period=60, now=now + 240).remaining == 1
+
+    worker_a.close()
+    worker_b.close()
+
+
+def test_shared_window_table_reuses_slots(tmp_path):
+    table = SharedWindowTable(str(tmp_path / "rate-limit"), slots=8)
+    now = 1_000_000.0
+
+    # more keys than slots, every key still gets its own fresh counter
+    for i in range(32):
+        assert table.hit(f"key-{i}", limit=1, period=60, now=now).allowed
+
+    table.close()
+
+
+def _hit_many(path: str, times: int, allowed):
+    table = SharedWindowTable(path, slots=64)
+    count = sum(table.hit("key", limit=100, period=3600, now=1_000_000.0).allowed for _ in range(times))
+    table.close()
+    with allowed.get_lock():
+        allowed.value += count
+
+
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_shared_window_table_across_processes(tmp_path):
+    path = str(tmp_path / "rate-limit")
+    ctx = multiprocessing.get_context("fork")
+    allowed = ctx.Value("i", 0)
+
+    workers = [ctx.Process(target=_hit_many, args=(path, 60, allowed)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert allowed.value == 100
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.core.cache.memory_cache import MemoryCache
+from app.core.cache.redis_cache import RedisCache
+from app.core.db.redis import CircuitBreaker, CircuitState, RedisClient, RedisUnavailableError
+from app.core.rate_limiter.redis_rate_limiter import RedisRateLimiter
+
+
+class FailingRedis:
+    calls = 0
+
+    async def fail(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError("Connection refused")
+
+    get = set = delete = fail
+
+    def register_script(self, script):
+        return self.fail
+
+
+def test_circuit_breaker(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.core.db.redis.time.monotonic", lambda: now)
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    redis = FailingRedis()
+
+    async def run():
+        nonlocal now
+        for _ in range(2):
+            with pytest.raises(RedisUnavailableError):
+                await breaker.call(redis.get)
+        assert breaker.state == CircuitState.OPEN
+
+        # no calls while open
+        with pytest.raises(RedisUnavailableError):
+            await breaker.call(redis.get)
+        assert redis.calls == 2
+
+        # a failed probe opens the circuit again, a successful one closes it
+        now += 10
+        with pytest.raises(RedisUnavailableError):
+            await breaker.call(redis.get)
+        assert breaker.state == CircuitState.OPEN
+
+        async def ping() -> str:
+            return "PONG"
+
+        now += 10
+        assert await breaker.call(ping) == "PONG"
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.failures == 0
+
+    asyncio.run(run())
+
+
+def test_circuit_breaker_cancelled_probe(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.core.db.redis.time.monotonic", lambda: now)
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+
+    async def run():
+        nonlocal now
+        with pytest.raises(RedisUnavailableError):
+            await breaker.call(FailingRedis().get)
+        now += 10
+
+        async def hang():
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(breaker.call(hang))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitState.HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # the next call probes again instead of finding the circuit stuck half-open
+        assert breaker.state == CircuitState.OPEN
+
+        async def ping() -> str:
+            return "PONG"
+
+        assert await breaker.call(ping) == "PONG"
+        assert breaker.state == CircuitState.CLOSED
+
+    asyncio.run(run())
+
+
+def test_fallback_while_redis_is_unavailable(monkeypatch):
+    monkeypatch.setattr(RedisClient, "breaker", CircuitBreaker(threshold=1, cooldown=60))
+
+    async def run():
+        cache = RedisCache(fallback=MemoryCache(max_bytes=1024))
+        cache._redis = FailingRedis()  # type: ignore[assignment]
+        await cache.set("key", "value", expire=60)
+        assert await cache.get("key") == "value"
+        assert RedisClient.breaker.state == CircuitState.OPEN
+
+        limiter = RedisRateLimiter(2, 60)
+        limiter._redis = FailingRedis()  # type: ignore[assignment]
+        results = [await limiter.hit("key") for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+
+    asyncio.run(run())
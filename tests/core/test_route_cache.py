@@ -0,0 +1,45 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app.core.cache import cache_route_handler
+from app.core.cache.memory_cache import MemoryCache
+
+
+class CachedRoute(APIRoute):
+    def get_route_handler(self):
+        return cache_route_handler(super().get_route_handler(), expire=60)
+
+
+def test_cache_hit_skips_dependencies(monkeypatch):
+    monkeypatch.setattr("app.core.cache._cache", MemoryCache(max_bytes=1 << 16))
+    resolved = 0
+
+    async def dependency() -> int:
+        nonlocal resolved
+        resolved += 1
+        return resolved
+
+    router = APIRouter(route_class=CachedRoute)
+
+    @router.post("/cached")
+    async def cached_endpoint(value: Annotated[int, Depends(dependency)], names: list[str]) -> dict[str, int]:
+        return {"value": value, "names": len(names)}
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    response = client.post("/cached", json=["a"])
+    assert response.headers["X-Cache"] == "MISS"
+    response = client.post("/cached", json=["a"])
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json() == {"value": 1, "names": 1}
+    assert resolved == 1
+
+    # Requests with another body are cached separately
+    response = client.post("/cached", json=["a", "b"])
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json() == {"value": 2, "names": 2}
@@ -0,0 +1,41 @@
+import asyncio
+
+import orjson as json
+from google.protobuf.internal.decoder import _DecodeVarint
+
+from app.core.streaming import delimited_stream, encode_varint, ndjson_stream
+
+
+async def _iterate(values):
+    for value in values:
+        yield value
+
+
+async def _collect(chunks) -> list[bytes]:
+    return [chunk async for chunk in chunks]
+
+
+def test_encode_varint():
+    for value in [0, 1, 127, 128, 300, 2**31, 2**63 - 1]:
+        encoded = encode_varint(value)
+        assert _DecodeVarint(encoded, 0) == (value, len(encoded))
+
+
+def test_delimited_stream():
+    messages = [b"", b"a", b"x" * 200, b"bc"]
+    chunks = asyncio.run(_collect(delimited_stream(_iterate(messages), chunk_size=64)))
+    assert all(len(chunk) < 64 + 200 + 2 for chunk in chunks)
+
+    data, position, decoded = b"".join(chunks), 0, []
+    while position < len(data):
+        length, position = _DecodeVarint(data, position)
+        decoded.append(data[position : position + length])
+        position += length
+    assert decoded == messages
+
+
+def test_ndjson_stream():
+    values = ["a", {"b": 1}, *range(100)]
+    chunks = asyncio.run(_collect(ndjson_stream(_iterate(values), chunk_size=16)))
+    assert len(chunks) > 1
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == values